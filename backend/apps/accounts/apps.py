@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
+
+    def ready(self):
+        # Evict cached WebSocket users when they change
+        from apps.accounts.signals import connect_signals
+        connect_signals()
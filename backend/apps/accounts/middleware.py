@@ -0,0 +1,191 @@
+"""
+JWT auth middleware for every WebSocket route.
+
+Reads the access token from:
+  1. Query string  ?token=<access_token>
+  2. Sec-WebSocket-Protocol header (fallback for browser clients)
+
+The token signature and expiry are checked on the event loop (pure CPU).
+The resolved user is cached per process by the token's jti for at most
+WS_AUTH_CACHE_MAX_TTL seconds (and never past the token's expiry), so
+reconnects with the same token — e.g. every tab after a deploy — do not
+touch the DB or the sync thread pool. Only cache misses run a query.
+
+Saving or deleting a User evicts their entries in the saving process
+(accounts signals); other processes pick up a deactivation, deletion or
+clinic move once the short TTL runs out.
+
+Connect-auth latency and cache hit / miss / failure counts are kept per
+process — see auth_stats().
+"""
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+
+logger = logging.getLogger(__name__)
+
+WS_AUTH_CACHE_SIZE    = getattr(settings, 'WS_AUTH_CACHE_SIZE', 10_000)
+WS_AUTH_CACHE_MAX_TTL = getattr(settings, 'WS_AUTH_CACHE_MAX_TTL', 60)     # seconds, None = token lifetime
+WS_AUTH_SLOW_MS       = getattr(settings, 'WS_AUTH_SLOW_MS', 250)
+
+# jti → (user, expires_at)
+_user_cache: 'OrderedDict[str, tuple]' = OrderedDict()
+_cache_lock = threading.Lock()       # evict_user() runs on sync threads
+_stats    = Counter()
+_latency  = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+
+def auth_stats() -> dict:
+    """Snapshot of this process's websocket auth counters and latency."""
+    count = _latency['count']
+    return {
+        **_stats,
+        'cached_users': len(_user_cache),
+        'connects':     count,
+        'avg_ms':       round(_latency['total_ms'] / count, 2) if count else 0.0,
+        'max_ms':       round(_latency['max_ms'], 2),
+    }
+
+
+def clear_user_cache() -> None:
+    with _cache_lock:
+        _user_cache.clear()
+
+
+def evict_user(user_id) -> int:
+    """Drop every cached token of this user. Returns the entries removed."""
+    with _cache_lock:
+        stale = [jti for jti, (user, _) in _user_cache.items() if user.pk == user_id]
+        for jti in stale:
+            del _user_cache[jti]
+    return len(stale)
+
+
+# ── Token → user ─────────────────────────────────────────────────────────────
+
+def _decode(token_str: str):
+    """Validated access-token claims, or None."""
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        return AccessToken(token_str)
+    except (TokenError, InvalidToken) as exc:
+        logger.warning(f'WS JWT auth failed: {exc}')
+        return None
+
+
+@database_sync_to_async
+def _load_user(user_id):
+    from apps.accounts.models import User
+
+    return (
+        User.objects
+        .select_related('clinic__parent_clinic')
+        .filter(pk=user_id, is_active=True, is_deleted=False)
+        .first()
+    )
+
+
+def _cache_get(jti):
+    with _cache_lock:
+        entry = _user_cache.get(jti)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            _user_cache.pop(jti, None)
+            return None
+        _user_cache.move_to_end(jti)
+        return user
+
+
+def _cache_put(jti, user, exp) -> None:
+    expires_at = exp
+    if WS_AUTH_CACHE_MAX_TTL:
+        expires_at = min(exp, time.time() + WS_AUTH_CACHE_MAX_TTL)
+    with _cache_lock:
+        _user_cache[jti] = (user, expires_at)
+        _user_cache.move_to_end(jti)
+        while len(_user_cache) > WS_AUTH_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+
+async def get_user_from_token(token_str: str):
+    """Validate a JWT access token and return the user (AnonymousUser on failure)."""
+    token = _decode(token_str)
+    if token is None:
+        _stats['failures'] += 1
+        return AnonymousUser()
+
+    user_id = token.get('user_id')
+    jti     = token.get('jti')
+
+    user = _cache_get(jti) if jti else None
+    if user is not None:
+        _stats['cache_hits'] += 1
+        return user
+
+    _stats['cache_misses'] += 1
+    user = await _load_user(user_id) if user_id is not None else None
+    if user is None:
+        _stats['failures'] += 1
+        logger.warning(f'WS JWT auth failed: no active user {user_id}')
+        return AnonymousUser()
+
+    if jti:
+        _cache_put(jti, user, token['exp'])
+    return user
+
+
+def _token_from_scope(scope):
+    params     = parse_qs(scope.get('query_string', b'').decode())
+    token_list = params.get('token', [])
+    if token_list:
+        return token_list[0]
+
+    headers         = dict(scope.get('headers', []))
+    protocol_header = headers.get(b'sec-websocket-protocol', b'').decode()
+    for part in (p.strip() for p in protocol_header.split(',')):
+        if part and part.lower() != 'bearer':
+            return part
+    return None
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections via JWT and populates scope['user']
+    for consumers.
+    """
+
+    async def __call__(self, scope, receive, send):
+        started   = time.perf_counter()
+        token_str = _token_from_scope(scope)
+
+        scope['user'] = (
+            await get_user_from_token(token_str)
+            if token_str
+            else AnonymousUser()
+        )
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _latency['count']    += 1
+        _latency['total_ms'] += elapsed_ms
+        _latency['max_ms']    = max(_latency['max_ms'], elapsed_ms)
+        if elapsed_ms >= WS_AUTH_SLOW_MS:
+            logger.warning(f'Slow WS auth: {elapsed_ms:.0f}ms path={scope.get("path")}')
+
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner)
@@ -1,4 +1,5 @@
 from django.core.mail import EmailMultiAlternatives
+from apps.common.mail_transport import send_message
 from django.conf import settings
 import logging
 import ssl
@@ -115,7 +116,7 @@ class EmailService:
             email.attach_alternative(html_message, "text/html")
             
             # Send with fail_silently=False to catch errors
-            email.send(fail_silently=False)
+            send_message(email)
             
             logger.info(f"✅ Welcome email sent to {user_email}")
             return True
@@ -233,7 +234,7 @@ class EmailService:
                 to=[user_email],
             )
             email.attach_alternative(html_message, 'text/html')
-            email.send(fail_silently=False)
+            send_message(email)
 
             logger.info(f"✅ Password reset email sent to {user_email}")
             return True
@@ -329,7 +330,7 @@ class EmailService:
                 to=[user_email],
             )
             email.attach_alternative(html_message, 'text/html')
-            email.send(fail_silently=False)
+            send_message(email)
 
             logger.info(f"✅ Verification code email sent to {user_email}")
             return True
@@ -0,0 +1,21 @@
+"""
+Keeps the WebSocket auth cache in step with user changes.
+Connected in apps.py → ready().
+"""
+from django.db.models.signals import post_delete, post_save
+
+
+def connect_signals():
+    """
+    Called from AccountsConfig.ready().
+    Deferred import prevents AppRegistryNotReady errors.
+    """
+    from .middleware import evict_user
+    from .models import User
+
+    def on_user_changed(sender, instance, **kwargs):
+        # Deactivation, deletion or a clinic move must not ride on a cached user
+        evict_user(instance.pk)
+
+    post_save.connect(on_user_changed,   sender=User, weak=False, dispatch_uid='ws_auth_user_save')
+    post_delete.connect(on_user_changed, sender=User, weak=False, dispatch_uid='ws_auth_user_delete')
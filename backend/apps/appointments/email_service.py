@@ -1,58 +1,32 @@
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from apps.common.email_rendering import clinic_branding, render_batch, render_email
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
 
-def get_clinic_logo_url(clinic) -> str | None:
-    """Get the clinic logo URL for use in emails."""
-    if not clinic.logo:
-        return None
-    if hasattr(clinic.logo, 'url'):
-        try:
-            url = clinic.logo.url
-            # Cloudinary / absolute URLs are already usable
-            if url.startswith('http'):
-                return url
-            # Local storage: build an absolute URL so email clients can fetch it
-            backend_url = getattr(
-                settings, 'BACKEND_URL',
-                os.environ.get('BACKEND_URL', 'http://localhost:8000'),
-            )
-            return f"{backend_url.rstrip('/')}{url}"
-        except Exception:
-            return None
-    return None
-
-
-def send_appointment_reminder_email(appointment) -> tuple[bool, str]:
-    """
-    Send a reminder email to the patient for their upcoming appointment.
-    Returns: (success: bool, error_message: str)
-    """
+def _reminder_skip_reason(appointment) -> str:
+    """Why a reminder must not go out for `appointment` ('' if it may)."""
     patient = appointment.patient
     clinic  = appointment.clinic
 
-    recipient_email = getattr(patient, 'email', None)
-    if not recipient_email:
-        msg = f"Patient {patient.id} has no email address — skipping reminder."
-        logger.warning(msg)
-        return False, msg
+    if not getattr(patient, 'email', None):
+        return f"Patient {patient.id} has no email address — skipping reminder."
 
     if appointment.reminder_sent:
-        msg = f"Reminder already sent for appointment {appointment.id} — skipping."
-        logger.info(msg)
-        return False, msg
+        return f"Reminder already sent for appointment {appointment.id} — skipping."
 
     _notif_clinic = getattr(clinic, 'main_clinic', clinic)
     if not getattr(_notif_clinic, 'email_notifications_enabled', True):
-        msg = f"Clinic {_notif_clinic.id} has email notifications disabled — skipping reminder for appointment {appointment.id}."
-        logger.info(msg)
-        return False, msg
+        return f"Clinic {_notif_clinic.id} has email notifications disabled — skipping reminder for appointment {appointment.id}."
+
+    return ''
+
+
+def _reminder_context(appointment) -> dict:
+    patient = appointment.patient
+    clinic  = appointment.clinic
 
     practitioner_name = (
         appointment.practitioner.user.get_full_name()
@@ -65,7 +39,7 @@ def send_appointment_reminder_email(appointment) -> tuple[bool, str]:
         else clinic.name
     )
 
-    context = {
+    return {
         'patient_first_name':  patient.first_name,
         'patient_full_name':   patient.get_full_name(),
         'appointment_date':    appointment.date.strftime('%A, %d %B %Y'),
@@ -73,78 +47,74 @@ def send_appointment_reminder_email(appointment) -> tuple[bool, str]:
         'appointment_type':    appointment.get_appointment_type_display(),
         'practitioner_name':   practitioner_name,
         'location_name':       location_name,
-        'clinic_name':         clinic.name,
-        'clinic_phone':        getattr(clinic, 'phone', ''),
-        'clinic_address':      getattr(clinic, 'address', ''),
-        'clinic_email':        getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':     get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'chief_complaint':     appointment.chief_complaint or '',
         'notes_for_patient':   appointment.patient_notes or '',
         'appointment_id':      appointment.id,
     }
 
-    try:
-        subject      = (
+
+def _queue_reminder(appointment, context, text_content, html_content, resend=False) -> None:
+    from apps.notifications.services import outbox
+    outbox.enqueue_email(
+        clinic      = appointment.clinic,
+        patient     = appointment.patient,
+        appointment = appointment,
+        comm_type   = 'APPOINTMENT_REMINDER',
+        recipient   = appointment.patient.email,
+        subject     = (
             f"Appointment Reminder – {context['appointment_date']} "
-            f"at {context['appointment_time']} | {clinic.name}"
-        )
-        text_content = render_to_string('appointments/email/reminder.txt',  context)
-        html_content = render_to_string('appointments/email/reminder.html', context)
+            f"at {context['appointment_time']} | {context['clinic_name']}"
+        ),
+        body        = text_content,
+        html_body   = html_content,
+        reply_to    = context['clinic_email'],
+        resend      = resend,
+    )
+
+
+def send_appointment_reminder_email(appointment, resend: bool = False) -> tuple[bool, str]:
+    """
+    Queue a reminder email to the patient for their upcoming appointment.
+    resend=True bypasses the outbox dedupe for a deliberate manual re-send.
+    Returns: (success: bool, error_message: str)
+    """
+    msg = _reminder_skip_reason(appointment)
+    if msg:
+        if 'no email' in msg:
+            logger.warning(msg)
+        else:
+            logger.info(msg)
+        return False, msg
+
+    context = _reminder_context(appointment)
+    try:
+        text_content, html_content = render_email('appointments/email/reminder', context)
     except Exception as e:
         msg = f"Template render error for appointment {appointment.id}: {e}"
         logger.error(msg)
         return False, msg
 
-    try:
-        msg_obj = EmailMultiAlternatives(
-            subject    = subject,
-            body       = text_content,
-            from_email = settings.DEFAULT_FROM_EMAIL,
-            to         = [recipient_email],
-            reply_to   = [context['clinic_email']],
-        )
-        msg_obj.attach_alternative(html_content, 'text/html')
-        msg_obj.send(fail_silently=False)
-
-        appointment.reminder_sent    = True
-        appointment.reminder_sent_at = timezone.now()
-        appointment.save(update_fields=['reminder_sent', 'reminder_sent_at'])
-
-        from apps.appointments.models import AppointmentReminder
-        AppointmentReminder.objects.create(
-            appointment   = appointment,
-            reminder_type = 'EMAIL',
-            is_successful = True,
-            error_message = '',
-        )
+    _queue_reminder(appointment, context, text_content, html_content, resend=resend)
 
-        logger.info(
-            "Reminder sent → appointment_id=%s patient=%s email=%s",
-            appointment.id, patient.id, recipient_email,
-        )
-        return True, ''
+    # Marked at enqueue time — the outbox owns retries and the
+    # AppointmentReminder log from here on
+    appointment.reminder_sent    = True
+    appointment.reminder_sent_at = timezone.now()
+    appointment.save(update_fields=['reminder_sent', 'reminder_sent_at'])
 
-    except Exception as e:
-        error_msg = f"SMTP error for appointment {appointment.id}: {e}"
-        logger.error(error_msg)
-        try:
-            from apps.appointments.models import AppointmentReminder
-            AppointmentReminder.objects.create(
-                appointment   = appointment,
-                reminder_type = 'EMAIL',
-                is_successful = False,
-                error_message = str(e),
-            )
-        except Exception:
-            pass
-        return False, error_msg
+    logger.info(
+        "Reminder queued → appointment_id=%s patient=%s email=%s",
+        appointment.id, appointment.patient.id, appointment.patient.email,
+    )
+    return True, ''
 
 
 # ── NEW: Cancellation email ───────────────────────────────────────────────────
 
 def send_appointment_cancellation_email(appointment, cancellation_reason: str) -> tuple[bool, str]:
     """
-    Send a cancellation notification email to the patient.
+    Queue a cancellation notification email to the patient.
 
     Called after the appointment status has already been set to CANCELLED.
     Returns: (success: bool, error_message: str)
@@ -184,11 +154,7 @@ def send_appointment_cancellation_email(appointment, cancellation_reason: str) -
         'appointment_type':     appointment.get_appointment_type_display(),
         'practitioner_name':    practitioner_name,
         'location_name':        location_name,
-        'clinic_name':          clinic.name,
-        'clinic_phone':         getattr(clinic, 'phone', ''),
-        'clinic_address':       getattr(clinic, 'address', ''),
-        'clinic_email':         getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':      get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'cancellation_reason':  cancellation_reason,
         'cancelled_by_name':    cancelled_by_name,
         'cancelled_at':         appointment.cancelled_at.strftime('%A, %d %B %Y at %I:%M %p')
@@ -202,52 +168,77 @@ def send_appointment_cancellation_email(appointment, cancellation_reason: str) -
             f"Appointment Cancelled – {context['appointment_date']} "
             f"at {context['appointment_time']} | {clinic.name}"
         )
-        text_content = render_to_string('appointments/email/cancellation.txt', context)
-        html_content = render_to_string('appointments/email/cancellation.html', context)
+        text_content, html_content = render_email('appointments/email/cancellation', context)
     except Exception as e:
         msg = f"Cancellation template render error for appointment {appointment.id}: {e}"
         logger.error(msg)
         return False, msg
 
-    # ── Send ──────────────────────────────────────────────────────────────
-    try:
-        msg_obj = EmailMultiAlternatives(
-            subject    = subject,
-            body       = text_content,
-            from_email = settings.DEFAULT_FROM_EMAIL,
-            to         = [recipient_email],
-            reply_to   = [context['clinic_email']],
-        )
-        msg_obj.attach_alternative(html_content, 'text/html')
-        msg_obj.send(fail_silently=False)
-
-        logger.info(
-            "Cancellation email sent → appointment_id=%s patient=%s email=%s",
-            appointment.id, patient.id, recipient_email,
-        )
-        return True, ''
+    # ── Queue ─────────────────────────────────────────────────────────────
+    from apps.notifications.services import outbox
+    outbox.enqueue_email(
+        clinic      = clinic,
+        patient     = patient,
+        appointment = appointment,
+        comm_type   = 'CANCELLATION_NOTICE',
+        recipient   = recipient_email,
+        subject     = subject,
+        body        = text_content,
+        html_body   = html_content,
+        reply_to    = context['clinic_email'],
+    )
 
-    except Exception as e:
-        error_msg = f"Cancellation SMTP error for appointment {appointment.id}: {e}"
-        logger.error(error_msg)
-        return False, error_msg
+    logger.info(
+        "Cancellation email queued → appointment_id=%s patient=%s email=%s",
+        appointment.id, patient.id, recipient_email,
+    )
+    return True, ''
 
 
 def send_bulk_reminders(appointments_qs) -> dict:
     """
-    Send reminders for a queryset of appointments.
+    Queue reminders for a queryset of appointments.
+
+    All reminders are rendered in one batch against the compiled templates,
+    queued with a single outbox INSERT and stamped with one UPDATE.
     Returns a summary dict: { sent, skipped, failed, errors }
     """
+    from apps.appointments.models import Appointment
+    from apps.notifications.services import outbox
+
     summary = {'sent': 0, 'skipped': 0, 'failed': 0, 'errors': []}
 
+    pending = []
     for appointment in appointments_qs:
-        success, message = send_appointment_reminder_email(appointment)
-        if success:
-            summary['sent'] += 1
+        message = _reminder_skip_reason(appointment)
+        if not message:
+            pending.append((appointment, _reminder_context(appointment)))
         elif 'already sent' in message or 'no email' in message.lower():
             summary['skipped'] += 1
         else:
             summary['failed'] += 1
             summary['errors'].append({'appointment_id': appointment.id, 'error': message})
 
-    return summary
\ No newline at end of file
+    rendered = render_batch('appointments/email/reminder', [context for _, context in pending])
+
+    queued = []
+    with transaction.atomic(), outbox.batch():
+        for (appointment, context), result in zip(pending, rendered):
+            if not result.ok:
+                summary['failed'] += 1
+                summary['errors'].append({
+                    'appointment_id': appointment.id,
+                    'error':          f"Template render error for appointment {appointment.id}: {result.error}",
+                })
+                continue
+            _queue_reminder(appointment, context, result.text, result.html)
+            queued.append(appointment.id)
+
+        if queued:
+            Appointment.objects.filter(id__in=queued).update(
+                reminder_sent=True, reminder_sent_at=timezone.now(),
+            )
+
+    summary['sent'] = len(queued)
+    logger.info("Bulk reminders: %d queued, %d skipped, %d failed", len(queued), summary['skipped'], summary['failed'])
+    return summary
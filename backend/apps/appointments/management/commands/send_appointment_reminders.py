@@ -13,7 +13,7 @@ Usage:
 """
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from apps.appointments.models import Appointment
 from apps.appointments.email_service import send_appointment_reminder_email
 from apps.appointments.sms_service import send_appointment_reminder_sms
@@ -22,6 +22,11 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _day_start(day):
+    """Midnight of a clinic-local date as an aware datetime."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 class Command(BaseCommand):
     help = 'Send appointment reminder emails and/or SMS to patients for upcoming appointments.'
 
@@ -80,12 +85,11 @@ class Command(BaseCommand):
         # ── Determine target date ─────────────────────────────────────────────
         if date_str:
             try:
-                from datetime import datetime
                 target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             except ValueError:
                 raise CommandError(f"Invalid date format '{date_str}'. Use YYYY-MM-DD.")
         else:
-            target_date = timezone.now().date() + timedelta(days=days_ahead)
+            target_date = timezone.localdate() + timedelta(days=days_ahead)
 
         # ── Header ────────────────────────────────────────────────────────────
         self.stdout.write(self.style.MIGRATE_HEADING(
@@ -105,14 +109,22 @@ class Command(BaseCommand):
             'patient', 'practitioner__user', 'clinic', 'location',
         )
 
+        # Local-day windows as starts_at ranges (indexed)
         if retry_failed:
-            today = timezone.now().date()
+            today = timezone.localdate()
             qs = qs.filter(
-                date__in=[today, today + timedelta(days=1)],
+                starts_at__gte=_day_start(today),
+                starts_at__lt=_day_start(today + timedelta(days=2)),
                 reminder_sent=False,
             )
         else:
-            qs = qs.filter(date=target_date, reminder_sent=False)
+            qs = qs.filter(
+                starts_at__gte=_day_start(target_date),
+                starts_at__lt=_day_start(target_date + timedelta(days=1)),
+                reminder_sent=False,
+            )
+
+        qs = qs.order_by('starts_at')
 
         if clinic_id:
             qs = qs.filter(clinic_id=clinic_id)
@@ -1,12 +1,17 @@
 """
 Send Y/N appointment reminders using the communication workflow.
 
-Uses clinic-configurable reminder_hours_before setting.
+Uses clinic-configurable reminder_hours_before setting. Clinics sharing a
+lead time are handled together: one range query on Appointment.starts_at
+selects every due appointment across their branches.
 """
 import logging
+from collections import defaultdict
 from datetime import timedelta
 
 from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from apps.appointments.models import Appointment
@@ -32,68 +37,80 @@ class Command(BaseCommand):
             f"\n{'[DRY RUN] ' if dry_run else ''}Communication Reminder Sender"
         ))
 
-        # Get all main clinics (or a specific one)
-        clinic_qs = Clinic.objects.filter(main_clinic__isnull=True)
+        # Main clinics (or a specific one), grouped by reminder lead time
+        clinic_qs = Clinic.objects.filter(parent_clinic__isnull=True, is_deleted=False)
         if clinic_id:
             clinic_qs = clinic_qs.filter(id=clinic_id)
 
+        settings_by_clinic = {
+            obj.clinic_id: obj
+            for obj in ClinicCommunicationSettings.objects.filter(clinic__in=clinic_qs)
+        }
+        groups = defaultdict(list)
+        for clinic in clinic_qs:
+            settings_obj = settings_by_clinic.get(clinic.id) or ClinicCommunicationSettings.get_for_clinic(clinic)
+            if settings_obj.reminders_enabled:
+                groups[settings_obj.reminder_hours_before].append(clinic)
+
         total_sent = 0
         total_skipped = 0
 
-        for clinic in clinic_qs:
-            settings_obj = ClinicCommunicationSettings.get_for_clinic(clinic)
-            if not settings_obj.reminders_enabled:
-                continue
-
-            hours_before = settings_obj.reminder_hours_before
+        for hours_before, clinics in sorted(groups.items()):
             reminder_window_start = now + timedelta(hours=hours_before - 1)
             reminder_window_end = now + timedelta(hours=hours_before + 1)
 
-            # Find appointments in all branches of this clinic
-            branch_ids = list(
-                Clinic.objects.filter(main_clinic=clinic).values_list('id', flat=True)
-            ) + [clinic.id]
+            # One range query on starts_at for every branch of every clinic in the group
+            main_ids   = [clinic.id for clinic in clinics]
+            branch_map = dict(
+                Clinic.objects.filter(Q(id__in=main_ids) | Q(parent_clinic_id__in=main_ids))
+                .values_list('id', Coalesce('parent_clinic_id', 'id'))
+            )
 
             appointments = Appointment.objects.filter(
-                clinic_id__in=branch_ids,
+                clinic_id__in=branch_map,
                 is_deleted=False,
                 status__in=['SCHEDULED', 'CONFIRMED'],
                 reminder_sent=False,
-            ).select_related('patient', 'practitioner__user', 'clinic', 'location', 'service')
+                starts_at__range=(reminder_window_start, reminder_window_end),
+            ).select_related(
+                'patient', 'practitioner__user', 'clinic', 'location', 'service',
+            ).order_by('starts_at')
 
-            # Filter by reminder window
-            eligible = []
+            by_clinic = defaultdict(list)
             for appt in appointments:
-                appt_datetime = timezone.make_aware(
-                    timezone.datetime.combine(appt.date, appt.start_time),
-                    timezone.get_current_timezone(),
-                ) if timezone.is_naive(timezone.datetime.combine(appt.date, appt.start_time)) else timezone.datetime.combine(appt.date, appt.start_time)
+                by_clinic[branch_map[appt.clinic_id]].append(appt)
 
-                if reminder_window_start <= appt_datetime <= reminder_window_end:
-                    eligible.append(appt)
+            for clinic in clinics:
+                eligible = by_clinic.get(clinic.id)
+                if eligible:
+                    sent, skipped = self._send(clinic, eligible, dry_run)
+                    total_sent    += sent
+                    total_skipped += skipped
 
-            if not eligible:
-                continue
+        self.stdout.write(f"\n  Sent: {total_sent} | Skipped: {total_skipped}\n")
 
-            self.stdout.write(f"\n  Clinic: {clinic.name} — {len(eligible)} reminder(s)")
-
-            for appt in eligible:
-                patient_name = appt.patient.get_full_name()
-                if dry_run:
-                    self.stdout.write(f"    [DRY] {patient_name} — {appt.date} {appt.start_time}")
-                    total_skipped += 1
-                    continue
-
-                try:
-                    result = send_appointment_reminder_with_reply(appt)
-                    if result.get('skipped'):
-                        self.stdout.write(f"    SKIP  {patient_name}: {result.get('reason')}")
-                        total_skipped += 1
-                    else:
-                        self.stdout.write(self.style.SUCCESS(f"    SENT  {patient_name}"))
-                        total_sent += 1
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"    FAIL  {patient_name}: {e}"))
-                    logger.error("Reminder failed for appt %s: %s", appt.id, e)
+    def _send(self, clinic, eligible, dry_run):
+        """Send one clinic's reminders. Returns (sent, skipped)."""
+        self.stdout.write(f"\n  Clinic: {clinic.name} — {len(eligible)} reminder(s)")
+        sent = skipped = 0
 
-        self.stdout.write(f"\n  Sent: {total_sent} | Skipped: {total_skipped}\n")
+        for appt in eligible:
+            patient_name = appt.patient.get_full_name()
+            if dry_run:
+                self.stdout.write(f"    [DRY] {patient_name} — {appt.date} {appt.start_time}")
+                skipped += 1
+                continue
+
+            try:
+                result = send_appointment_reminder_with_reply(appt)
+                if result.get('skipped'):
+                    self.stdout.write(f"    SKIP  {patient_name}: {result.get('reason')}")
+                    skipped += 1
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"    SENT  {patient_name}"))
+                    sent += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"    FAIL  {patient_name}: {e}"))
+                logger.error("Reminder failed for appt %s: %s", appt.id, e)
+
+        return sent, skipped
@@ -6,6 +6,7 @@ Includes branch-specific rebooking link.
 import logging
 
 from django.core.management.base import BaseCommand
+from django.db.models import Q
 from django.utils import timezone
 
 from apps.appointments.models import Appointment
@@ -29,20 +30,17 @@ class Command(BaseCommand):
             f"\n{'[DRY RUN] ' if dry_run else ''}DNA Follow-up Sender"
         ))
 
-        qs = Appointment.objects.filter(
+        # DNA / no-show appointments that have started, plus declined ones
+        # (the decline follow-up goes out before the slot) — one query
+        now = timezone.now()
+        combined = Appointment.objects.filter(
+            Q(status__in=['DNA', 'NO_SHOW'], starts_at__lte=now)
+            | Q(confirmation_status='DECLINED'),
             is_deleted=False,
-            status__in=['DNA', 'NO_SHOW'],
             dna_followup_sent=False,
-        ).select_related('patient', 'practitioner__user', 'clinic', 'location')
-
-        # Also include declined appointments
-        declined = Appointment.objects.filter(
-            is_deleted=False,
-            confirmation_status='DECLINED',
-            dna_followup_sent=False,
-        ).select_related('patient', 'practitioner__user', 'clinic', 'location')
-
-        combined = (qs | declined).distinct()
+        ).select_related(
+            'patient', 'practitioner__user', 'clinic', 'location',
+        ).order_by('starts_at')
 
         if clinic_id:
             combined = combined.filter(clinic_id=clinic_id)
@@ -2,16 +2,25 @@
 Send wellness check-ins to patients who haven't visited in X months.
 
 Configurable per clinic via inactive_patient_months setting.
+
+Eligible patients are selected in one query per clinic — a NOT EXISTS
+subquery drops anyone with an upcoming booking and the last completed
+visit's complaint is annotated in — and processed in id-ordered chunks.
+Each chunk's messages are queued in the outbox with one bulk INSERT and
+the patients stamped with one UPDATE.
 """
 import logging
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from apps.appointments.models import Appointment
 from apps.clinics.models import Clinic, ClinicCommunicationSettings
+from apps.notifications.services import outbox
 from apps.notifications.services.communication_service import send_inactive_patient_checkin
 from apps.patients.models import Patient
 
@@ -24,86 +33,151 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--dry-run', action='store_true', help='Preview without sending.')
         parser.add_argument('--clinic-id', type=int, default=None)
-        parser.add_argument('--limit', type=int, default=50, help='Max patients to process per clinic.')
+        parser.add_argument('--limit', type=int, default=50, help='Max patients to process per clinic (0 = no limit).')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Patients loaded and queued per batch.')
 
     def handle(self, *args, **options):
-        dry_run   = options['dry_run']
-        clinic_id = options['clinic_id']
-        limit     = options['limit']
-        now       = timezone.now()
+        dry_run    = options['dry_run']
+        clinic_id  = options['clinic_id']
+        limit      = options['limit']
+        chunk_size = options['chunk_size']
+        now        = timezone.now()
 
         self.stdout.write(self.style.MIGRATE_HEADING(
             f"\n{'[DRY RUN] ' if dry_run else ''}Inactive Patient Check-in Sender"
         ))
 
-        clinic_qs = Clinic.objects.filter(main_clinic__isnull=True)
+        clinic_qs = Clinic.objects.filter(parent_clinic__isnull=True, is_deleted=False)
         if clinic_id:
             clinic_qs = clinic_qs.filter(id=clinic_id)
+        clinics = list(clinic_qs)
+        main_ids = [clinic.id for clinic in clinics]
+
+        # Settings and branch lists for every clinic up front
+        settings_by_clinic = {
+            obj.clinic_id: obj
+            for obj in ClinicCommunicationSettings.objects.filter(clinic_id__in=main_ids)
+        }
+        branches = {}
+        for branch_id, main_id in (
+            Clinic.objects
+            .filter(Q(id__in=main_ids) | Q(parent_clinic_id__in=main_ids))
+            .values_list('id', Coalesce('parent_clinic_id', 'id'))
+        ):
+            branches.setdefault(main_id, []).append(branch_id)
 
         total_sent = 0
         total_skipped = 0
 
-        for clinic in clinic_qs:
-            settings_obj = ClinicCommunicationSettings.get_for_clinic(clinic)
+        for clinic in clinics:
+            settings_obj = settings_by_clinic.get(clinic.id) or ClinicCommunicationSettings.get_for_clinic(clinic)
             if not settings_obj.inactive_checkin_enabled:
                 continue
 
-            months = settings_obj.inactive_patient_months
-            cutoff_date = (now - timedelta(days=months * 30)).date()
-
-            branch_ids = list(
-                Clinic.objects.filter(main_clinic=clinic).values_list('id', flat=True)
-            ) + [clinic.id]
-
-            # Find patients with last_visit_date before cutoff
-            # and haven't been sent a check-in recently (within 30 days)
-            recent_checkin_cutoff = now - timedelta(days=30)
-
-            patients = Patient.objects.filter(
-                clinic_id__in=branch_ids,
-                is_archived=False,
-                last_visit_date__isnull=False,
-                last_visit_date__lte=cutoff_date,
-            ).filter(
-                Q(last_checkin_sent_at__isnull=True)
-                | Q(last_checkin_sent_at__lt=recent_checkin_cutoff)
-            )[:limit]
+            patients = self._eligible(clinic, branches.get(clinic.id, [clinic.id]), settings_obj, now)
 
-            if not patients:
-                continue
+            announced = False
+            for chunk in self._chunks(patients, chunk_size, limit):
+                if not announced:
+                    self.stdout.write(f"\n  Clinic: {clinic.name}")
+                    announced = True
 
-            self.stdout.write(f"\n  Clinic: {clinic.name} — {len(patients)} inactive patient(s)")
+                if dry_run:
+                    for patient in chunk:
+                        self.stdout.write(f"    [DRY] {patient.get_full_name()} — last visit: {patient.last_visit_date}")
+                    total_skipped += len(chunk)
+                    continue
 
-            for patient in patients:
-                # Verify no upcoming appointments
-                has_upcoming = Appointment.objects.filter(
-                    patient=patient,
-                    clinic_id__in=branch_ids,
-                    is_deleted=False,
-                    status__in=['SCHEDULED', 'CONFIRMED'],
-                    date__gte=now.date(),
-                ).exists()
+                sent, skipped = self._send_chunk(clinic, settings_obj, chunk)
+                total_sent    += sent
+                total_skipped += skipped
 
-                if has_upcoming:
-                    total_skipped += 1
-                    continue
+        self.stdout.write(f"\n  Sent: {total_sent} | Skipped: {total_skipped}\n")
 
+    @staticmethod
+    def _eligible(clinic, branch_ids, settings_obj, now):
+        """Inactive, not recently contacted, nothing booked — as one query."""
+        months = settings_obj.inactive_patient_months
+        cutoff_date = timezone.localdate(now - timedelta(days=months * 30))
+
+        # Haven't been sent a check-in recently (within 30 days)
+        recent_checkin_cutoff = now - timedelta(days=30)
+        today_start = timezone.make_aware(datetime.combine(timezone.localdate(now), time.min))
+
+        upcoming = Appointment.objects.filter(
+            patient_id=OuterRef('pk'),
+            clinic_id__in=branch_ids,
+            is_deleted=False,
+            status__in=['SCHEDULED', 'CONFIRMED'],
+            starts_at__gte=today_start,
+        )
+        last_complaint = Appointment.objects.filter(
+            patient_id=OuterRef('pk'),
+            status='COMPLETED',
+            is_deleted=False,
+        ).order_by('-date').values('chief_complaint')[:1]
+
+        return Patient.objects.filter(
+            clinic_id__in=branch_ids,
+            is_archived=False,
+            last_visit_date__isnull=False,
+            last_visit_date__lte=cutoff_date,
+        ).filter(
+            Q(last_checkin_sent_at__isnull=True)
+            | Q(last_checkin_sent_at__lt=recent_checkin_cutoff)
+        ).filter(
+            ~Exists(upcoming),
+        ).annotate(
+            last_complaint=Coalesce(Subquery(last_complaint), Value(''), output_field=TextField()),
+        ).order_by('id')
+
+    @staticmethod
+    def _chunks(patients, chunk_size, limit):
+        """Keyset pagination on id — one query per chunk, at most `limit` rows overall."""
+        last_id = 0
+        seen    = 0
+        while not limit or seen < limit:
+            size  = chunk_size if not limit else min(chunk_size, limit - seen)
+            chunk = list(patients.filter(id__gt=last_id)[:size])
+            if not chunk:
+                return
+            yield chunk
+            seen   += len(chunk)
+            last_id = chunk[-1].id
+
+    def _send_chunk(self, clinic, settings_obj, chunk):
+        """
+        Queue one chunk's check-ins in a single outbox INSERT and stamp them in
+        bulk. Each patient runs in its own savepoint, so a database error for
+        one patient is rolled back without aborting the rest of the chunk.
+        """
+        sent, skipped, stamped = 0, 0, []
+
+        with transaction.atomic(), outbox.batch():
+            for patient in chunk:
                 patient_name = patient.get_full_name()
-                if dry_run:
-                    self.stdout.write(f"    [DRY] {patient_name} — last visit: {patient.last_visit_date}")
-                    total_skipped += 1
-                    continue
-
                 try:
-                    result = send_inactive_patient_checkin(patient, clinic)
-                    if result.get('skipped'):
-                        self.stdout.write(f"    SKIP  {patient_name}: {result.get('reason')}")
-                        total_skipped += 1
-                    else:
-                        self.stdout.write(self.style.SUCCESS(f"    SENT  {patient_name}"))
-                        total_sent += 1
+                    with outbox.savepoint():
+                        result = send_inactive_patient_checkin(
+                            patient, clinic,
+                            settings_obj   = settings_obj,
+                            last_complaint = patient.last_complaint,
+                            stamp          = False,
+                        )
                 except Exception as e:
                     self.stdout.write(self.style.ERROR(f"    FAIL  {patient_name}: {e}"))
                     logger.error("Inactive check-in failed for patient %s: %s", patient.id, e)
+                    continue
 
-        self.stdout.write(f"\n  Sent: {total_sent} | Skipped: {total_skipped}\n")
+                if result.get('skipped'):
+                    self.stdout.write(f"    SKIP  {patient_name}: {result.get('reason')}")
+                    skipped += 1
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"    SENT  {patient_name}"))
+                    stamped.append(patient.id)
+                    sent += 1
+
+            if stamped:
+                Patient.objects.filter(id__in=stamped).update(last_checkin_sent_at=timezone.now())
+
+        return sent, skipped
@@ -4,10 +4,10 @@ Send no-rebook follow-ups for patients who didn't rebook after DNA/decline.
 Waits X days (configurable per clinic) before sending.
 """
 import logging
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 
 from apps.appointments.models import Appointment
@@ -33,7 +33,7 @@ class Command(BaseCommand):
             f"\n{'[DRY RUN] ' if dry_run else ''}No-Rebook Follow-up Sender"
         ))
 
-        clinic_qs = Clinic.objects.filter(main_clinic__isnull=True)
+        clinic_qs = Clinic.objects.filter(parent_clinic__isnull=True, is_deleted=False)
         if clinic_id:
             clinic_qs = clinic_qs.filter(id=clinic_id)
 
@@ -46,11 +46,23 @@ class Command(BaseCommand):
                 continue
 
             followup_days = settings_obj.no_rebook_followup_days
-            cutoff_date = (now - timedelta(days=followup_days)).date()
+            cutoff_date = timezone.localdate(now - timedelta(days=followup_days))
+            cutoff      = timezone.make_aware(datetime.combine(cutoff_date + timedelta(days=1), time.min))
 
             branch_ids = list(
-                Clinic.objects.filter(main_clinic=clinic).values_list('id', flat=True)
-            ) + [clinic.id]
+                Clinic.objects.filter(Q(id=clinic.id) | Q(parent_clinic=clinic)).values_list('id', flat=True)
+            )
+
+            # A new booking from the same patient, starting no earlier than the
+            # missed slot and made after the DNA follow-up, cancels the rebook nudge
+            rebooked = Appointment.objects.filter(
+                patient_id=OuterRef('patient_id'),
+                clinic_id__in=branch_ids,
+                is_deleted=False,
+                status__in=['SCHEDULED', 'CONFIRMED'],
+                starts_at__gte=OuterRef('starts_at'),
+                created_at__gt=OuterRef('dna_followup_sent_at'),
+            )
 
             # Find DNA/declined appointments that:
             # - Had DNA follow-up sent
@@ -61,21 +73,13 @@ class Command(BaseCommand):
                 is_deleted=False,
                 dna_followup_sent=True,
                 rebook_followup_sent=False,
-                dna_followup_sent_at__date__lte=cutoff_date,
-            ).select_related('patient', 'clinic')
+                dna_followup_sent_at__lt=cutoff,
+            ).annotate(
+                has_new=Exists(rebooked),
+            ).select_related('patient', 'clinic').order_by('starts_at')
 
             for appt in appointments:
-                # Check if patient has booked a new appointment since
-                has_new = Appointment.objects.filter(
-                    patient=appt.patient,
-                    clinic_id__in=branch_ids,
-                    is_deleted=False,
-                    status__in=['SCHEDULED', 'CONFIRMED'],
-                    date__gte=appt.date,
-                    created_at__gt=appt.dna_followup_sent_at,
-                ).exists()
-
-                if has_new:
+                if appt.has_new:
                     total_skipped += 1
                     continue
 
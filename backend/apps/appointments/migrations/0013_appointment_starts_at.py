@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:19
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 2000
+
+
+def backfill_starts_at(apps, schema_editor):
+    """starts_at = date + start_time in the clinic timezone, in batches."""
+    from datetime import datetime
+    from django.utils import timezone
+
+    Appointment = apps.get_model('appointments', 'Appointment')
+
+    pending = (
+        Appointment.objects
+        .filter(starts_at__isnull=True)
+        .only('id', 'date', 'start_time')
+        .order_by('id')
+    )
+    batch = []
+    for appt in pending.iterator(chunk_size=BATCH_SIZE):
+        appt.starts_at = timezone.make_aware(datetime.combine(appt.date, appt.start_time))
+        batch.append(appt)
+        if len(batch) >= BATCH_SIZE:
+            Appointment.objects.bulk_update(batch, ['starts_at'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['starts_at'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0012_alter_blockappointment_visibility_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_starts_at, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,23 @@
+from datetime import date as date_cls, datetime, time as time_cls
+
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
 from apps.common.models import TimeStampedModel, SoftDeleteModel
 
 
+def appointment_starts_at(date, start_time):
+    """Aware datetime for a clinic-local date + start_time (None if either is missing)."""
+    if isinstance(date, str):
+        date = parse_date(date)
+    if isinstance(start_time, str):
+        start_time = parse_time(start_time)
+    if not isinstance(date, date_cls) or not isinstance(start_time, time_cls):
+        return None
+    return timezone.make_aware(datetime.combine(date, start_time))
+
+
 class Appointment(TimeStampedModel, SoftDeleteModel):
     """Patient appointments with practitioners"""
 
@@ -97,6 +112,10 @@ class Appointment(TimeStampedModel, SoftDeleteModel):
     end_time         = models.TimeField()
     duration_minutes = models.IntegerField(default=60)
 
+    # date + start_time as one aware datetime, kept in sync by save() —
+    # lets the reminder / follow-up jobs select time windows with a range scan
+    starts_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
     chief_complaint = models.TextField(blank=True)
     notes           = models.TextField(blank=True, help_text='Internal notes')
     patient_notes   = models.TextField(blank=True, help_text='Notes from patient')
@@ -170,6 +189,11 @@ class Appointment(TimeStampedModel, SoftDeleteModel):
         # Auto-populate duration from service if not explicitly set
         if self.service and not self.duration_minutes:
             self.duration_minutes = self.service.duration_minutes
+
+        self.starts_at = appointment_starts_at(self.date, self.start_time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'start_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'starts_at'}
         super().save(*args, **kwargs)
 
     def clean(self):
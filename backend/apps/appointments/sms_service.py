@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.utils import timezone
+from apps.common.phone import to_e164
 import logging
-import re
 
 logger = logging.getLogger(__name__)
 
@@ -18,24 +18,9 @@ def _normalize_phone(phone: str) -> str | None:
     if not phone:
         return None
 
-    # Strip all non-digit characters except leading +
-    cleaned = re.sub(r'[^\d+]', '', phone.strip())
-
-    # Already in E.164
-    if cleaned.startswith('+63') and len(cleaned) == 13:
-        return cleaned
-
-    # International without +
-    if cleaned.startswith('63') and len(cleaned) == 12:
-        return f'+{cleaned}'
-
-    # Local format 09XXXXXXXXX
-    if cleaned.startswith('09') and len(cleaned) == 11:
-        return f'+63{cleaned[1:]}'
-
-    # 10-digit without prefix
-    if cleaned.startswith('9') and len(cleaned) == 10:
-        return f'+63{cleaned}'
+    e164 = to_e164(phone)
+    if e164 and e164.startswith('+63'):
+        return e164
 
     logger.warning("Could not normalize phone number: %s", phone)
     return None
@@ -80,9 +65,10 @@ def _build_sms_body(appointment) -> str:
     return '\n'.join(lines)
 
 
-def send_appointment_reminder_sms(appointment) -> tuple[bool, str]:
+def send_appointment_reminder_sms(appointment, resend: bool = False) -> tuple[bool, str]:
     """
-    Send a reminder SMS to the patient for their upcoming appointment.
+    Queue a reminder SMS to the patient for their upcoming appointment.
+    resend=True bypasses the outbox dedupe for a deliberate manual re-send.
 
     Returns:
         (success: bool, error_message: str)
@@ -93,11 +79,10 @@ def send_appointment_reminder_sms(appointment) -> tuple[bool, str]:
         logger.info(msg)
         return False, msg
 
-    # ── Guard: Twilio credentials must exist ─────────────────────────────────
-    if not all([settings.TWILIO_ACCOUNT_SID,
-                settings.TWILIO_AUTH_TOKEN,
-                settings.TWILIO_FROM_NUMBER]):
-        msg = "Twilio credentials not configured."
+    # ── Guard: the SMS backend must be configured ────────────────────────────
+    from apps.common.sms_transport import is_configured
+    if not is_configured():
+        msg = "SMS backend (Twilio credentials) not configured."
         logger.error(msg)
         return False, msg
 
@@ -121,75 +106,53 @@ def send_appointment_reminder_sms(appointment) -> tuple[bool, str]:
     # ── Build message body ────────────────────────────────────────────────────
     body = _build_sms_body(appointment)
 
-    # ── Send via Twilio ───────────────────────────────────────────────────────
-    try:
-        from twilio.rest import Client
-        from twilio.base.exceptions import TwilioRestException
-
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-
-        message = client.messages.create(
-            body = body,
-            from_= settings.TWILIO_FROM_NUMBER,
-            to   = to_number,
-        )
-
-        # ── Log to AppointmentReminder ────────────────────────────────────────
-        from apps.appointments.models import AppointmentReminder
-        AppointmentReminder.objects.create(
-            appointment   = appointment,
-            reminder_type = 'SMS',
-            is_successful = True,
-            error_message = '',
-        )
-
-        logger.info(
-            "SMS reminder sent → appointment_id=%s patient=%s phone=%s sid=%s",
-            appointment.id, patient.id, to_number, message.sid,
-        )
-        return True, ''
-
-    except Exception as e:
-        error_msg = f"Twilio error for appointment {appointment.id}: {e}"
-        logger.error(error_msg)
-
-        # ── Log failed attempt ────────────────────────────────────────────────
-        try:
-            from apps.appointments.models import AppointmentReminder
-            AppointmentReminder.objects.create(
-                appointment   = appointment,
-                reminder_type = 'SMS',
-                is_successful = False,
-                error_message = str(e),
-            )
-        except Exception:
-            pass
-
-        return False, error_msg
+    # ── Queue for the outbox (Twilio send, retries and logging) ─────────────
+    from apps.notifications.services import outbox
+    outbox.enqueue_sms(
+        clinic      = clinic,
+        patient     = patient,
+        appointment = appointment,
+        comm_type   = 'APPOINTMENT_REMINDER',
+        recipient   = to_number,
+        body        = body,
+        resend      = resend,
+    )
+
+    logger.info(
+        "SMS reminder queued → appointment_id=%s patient=%s phone=%s",
+        appointment.id, patient.id, to_number,
+    )
+    return True, ''
 
 
 def send_bulk_sms_reminders(appointments_qs) -> dict:
     """
-    Send SMS reminders for a queryset of appointments.
+    Queue SMS reminders for a queryset of appointments.
+
+    The rows are queued in one transaction, so the outbox picks them up
+    together and sends them concurrently over the shared SMS transport.
 
     Returns a summary dict: { sent, skipped, failed, errors }
     """
+    from django.db import transaction
+
     summary = {'sent': 0, 'skipped': 0, 'failed': 0, 'errors': []}
 
-    for appointment in appointments_qs:
-        success, message = send_appointment_reminder_sms(appointment)
-        if success:
-            summary['sent'] += 1
-        elif any(
-            phrase in message.lower()
-            for phrase in ['no phone', 'disabled', 'not configured', 'could not be normalized']
-        ):
-            summary['skipped'] += 1
-        else:
-            summary['failed'] += 1
-            summary['errors'].append({
-                'appointment_id': appointment.id,
-                'error': message,
-            })
+    with transaction.atomic():
+        for appointment in appointments_qs:
+            success, message = send_appointment_reminder_sms(appointment)
+            if success:
+                summary['sent'] += 1
+            elif any(
+                phrase in message.lower()
+                for phrase in ['no phone', 'disabled', 'not configured', 'could not be normalized']
+            ):
+                summary['skipped'] += 1
+            else:
+                summary['failed'] += 1
+                summary['errors'].append({
+                    'appointment_id': appointment.id,
+                    'error': message,
+                })
 
     return summary
\ No newline at end of file
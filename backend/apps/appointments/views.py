@@ -28,6 +28,7 @@ from apps.appointments.email_service import (
 from apps.appointments.sms_service import send_appointment_reminder_sms
 from apps.appointments.reminder_service import send_all_reminders, send_bulk_all_reminders
 from apps.appointments.filters import AppointmentFilter
+from apps.notifications.services.dispatcher import notification_digest
 
 import logging
 logger = logging.getLogger(__name__)
@@ -810,25 +811,26 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 if check_date.weekday() in selected_days:
                     generated_dates.append(check_date)
         
-        # Create appointments
+        # Create appointments — the series raises one digest notification
         created_appointments = []
-        for appt_date in generated_dates:
-            appointment = Appointment.objects.create(
-                clinic=clinic,
-                patient=patient,
-                practitioner=practitioner,
-                service=service,
-                appointment_type=service.name if service else 'INITIAL',
-                status='SCHEDULED',
-                date=appt_date,
-                start_time=start_time_obj,
-                end_time=end_time_obj,
-                duration_minutes=duration_minutes,
-                chief_complaint=service.name if service else '',
-                created_by=request.user,
-                updated_by=request.user,
-            )
-            created_appointments.append(appointment)
+        with notification_digest(clinic, 'booked', link_url='/diary'):
+            for appt_date in generated_dates:
+                appointment = Appointment.objects.create(
+                    clinic=clinic,
+                    patient=patient,
+                    practitioner=practitioner,
+                    service=service,
+                    appointment_type=service.name if service else 'INITIAL',
+                    status='SCHEDULED',
+                    date=appt_date,
+                    start_time=start_time_obj,
+                    end_time=end_time_obj,
+                    duration_minutes=duration_minutes,
+                    chief_complaint=service.name if service else '',
+                    created_by=request.user,
+                    updated_by=request.user,
+                )
+                created_appointments.append(appointment)
         
         # Serialize the created appointments
         serializer = AppointmentSerializer(created_appointments, many=True, context={'request': request})
@@ -961,12 +963,12 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             if not getattr(appointment.patient, 'email', None):
                 result['email'] = {'success': False, 'message': 'Patient has no email address on file.'}
             else:
-                ok, msg = send_appointment_reminder_email(appointment)
-                result['email'] = {'success': ok, 'message': msg or 'Sent successfully.'}
+                ok, msg = send_appointment_reminder_email(appointment, resend=True)
+                result['email'] = {'success': ok, 'message': msg or 'Queued for delivery.'}
 
         if channel in ['sms', 'both']:
-            ok, msg = send_appointment_reminder_sms(appointment)
-            result['sms'] = {'success': ok, 'message': msg or 'Sent successfully.'}
+            ok, msg = send_appointment_reminder_sms(appointment, resend=True)
+            result['sms'] = {'success': ok, 'message': msg or 'Queued for delivery.'}
 
         any_success = any(v.get('success') for v in result.values())
         return Response(
@@ -18,6 +18,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from apps.appointments.models import Appointment
+from apps.clinics.services.matcher import ServiceMatcher, get_service_matcher
 from .models import Invoice, InvoiceItem, InvoiceBatch
 
 logger = logging.getLogger(__name__)
@@ -58,6 +59,22 @@ def _build_appointment_qs(params: dict, target_ids: list[int]):
     return qs
 
 
+def _price_for_appointment(appt: Appointment, matcher: ServiceMatcher) -> tuple[str, Any]:
+    """
+    (description, unit_price) for the default line item — the matched clinic
+    service when there is one, otherwise the practitioner's consultation fee.
+    """
+    description = appt.get_appointment_type_display()
+    service     = matcher.best_match(description, appt.appointment_type)
+    if service:
+        return service.name, service.price
+
+    unit_price = 0
+    if appt.practitioner and hasattr(appt.practitioner, 'consultation_fee'):
+        unit_price = appt.practitioner.consultation_fee or 0
+    return description, unit_price
+
+
 def _create_invoice_for_appointment(
     appt: Appointment,
     invoice_date,
@@ -66,13 +83,10 @@ def _create_invoice_for_appointment(
     tax_percent,
     bulk_batch: InvoiceBatch,
     user,
+    matcher: ServiceMatcher,
 ) -> Invoice:
     """Create one Invoice + one default InvoiceItem for the appointment."""
-    description = appt.get_appointment_type_display()
-    unit_price  = 0
-
-    if appt.practitioner and hasattr(appt.practitioner, 'consultation_fee'):
-        unit_price = appt.practitioner.consultation_fee or 0
+    description, unit_price = _price_for_appointment(appt, matcher)
 
     invoice = Invoice.objects.create(
         clinic           = appt.clinic,
@@ -116,6 +130,7 @@ def preview_bulk_invoice(params: dict, user, main_clinic) -> dict:
 
     appt_qs            = _build_appointment_qs(params, target_ids)
     total_appointments = appt_qs.count()
+    matcher            = get_service_matcher(main_clinic)
 
     preview = [
         {
@@ -130,12 +145,7 @@ def preview_bulk_invoice(params: dict, user, main_clinic) -> dict:
                 if a.practitioner else 'Unassigned'
             ),
             'appointment_type':        a.get_appointment_type_display(),
-            'estimated_unit_price':    (
-                float(a.practitioner.consultation_fee)
-                if a.practitioner and hasattr(a.practitioner, 'consultation_fee')
-                   and a.practitioner.consultation_fee
-                else 0
-            ),
+            'estimated_unit_price':    float(_price_for_appointment(a, matcher)[1]),
         }
         for a in appt_qs[:100]
     ]
@@ -163,6 +173,7 @@ def run_bulk_invoice(params: dict, user, main_clinic) -> InvoiceBatch:
     due_date         = params.get('due_date')
     discount_percent = params.get('discount_percent', 0)
     tax_percent      = params.get('tax_percent', 0)
+    matcher          = get_service_matcher(main_clinic)
 
     batch = InvoiceBatch.objects.create(
         clinic             = main_clinic,
@@ -196,6 +207,7 @@ def run_bulk_invoice(params: dict, user, main_clinic) -> InvoiceBatch:
                     tax_percent      = tax_percent,
                     bulk_batch       = batch,
                     user             = user,
+                    matcher          = matcher,
                 )
                 total_invoiced += float(invoice.total_amount)
                 created += 1
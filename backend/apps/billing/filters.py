@@ -41,6 +41,7 @@ class InvoiceFilter(django_filters.FilterSet):
     patient_name   = django_filters.CharFilter(method='filter_patient_name')
     status         = django_filters.MultipleChoiceFilter(choices=Invoice.STATUS_CHOICES)
     appointment    = django_filters.NumberFilter(field_name='appointment__id')
+    patient        = django_filters.NumberFilter(field_name='patient__id')
 
     def filter_patient_name(self, queryset, name, value):
         return queryset.filter(
@@ -50,7 +51,7 @@ class InvoiceFilter(django_filters.FilterSet):
 
     class Meta:
         model  = Invoice
-        fields = ['date_from', 'date_to', 'clinic', 'status', 'patient_name', 'bulk_batch', 'appointment']
+        fields = ['date_from', 'date_to', 'clinic', 'status', 'patient', 'patient_name', 'bulk_batch', 'appointment']
 
 
 class InvoiceBatchFilter(django_filters.FilterSet):
@@ -0,0 +1,302 @@
+"""
+Receivables Ledger Service
+==========================
+Maintains ReceivablesLedger rows and answers finance questions from them.
+
+Invoice and Payment saves call mark_dirty(clinic_id, day); the touched
+(clinic, month) buckets are recomputed once the surrounding transaction
+commits. A bucket refresh only aggregates one clinic-month of invoices and
+payments, so its cost does not grow with invoice history.
+
+Public API
+----------
+mark_dirty(clinic_id, day)  →  None
+refresh_month(clinic_id, month)  →  ReceivablesLedger
+rebuild_ledger(clinic_ids=None)  →  int
+ledger_totals(clinic_ids, date_from=None, date_to=None)  →  dict
+covers_whole_months(date_from, date_to)  →  bool
+aging_report(clinic_ids, as_of=None)  →  dict
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Invoice, Payment, ReceivablesLedger
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('PENDING', 'PARTIALLY_PAID', 'OVERDUE')
+
+AGING_BUCKETS = [
+    ('0_30',     0,   30),
+    ('31_60',    31,  60),
+    ('61_90',    61,  90),
+    ('90_plus',  91,  None),
+]
+
+_pending = threading.local()
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+def month_start(day) -> date:
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def covers_whole_months(date_from: date, date_to: date) -> bool:
+    """True when [date_from, date_to] starts on a 1st and ends on a month's last day."""
+    return (
+        date_from.day == 1
+        and date_to == _next_month(month_start(date_to)) - timedelta(days=1)
+        and date_from <= date_to
+    )
+
+
+def _flush_pending():
+    keys = getattr(_pending, 'keys', None)
+    if not keys:
+        return
+    _pending.keys = set()
+    for clinic_id, month in sorted(keys):
+        try:
+            refresh_month(clinic_id, month)
+        except Exception as exc:
+            logger.error("Ledger refresh failed for clinic %s %s: %s", clinic_id, month, exc)
+
+
+def _dec(value) -> str:
+    return str(value or Decimal('0'))
+
+
+# ── public API ────────────────────────────────────────────────────────────────
+
+def mark_dirty(clinic_id, day) -> None:
+    """
+    Queue the (clinic, month) bucket containing `day` for a refresh on commit.
+    Keys are de-duplicated, so a burst of saves in one transaction refreshes
+    each bucket once. Keys left behind by a rolled-back transaction are picked
+    up by the next flush — refreshes are idempotent, so that is harmless.
+    """
+    if not clinic_id or not day:
+        return
+    keys = getattr(_pending, 'keys', None)
+    if keys is None:
+        keys = _pending.keys = set()
+    keys.add((clinic_id, month_start(day)))
+    transaction.on_commit(_flush_pending)
+
+
+def refresh_month(clinic_id: int, month: date) -> ReceivablesLedger:
+    """Recompute one ledger row from that clinic-month's invoices and payments."""
+    month = month_start(month)
+    nxt   = _next_month(month)
+
+    invoices = Invoice.objects.filter(
+        clinic_id=clinic_id,
+        is_deleted=False,
+        invoice_date__gte=month,
+        invoice_date__lt=nxt,
+    )
+    inv = invoices.aggregate(
+        count       = Count('id'),
+        invoiced    = Sum('total_amount'),
+        paid        = Sum('amount_paid'),
+        balance     = Sum('balance_due'),
+        outstanding = Sum('balance_due', filter=Q(status__in=OPEN_STATUSES)),
+        open_count  = Count('id', filter=Q(status__in=OPEN_STATUSES, balance_due__gt=0)),
+        philhealth  = Sum('philhealth_coverage'),
+        hmo         = Sum('hmo_coverage'),
+    )
+    by_status = {
+        row['status']: {
+            'count':   row['count'],
+            'total':   _dec(row['total']),
+            'paid':    _dec(row['paid']),
+            'balance': _dec(row['balance']),
+        }
+        for row in invoices.values('status').annotate(
+            count=Count('id'), total=Sum('total_amount'),
+            paid=Sum('amount_paid'), balance=Sum('balance_due'),
+        ).order_by('status')
+    }
+
+    payments = Payment.objects.filter(
+        invoice__clinic_id=clinic_id,
+        payment_date__gte=month,
+        payment_date__lt=nxt,
+    )
+    paid_by_method = {
+        row['payment_method']: {'count': row['count'], 'total': _dec(row['total'])}
+        for row in payments.values('payment_method').annotate(
+            count=Count('id'), total=Sum('amount'),
+        ).order_by('payment_method')
+    }
+
+    row, _ = ReceivablesLedger.objects.update_or_create(
+        clinic_id = clinic_id,
+        month     = month,
+        defaults  = {
+            'invoice_count':      inv['count'] or 0,
+            'invoiced_total':     inv['invoiced'] or 0,
+            'invoice_paid_total': inv['paid'] or 0,
+            'balance_total':      inv['balance'] or 0,
+            'outstanding_total':  inv['outstanding'] or 0,
+            'outstanding_count':  inv['open_count'] or 0,
+            'philhealth_total':   inv['philhealth'] or 0,
+            'hmo_total':          inv['hmo'] or 0,
+            'by_status':          by_status,
+            'payment_count':      sum(m['count'] for m in paid_by_method.values()),
+            'paid_total':         sum(Decimal(m['total']) for m in paid_by_method.values()),
+            'paid_by_method':     paid_by_method,
+        },
+    )
+    return row
+
+
+def rebuild_ledger(clinic_ids=None) -> int:
+    """Recompute every bucket that has invoices or payments. Returns rows refreshed."""
+    invoices = Invoice.objects.filter(is_deleted=False)
+    payments = Payment.objects.all()
+    if clinic_ids is not None:
+        invoices = invoices.filter(clinic_id__in=clinic_ids)
+        payments = payments.filter(invoice__clinic_id__in=clinic_ids)
+
+    keys = set(
+        invoices.annotate(month=TruncMonth('invoice_date'))
+        .values_list('clinic_id', 'month').distinct()
+    ) | set(
+        payments.annotate(month=TruncMonth('payment_date'))
+        .values_list('invoice__clinic_id', 'month').distinct()
+    )
+
+    existing = ReceivablesLedger.objects.all()
+    if clinic_ids is not None:
+        existing = existing.filter(clinic_id__in=clinic_ids)
+    stale_ids = [
+        row_id for row_id, clinic_id, month
+        in existing.values_list('id', 'clinic_id', 'month')
+        if (clinic_id, month) not in keys
+    ]
+    ReceivablesLedger.objects.filter(id__in=stale_ids).delete()
+
+    for clinic_id, month in sorted(keys):
+        refresh_month(clinic_id, month)
+    return len(keys)
+
+
+def ledger_totals(clinic_ids, date_from: date | None = None, date_to: date | None = None) -> dict:
+    """
+    Sum ledger rows for the given clinics and (whole) months.
+    Shape matches InvoiceViewSet.stats plus payment/coverage totals.
+    """
+    rows = ReceivablesLedger.objects.filter(clinic_id__in=clinic_ids)
+    if date_from:
+        rows = rows.filter(month__gte=month_start(date_from))
+    if date_to:
+        rows = rows.filter(month__lte=month_start(date_to))
+
+    totals = {
+        'total_invoiced':    Decimal('0'),
+        'total_paid':        Decimal('0'),
+        'total_balance':     Decimal('0'),
+        'outstanding':       Decimal('0'),
+        'philhealth':        Decimal('0'),
+        'hmo':               Decimal('0'),
+        'payments_received': Decimal('0'),
+        'count':             0,
+        'payment_count':     0,
+    }
+    by_status: dict[str, dict] = {}
+    by_method: dict[str, dict] = {}
+
+    for row in rows:
+        totals['total_invoiced']    += row.invoiced_total
+        totals['total_paid']        += row.invoice_paid_total
+        totals['total_balance']     += row.balance_total
+        totals['outstanding']       += row.outstanding_total
+        totals['philhealth']        += row.philhealth_total
+        totals['hmo']               += row.hmo_total
+        totals['payments_received'] += row.paid_total
+        totals['count']             += row.invoice_count
+        totals['payment_count']     += row.payment_count
+
+        for status, data in row.by_status.items():
+            agg = by_status.setdefault(status, {'count': 0, 'total': Decimal('0')})
+            agg['count'] += data['count']
+            agg['total'] += Decimal(data['total'])
+        for method, data in row.paid_by_method.items():
+            agg = by_method.setdefault(method, {'count': 0, 'total': Decimal('0')})
+            agg['count'] += data['count']
+            agg['total'] += Decimal(data['total'])
+
+    totals['by_status'] = [
+        {'status': s, 'count': d['count'], 'total': d['total']}
+        for s, d in sorted(by_status.items())
+    ]
+    totals['by_payment_method'] = [
+        {'payment_method': m, 'count': d['count'], 'total': d['total']}
+        for m, d in sorted(by_method.items())
+    ]
+    return totals
+
+
+def aging_report(clinic_ids, as_of: date | None = None) -> dict:
+    """
+    Outstanding balance on open invoices by age (days since invoice_date).
+
+    Months that ended more than 90 days ago fall wholly in the 90+ bucket and
+    are read from the ledger. Only the remaining recent months are scanned
+    invoice by invoice, using the partial open-invoice index.
+    """
+    from django.utils import timezone
+
+    as_of      = as_of or timezone.now().date()
+    scan_from  = month_start(as_of - timedelta(days=90))
+
+    buckets = {key: {'count': 0, 'amount': Decimal('0')} for key, _, _ in AGING_BUCKETS}
+
+    old = ReceivablesLedger.objects.filter(
+        clinic_id__in=clinic_ids, month__lt=scan_from,
+    ).aggregate(amount=Sum('outstanding_total'), count=Sum('outstanding_count'))
+    buckets['90_plus']['amount'] += old['amount'] or Decimal('0')
+    buckets['90_plus']['count']  += old['count'] or 0
+
+    recent = Invoice.objects.filter(
+        clinic_id__in=clinic_ids,
+        is_deleted=False,
+        balance_due__gt=0,
+        status__in=OPEN_STATUSES,
+        invoice_date__gte=scan_from,
+        invoice_date__lte=as_of,
+    ).values_list('invoice_date', 'balance_due')
+
+    for invoice_date, balance in recent.iterator(chunk_size=2000):
+        age = (as_of - invoice_date).days
+        for key, low, high in AGING_BUCKETS:
+            if age >= low and (high is None or age <= high):
+                buckets[key]['count']  += 1
+                buckets[key]['amount'] += balance
+                break
+
+    return {
+        'as_of':             str(as_of),
+        'total_outstanding': sum(b['amount'] for b in buckets.values()),
+        'total_count':       sum(b['count'] for b in buckets.values()),
+        'buckets':           [
+            {'bucket': key, 'min_days': low, 'max_days': high, **buckets[key]}
+            for key, low, high in AGING_BUCKETS
+        ],
+    }
@@ -0,0 +1,44 @@
+"""
+Recompute the monthly receivables ledger from invoices and payments.
+
+The ledger is kept current by Invoice/Payment saves; run this after bulk
+data fixes done with raw SQL or queryset.update(), or to verify totals.
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+
+from apps.billing.ledger_service import rebuild_ledger
+from apps.clinics.models import Clinic
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-clinic monthly receivables ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clinic-id', type=int, default=None,
+            help='Rebuild only this clinic and its branches.',
+        )
+
+    def handle(self, *args, **options):
+        clinic_id = options['clinic_id']
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nReceivables Ledger Rebuild"))
+
+        clinic_ids = None
+        if clinic_id:
+            clinic = Clinic.objects.filter(pk=clinic_id).first()
+            if not clinic:
+                self.stdout.write(self.style.ERROR(f"  Clinic {clinic_id} not found."))
+                return
+            clinic_ids = list(
+                clinic.main_clinic.get_all_branches().values_list('id', flat=True)
+            )
+
+        refreshed = rebuild_ledger(clinic_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"  Refreshed {refreshed} clinic-month row(s)."))
+        logger.info("Receivables ledger rebuilt: %s rows (clinic=%s)", refreshed, clinic_id or 'all')
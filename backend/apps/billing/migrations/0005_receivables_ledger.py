@@ -0,0 +1,127 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+OPEN_STATUSES = ('PENDING', 'PARTIALLY_PAID', 'OVERDUE')
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Seed one ledger row per (clinic, month) from existing invoices/payments
+    with grouped aggregates. Same numbers as ledger_service.refresh_month().
+    """
+    from decimal import Decimal
+    from django.db.models import Count, Q, Sum
+    from django.db.models.functions import TruncMonth
+
+    Invoice           = apps.get_model('billing', 'Invoice')
+    Payment           = apps.get_model('billing', 'Payment')
+    ReceivablesLedger = apps.get_model('billing', 'ReceivablesLedger')
+
+    rows = {}
+
+    def row(clinic_id, month):
+        return rows.setdefault((clinic_id, month), ReceivablesLedger(
+            clinic_id=clinic_id, month=month, by_status={}, paid_by_method={},
+        ))
+
+    invoices = (
+        Invoice.objects.filter(is_deleted=False)
+        .annotate(month=TruncMonth('invoice_date'))
+    )
+    for r in invoices.values('clinic_id', 'month').annotate(
+        count       = Count('id'),
+        invoiced    = Sum('total_amount'),
+        paid        = Sum('amount_paid'),
+        balance     = Sum('balance_due'),
+        outstanding = Sum('balance_due', filter=Q(status__in=OPEN_STATUSES)),
+        open_count  = Count('id', filter=Q(status__in=OPEN_STATUSES, balance_due__gt=0)),
+        philhealth  = Sum('philhealth_coverage'),
+        hmo         = Sum('hmo_coverage'),
+    ).order_by():
+        ledger = row(r['clinic_id'], r['month'])
+        ledger.invoice_count      = r['count'] or 0
+        ledger.invoiced_total     = r['invoiced'] or 0
+        ledger.invoice_paid_total = r['paid'] or 0
+        ledger.balance_total      = r['balance'] or 0
+        ledger.outstanding_total  = r['outstanding'] or 0
+        ledger.outstanding_count  = r['open_count'] or 0
+        ledger.philhealth_total   = r['philhealth'] or 0
+        ledger.hmo_total          = r['hmo'] or 0
+
+    for r in invoices.values('clinic_id', 'month', 'status').annotate(
+        count=Count('id'), total=Sum('total_amount'),
+        paid=Sum('amount_paid'), balance=Sum('balance_due'),
+    ).order_by():
+        row(r['clinic_id'], r['month']).by_status[r['status']] = {
+            'count':   r['count'],
+            'total':   str(r['total'] or Decimal('0')),
+            'paid':    str(r['paid'] or Decimal('0')),
+            'balance': str(r['balance'] or Decimal('0')),
+        }
+
+    payments = Payment.objects.annotate(month=TruncMonth('payment_date'))
+    for r in payments.values('invoice__clinic_id', 'month', 'payment_method').annotate(
+        count=Count('id'), total=Sum('amount'),
+    ).order_by():
+        ledger = row(r['invoice__clinic_id'], r['month'])
+        ledger.paid_by_method[r['payment_method']] = {
+            'count': r['count'],
+            'total': str(r['total'] or Decimal('0')),
+        }
+        ledger.payment_count = (ledger.payment_count or 0) + r['count']
+        ledger.paid_total    = Decimal(str(ledger.paid_total or 0)) + (r['total'] or 0)
+
+    ReceivablesLedger.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_payment_bank_name'),
+        ('clinics', '0013_cliniccommunicationsettings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivablesLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('invoiced_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('outstanding_total', models.DecimalField(decimal_places=2, default=0, help_text='Balance due on open (PENDING / PARTIALLY_PAID / OVERDUE) invoices', max_digits=14)),
+                ('outstanding_count', models.PositiveIntegerField(default=0)),
+                ('philhealth_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('hmo_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('by_status', models.JSONField(default=dict)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_by_method', models.JSONField(default=dict)),
+            ],
+            options={
+                'db_table': 'receivables_ledger',
+                'ordering': ['clinic', 'month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('balance_due__gt', 0), ('is_deleted', False)), fields=['clinic', 'invoice_date'], name='invoices_open_clinic_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='receivablesledger',
+            name='clinic',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receivables_ledger', to='clinics.clinic'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='receivablesledger',
+            unique_together={('clinic', 'month')},
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
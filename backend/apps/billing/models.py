@@ -141,11 +141,35 @@ class Invoice(TimeStampedModel, SoftDeleteModel):
             models.Index(fields=['patient', 'invoice_date']),
             models.Index(fields=['invoice_number']),
             models.Index(fields=['status']),
+            # Open-invoice scan for the aging report
+            models.Index(
+                fields=['clinic', 'invoice_date'],
+                name='invoices_open_clinic_date_idx',
+                condition=models.Q(balance_due__gt=0, is_deleted=False),
+            ),
         ]
 
     def __str__(self):
         return f"Invoice {self.invoice_number} — {self.patient.get_full_name()} — {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember where this invoice sat in the ledger before any edits
+        instance._ledger_key = (
+            instance.__dict__.get('clinic_id'), instance.__dict__.get('invoice_date'),
+        )
+        return instance
+
+    def mark_ledger_dirty(self):
+        """Queue a ledger refresh for this invoice's month (and its old month if moved)."""
+        from .ledger_service import mark_dirty
+
+        old_clinic_id, old_date = getattr(self, '_ledger_key', (None, None))
+        mark_dirty(old_clinic_id, old_date)
+        mark_dirty(self.clinic_id, self.invoice_date)
+        self._ledger_key = (self.clinic_id, self.invoice_date)
+
     def save(self, *args, **kwargs):
         # ── Auto-generate invoice number ──────────────────────────────────────
         if not self.invoice_number:
@@ -166,6 +190,25 @@ class Invoice(TimeStampedModel, SoftDeleteModel):
 
             self.invoice_number = f"INV-{date_str}-{new_num:04d}"
 
+        self._apply_balance_and_status()
+        super().save(*args, **kwargs)
+        self.mark_ledger_dirty()
+
+    def delete(self, *args, **kwargs):
+        # The cascade removes payments without Payment.delete(), so queue the
+        # invoice month and every payment month before the rows are gone
+        from .ledger_service import mark_dirty
+
+        clinic_id     = self.clinic_id
+        invoice_date  = self.invoice_date
+        payment_dates = set(self.payments.values_list('payment_date', flat=True))
+        result = super().delete(*args, **kwargs)
+        mark_dirty(clinic_id, invoice_date)
+        for payment_date in payment_dates:
+            mark_dirty(clinic_id, payment_date)
+        return result
+
+    def _apply_balance_and_status(self):
         # ── Recalculate balance for THIS invoice only ─────────────────────────
         total        = Decimal(str(self.total_amount or 0))
         paid         = Decimal(str(self.amount_paid or 0))
@@ -183,17 +226,9 @@ class Invoice(TimeStampedModel, SoftDeleteModel):
                 self.status = 'PARTIALLY_PAID'
             # Leave DRAFT/PENDING as-is if nothing is paid yet
 
-        super().save(*args, **kwargs)
-
-    def update_totals(self):
-        """
-        Recalculate subtotal/total from THIS invoice's line items only.
-        Never touches other invoices.
-        """
-        items = self.items.all()
-
-        # Sum item totals (each item already computed qty * price - discount + tax)
-        subtotal = sum(Decimal(str(item.total)) for item in items)
+    def _apply_item_subtotal(self, subtotal):
+        """Set subtotal, invoice-level discount/tax and total from an item subtotal."""
+        subtotal      = Decimal(str(subtotal or 0))
         self.subtotal = subtotal
 
         # Apply invoice-level discount
@@ -214,9 +249,63 @@ class Invoice(TimeStampedModel, SoftDeleteModel):
 
         self.total_amount = discounted + self.tax_amount
 
+    def update_totals(self):
+        """
+        Recalculate subtotal/total from THIS invoice's line items only.
+        Never touches other invoices.
+        """
+        # Sum item totals (each item already computed qty * price - discount + tax)
+        self._apply_item_subtotal(
+            self.items.aggregate(total=models.Sum('total'))['total']
+        )
+
         # save() will recalculate balance_due and status automatically
         self.save()
 
+    def update_totals_if_changed(self) -> bool:
+        """
+        update_totals() for read paths (print, download-pdf): saves only when
+        the recalculated totals differ, so updated_at — and with it the
+        cached PDF — stays put. Returns True if the invoice was saved.
+        """
+        fields = ('subtotal', 'discount_amount', 'tax_amount', 'total_amount', 'balance_due', 'status')
+        before = [getattr(self, name) for name in fields]
+
+        self._apply_item_subtotal(
+            self.items.aggregate(total=models.Sum('total'))['total']
+        )
+        self._apply_balance_and_status()
+        if [getattr(self, name) for name in fields] == before:
+            return False
+
+        self.save()
+        return True
+
+    def recalculate_totals(self):
+        """
+        Same result as update_totals(), written with one scoped UPDATE instead
+        of save() — no invoice-number logic, no post_save signals. Used after
+        bulk item changes where the invoice row itself is otherwise untouched.
+        """
+        from django.utils import timezone
+
+        self._apply_item_subtotal(
+            self.items.aggregate(total=models.Sum('total'))['total']
+        )
+        self._apply_balance_and_status()
+        self.updated_at = timezone.now()
+
+        Invoice.objects.filter(pk=self.pk).update(
+            subtotal        = self.subtotal,
+            discount_amount = self.discount_amount,
+            tax_amount      = self.tax_amount,
+            total_amount    = self.total_amount,
+            balance_due     = self.balance_due,
+            status          = self.status,
+            updated_at      = self.updated_at,
+        )
+        self.mark_ledger_dirty()
+
     def recalculate_amount_paid(self):
         """
         Sum payments for THIS invoice only and update amount_paid + balance_due.
@@ -253,6 +342,7 @@ class Invoice(TimeStampedModel, SoftDeleteModel):
         )
         # Refresh local instance to match DB
         self.refresh_from_db()
+        self.mark_ledger_dirty()
 
 
 class InvoiceItem(TimeStampedModel):
@@ -283,7 +373,8 @@ class InvoiceItem(TimeStampedModel):
     def __str__(self):
         return f"{self.description} — {self.invoice.invoice_number}"
 
-    def save(self, *args, **kwargs):
+    def compute_total(self):
+        """Set self.total from qty/price/discount/tax. Also used before bulk_create/bulk_update."""
         quantity         = Decimal(str(self.quantity or 0))
         unit_price       = Decimal(str(self.unit_price or 0))
         discount_percent = Decimal(str(self.discount_percent or 0))
@@ -294,6 +385,9 @@ class InvoiceItem(TimeStampedModel):
         after_discount = subtotal - discount
         tax            = after_discount * (tax_percent / Decimal('100'))
         self.total     = after_discount + tax
+
+    def save(self, *args, **kwargs):
+        self.compute_total()
         super().save(*args, **kwargs)
         # Callers must call invoice.update_totals() explicitly after bulk item ops
 
@@ -361,6 +455,12 @@ class Payment(TimeStampedModel):
     def __str__(self):
         return f"Payment {self.receipt_number} — ₱{self.amount} for {self.invoice.invoice_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._ledger_date = instance.__dict__.get('payment_date')
+        return instance
+
     def save(self, *args, **kwargs):
         # ── Auto-generate receipt number ──────────────────────────────────────
         if not self.receipt_number:
@@ -388,17 +488,72 @@ class Payment(TimeStampedModel):
         invoice = Invoice.objects.get(pk=self.invoice_id)
         invoice.recalculate_amount_paid()
 
+        # ── Payments are bucketed by payment_date in the ledger ───────────────
+        from .ledger_service import mark_dirty
+        mark_dirty(invoice.clinic_id, getattr(self, '_ledger_date', None))
+        mark_dirty(invoice.clinic_id, self.payment_date)
+        self._ledger_date = self.payment_date
+
     def delete(self, *args, **kwargs):
-        invoice_id = self.invoice_id
+        from .ledger_service import mark_dirty
+
+        invoice_id   = self.invoice_id
+        payment_date = self.payment_date
         super().delete(*args, **kwargs)
         # ── Recalculate ONLY the invoice this payment belonged to ─────────────
         try:
             invoice = Invoice.objects.get(pk=invoice_id)
             invoice.recalculate_amount_paid()
+            mark_dirty(invoice.clinic_id, payment_date)
         except Invoice.DoesNotExist:
             pass
 
 
+class ReceivablesLedger(TimeStampedModel):
+    """
+    Per-clinic, per-month receivables totals.
+
+    Invoice-side columns are bucketed by invoice_date, payment-side columns by
+    payment_date. Each row is recomputed from its month's invoices/payments
+    whenever one of them changes (see ledger_service), so dashboards read a
+    handful of rows instead of aggregating the whole invoice history.
+    """
+
+    clinic = models.ForeignKey(
+        'clinics.Clinic',
+        on_delete=models.CASCADE,
+        related_name='receivables_ledger',
+    )
+    month = models.DateField(help_text='First day of the month')
+
+    # ── Invoice side (by invoice_date, soft-deleted invoices excluded) ────────
+    invoice_count       = models.PositiveIntegerField(default=0)
+    invoiced_total      = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_paid_total  = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance_total       = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    outstanding_total   = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+        help_text='Balance due on open (PENDING / PARTIALLY_PAID / OVERDUE) invoices',
+    )
+    outstanding_count   = models.PositiveIntegerField(default=0)
+    philhealth_total    = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    hmo_total           = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    by_status           = models.JSONField(default=dict)
+
+    # ── Payment side (by payment_date) ────────────────────────────────────────
+    payment_count       = models.PositiveIntegerField(default=0)
+    paid_total          = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_by_method      = models.JSONField(default=dict)
+
+    class Meta:
+        db_table        = 'receivables_ledger'
+        ordering        = ['clinic', 'month']
+        unique_together = [('clinic', 'month')]
+
+    def __str__(self):
+        return f"Ledger {self.clinic_id} {self.month:%Y-%m} — invoiced ₱{self.invoiced_total}"
+
+
 class Service(TimeStampedModel):
     """Service catalog for billing"""
 
@@ -0,0 +1,211 @@
+"""
+Invoice PDF Export Service
+==========================
+Renders invoices to PDF and streams many of them as a single ZIP archive,
+so HMO / statement runs don't need one download-pdf call per invoice.
+
+Rendered PDFs are cached per invoice revision — any change to the invoice
+(items, payments, status) or to the clinic's print settings produces a new
+cache key, so stale documents are never served.
+
+Public API
+----------
+build_invoice_context(invoice, print_settings)  →  dict
+get_cached_invoice_pdf(invoice, print_settings)  →  bytes | None
+render_invoice_pdf(invoice, print_settings)  →  bytes
+stream_invoice_zip(invoices)  →  iterator of bytes
+"""
+from __future__ import annotations
+
+import io
+import logging
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .models import Invoice, InvoicePrintSettings
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_TIMEOUT  = getattr(settings, 'INVOICE_PDF_CACHE_TIMEOUT', 60 * 60 * 24)
+EXPORT_MAX_WORKERS = getattr(settings, 'INVOICE_PDF_EXPORT_WORKERS', 4)
+
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+def build_invoice_context(invoice: Invoice, print_settings: InvoicePrintSettings) -> dict:
+    """Template context for billing/invoice_print.html (same as download-pdf)."""
+    items    = list(invoice.items.all().order_by('id'))
+    payments = invoice.payments.all().order_by('-payment_date')
+
+    computed_subtotal    = sum(
+        Decimal(str(item.quantity)) * Decimal(str(item.unit_price)) for item in items
+    )
+    computed_items_total = sum(Decimal(str(item.total)) for item in items)
+    discount_amount      = Decimal(str(invoice.discount_amount or 0))
+    tax_amount           = Decimal(str(invoice.tax_amount or 0))
+    amount_paid          = Decimal(str(invoice.amount_paid or 0))
+    computed_total       = computed_items_total - discount_amount + tax_amount
+    computed_balance_due = max(computed_total - amount_paid, Decimal('0'))
+
+    return {
+        'invoice':              invoice,
+        'items':                items,
+        'payments':             payments,
+        'settings':             print_settings,
+        'clinic_display_name':  print_settings.clinic_name or invoice.clinic.name,
+        'date_format':          'F j, Y',
+        'has_discounts':        any(item.discount_percent > 0 for item in items),
+        'has_taxes':            any(item.tax_percent > 0 for item in items),
+        'currency':             print_settings.currency_symbol or '₱',
+        'computed_subtotal':    f'{computed_subtotal:,.2f}',
+        'computed_total':       f'{computed_total:,.2f}',
+        'computed_balance_due': f'{computed_balance_due:,.2f}',
+    }
+
+
+def _pdf_cache_key(invoice: Invoice, print_settings: InvoicePrintSettings) -> str:
+    """
+    Cache key for one rendered revision of an invoice.
+    status/amount_paid are included because mark_paid() and update-status
+    use queryset.update(), which does not bump updated_at.
+    """
+    settings_ts = print_settings.updated_at.timestamp() if print_settings.pk else 0
+    return 'invoice_pdf:{}:{}:{}:{}:{}'.format(
+        invoice.pk,
+        invoice.updated_at.timestamp(),
+        invoice.status,
+        invoice.amount_paid,
+        settings_ts,
+    )
+
+
+def _write_pdf(html_string: str) -> bytes:
+    from weasyprint import HTML
+
+    pdf_file = io.BytesIO()
+    HTML(string=html_string).write_pdf(pdf_file)
+    return pdf_file.getvalue()
+
+
+def _render_job(job: tuple[str, str, str]) -> tuple[str, bytes, str]:
+    """Thread-pool worker — pure HTML → PDF, no DB access."""
+    filename, cache_key, html_string = job
+    try:
+        pdf = _write_pdf(html_string)
+    except Exception as exc:
+        logger.warning("PDF render failed for %s, exporting HTML instead: %s", filename, exc)
+        return f'{filename}.html', html_string.encode('utf-8'), ''
+    cache.set(cache_key, pdf, PDF_CACHE_TIMEOUT)
+    return f'{filename}.pdf', pdf, cache_key
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    Write-only, non-seekable sink for ZipFile.
+    ZipFile falls back to data descriptors on unseekable streams, so each
+    member can be flushed to the client as soon as it is written.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# ── public API ────────────────────────────────────────────────────────────────
+
+def get_cached_invoice_pdf(invoice: Invoice, print_settings: InvoicePrintSettings) -> bytes | None:
+    """Return the cached PDF for this invoice revision, if one was rendered."""
+    return cache.get(_pdf_cache_key(invoice, print_settings))
+
+
+def render_invoice_pdf(invoice: Invoice, print_settings: InvoicePrintSettings) -> bytes:
+    """
+    Return PDF bytes for one invoice, rendering and caching on a miss.
+    Raises whatever WeasyPrint raises — callers decide on the fallback.
+    """
+    cache_key = _pdf_cache_key(invoice, print_settings)
+    pdf = cache.get(cache_key)
+    if pdf is None:
+        html_string = render_to_string(
+            'billing/invoice_print.html', build_invoice_context(invoice, print_settings),
+        )
+        pdf = _write_pdf(html_string)
+        cache.set(cache_key, pdf, PDF_CACHE_TIMEOUT)
+    return pdf
+
+
+def stream_invoice_zip(invoices: Iterable[Invoice]) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of invoice PDFs chunk by chunk.
+
+    Cached PDFs are written straight through; the rest are rendered in a
+    thread pool, EXPORT_MAX_WORKERS at a time so that at most one window of
+    documents is held in memory. Templates are rendered on the calling thread
+    (DB access stays on the request connection); only WeasyPrint runs in the
+    workers. Invoices that fail to render are exported as HTML, matching the
+    download-pdf fallback.
+    """
+    settings_by_clinic: dict[int, InvoicePrintSettings] = {}
+    buffer = _ZipStreamBuffer()
+    window = max(EXPORT_MAX_WORKERS, 1) * 2
+
+    with ThreadPoolExecutor(max_workers=max(EXPORT_MAX_WORKERS, 1)) as executor, \
+            zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+
+        pending: list[tuple[str, str, str]] = []
+
+        def flush_pending():
+            for name, content, _ in executor.map(_render_job, pending):
+                archive.writestr(name, content)
+            pending.clear()
+
+        for invoice in invoices:
+            print_settings = settings_by_clinic.get(invoice.clinic_id)
+            if print_settings is None:
+                print_settings = InvoicePrintSettings.get_for_clinic(invoice.clinic)
+                settings_by_clinic[invoice.clinic_id] = print_settings
+
+            filename  = f'Invoice_{invoice.invoice_number}'
+            cache_key = _pdf_cache_key(invoice, print_settings)
+            cached    = cache.get(cache_key)
+
+            if cached is not None:
+                archive.writestr(f'{filename}.pdf', cached)
+            else:
+                html_string = render_to_string(
+                    'billing/invoice_print.html',
+                    build_invoice_context(invoice, print_settings),
+                )
+                pending.append((filename, cache_key, html_string))
+                if len(pending) >= window:
+                    flush_pending()
+
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+
+        if pending:
+            flush_pending()
+
+    # Central directory is written when the archive closes
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
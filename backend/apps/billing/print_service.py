@@ -2,8 +2,28 @@
 Helpers for the Print Appointments feature.
 Builds a structured, print-ready data payload from a filtered
 Appointment queryset — no PDF generation at this layer.
+
+build_print_payload()  — whole payload as one dict (small ranges)
+iter_print_ndjson()    — streamed rows + trailing summary, one JSON per line
+iter_print_csv()       — streamed rows as CSV, summary appended at the end
+build_print_summary()  — grouped counts only, for the paginated UI mode
 """
-from django.db.models import QuerySet, Count
+import csv
+import io
+import json
+
+from django.db.models import Count, Exists, OuterRef, QuerySet
+
+STREAM_CHUNK_SIZE = 500
+
+CSV_COLUMNS = [
+    'id', 'date', 'start_time', 'end_time', 'duration_minutes',
+    'status', 'status_display', 'appointment_type', 'appointment_type_display',
+    'patient_id', 'patient_name', 'patient_number',
+    'practitioner_id', 'practitioner_name',
+    'clinic_id', 'clinic_name', 'location_name',
+    'chief_complaint', 'has_invoice',
+]
 
 
 def build_print_payload(queryset: QuerySet) -> dict:
@@ -11,12 +31,21 @@ def build_print_payload(queryset: QuerySet) -> dict:
     Given a filtered & ordered Appointment queryset, return a
     dict that the frontend can use to render / print the list.
     """
-    appointments = []
-    for appt in queryset.select_related(
-        'patient', 'practitioner__user', 'clinic', 'location'
-    ):
-        appointments.append(_serialize_appointment(appt))
+    appointments = [
+        serialize_print_row(appt)
+        for appt in with_invoice_flag(queryset.select_related(
+            'patient', 'practitioner__user', 'clinic', 'location'
+        ))
+    ]
+
+    return {
+        **build_print_summary(queryset),
+        'appointments': appointments,
+    }
+
 
+def build_print_summary(queryset: QuerySet) -> dict:
+    """Grouped counts by status / practitioner / branch for a filtered queryset."""
     status_counts = (
         queryset.values('status')
         .annotate(count=Count('id'))
@@ -45,21 +74,119 @@ def build_print_payload(queryset: QuerySet) -> dict:
     by_branch = {row['clinic__name']: row['count'] for row in branch_counts}
 
     return {
-        'total':            queryset.count(),
+        'total':            sum(by_status.values()),
         'by_status':        by_status,
         'by_practitioner':  by_practitioner,
         'by_branch':        by_branch,
-        'appointments':     appointments,
     }
 
 
-def _serialize_appointment(appt) -> dict:
+def with_invoice_flag(queryset: QuerySet) -> QuerySet:
+    """Annotate has_invoice so rows don't need one EXISTS query each."""
+    from .models import Invoice
+
+    return queryset.annotate(
+        has_invoice_flag=Exists(
+            Invoice.objects.filter(appointment=OuterRef('pk'), is_deleted=False)
+        )
+    )
+
+
+class PrintSummary:
+    """Accumulates the payload summaries while rows stream past."""
+
+    def __init__(self):
+        self.total           = 0
+        self.by_status       = {}
+        self.by_practitioner = {}
+        self.by_branch       = {}
+
+    def add(self, row: dict):
+        self.total += 1
+        self.by_status[row['status']] = self.by_status.get(row['status'], 0) + 1
+        name = row['practitioner_name'] or 'Unassigned'
+        self.by_practitioner[name] = self.by_practitioner.get(name, 0) + 1
+        branch = row['clinic_name'] or None
+        self.by_branch[branch] = self.by_branch.get(branch, 0) + 1
+
+    def as_dict(self) -> dict:
+        # Same ordering as build_print_summary()
+        return {
+            'total':           self.total,
+            'by_status':       dict(sorted(self.by_status.items())),
+            'by_practitioner': dict(sorted(
+                self.by_practitioner.items(), key=lambda kv: -kv[1],
+            )),
+            'by_branch':       dict(sorted(
+                self.by_branch.items(), key=lambda kv: (kv[0] is None, kv[0] or ''),
+            )),
+        }
+
+
+def iter_print_rows(queryset: QuerySet, summary: PrintSummary):
+    """
+    Yield serialized rows straight off a server-side cursor, feeding
+    `summary` as they go — nothing is materialized beyond one chunk.
+    """
+    qs = with_invoice_flag(
+        queryset.select_related('patient', 'practitioner__user', 'clinic', 'location')
+        .prefetch_related(None)
+    )
+    for appt in qs.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        row = serialize_print_row(appt)
+        summary.add(row)
+        yield row
+
+
+def iter_print_ndjson(queryset: QuerySet):
+    """
+    NDJSON stream: one {"type": "appointment", ...} line per row, then a
+    final {"type": "summary", ...} line computed in the same pass.
+    """
+    summary = PrintSummary()
+    for row in iter_print_rows(queryset, summary):
+        yield json.dumps({'type': 'appointment', **row}) + '\n'
+    yield json.dumps({'type': 'summary', **summary.as_dict()}) + '\n'
+
+
+def iter_print_csv(queryset: QuerySet):
+    """CSV stream: header, one line per row, then the summary as trailing rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    summary = PrintSummary()
+    for row in iter_print_rows(queryset, summary):
+        writer.writerow([row[col] for col in CSV_COLUMNS])
+        yield flush()
+
+    totals = summary.as_dict()
+    writer.writerow([])
+    writer.writerow(['Summary'])
+    writer.writerow(['Total', totals['total']])
+    for group, label in (('by_status', 'Status'), ('by_practitioner', 'Practitioner'), ('by_branch', 'Branch')):
+        for key, count in totals[group].items():
+            writer.writerow([label, key or '', count])
+    yield flush()
+
+
+def serialize_print_row(appt) -> dict:
     """Flat dict for a single appointment row."""
     practitioner_name = 'Unassigned'
     if appt.practitioner and appt.practitioner.user:
         practitioner_name = appt.practitioner.user.get_full_name()
 
-    has_invoice = appt.billing_invoices.filter(is_deleted=False).exists()
+    has_invoice = getattr(appt, 'has_invoice_flag', None)
+    if has_invoice is None:
+        has_invoice = appt.billing_invoices.filter(is_deleted=False).exists()
 
     return {
         'id':               appt.id,
@@ -21,6 +21,36 @@ class InvoiceItemWriteSerializer(serializers.ModelSerializer):
         fields = ['id', 'description', 'quantity', 'unit_price', 'discount_percent', 'tax_percent', 'service_code']
 
 
+class InvoiceItemPatchSerializer(serializers.Serializer):
+    """One partial update in a bulk-items request — only `id` is required."""
+    id               = serializers.IntegerField()
+    description      = serializers.CharField(max_length=500, required=False)
+    quantity         = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    unit_price       = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    discount_percent = serializers.DecimalField(max_digits=5,  decimal_places=2, required=False)
+    tax_percent      = serializers.DecimalField(max_digits=5,  decimal_places=2, required=False)
+    service_code     = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
+class InvoiceItemBulkSerializer(serializers.Serializer):
+    """Payload for POST /api/invoices/{id}/bulk-items/."""
+    create = InvoiceItemWriteSerializer(many=True, required=False, default=list)
+    update = InvoiceItemPatchSerializer(many=True, required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        update_ids = [row['id'] for row in attrs['update']]
+        if len(update_ids) != len(set(update_ids)):
+            raise serializers.ValidationError({'update': 'Each item may only be updated once.'})
+        if set(update_ids) & set(attrs['delete']):
+            raise serializers.ValidationError(
+                {'delete': 'An item cannot be updated and deleted in the same request.'}
+            )
+        if not (attrs['create'] or attrs['update'] or attrs['delete']):
+            raise serializers.ValidationError('Nothing to do — provide create, update or delete.')
+        return attrs
+
+
 class InvoiceSerializer(serializers.ModelSerializer):
     patient_name     = serializers.CharField(source='patient.get_full_name', read_only=True)
     patient_number   = serializers.CharField(source='patient.patient_number', read_only=True)
@@ -1,3 +1,155 @@
+import asyncio
+import io
+import zipfile
+from datetime import date, time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import User
+from apps.appointments.models import Appointment
+from apps.billing import pdf_export_service, views
+from apps.billing.models import Invoice
+from apps.clinics.models import Clinic
+from apps.patients.models import Patient
+
+
+class AsgiStreamingTests(TestCase):
+    """Exports must stream under ASGI, not collect the whole body before sending."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = Clinic.objects.create(name='Main Clinic')
+        cls.user   = User.objects.create_user(
+            email='billing@example.com', password='pw12345678',
+            first_name='Bill', last_name='Ing', clinic=cls.clinic,
+        )
+        patient = Patient.objects.create(
+            clinic=cls.clinic, first_name='Ana', last_name='Cruz',
+            date_of_birth=date(1990, 1, 1), gender='F', phone='09171234567',
+            address='1 Street', city='City', province='Province',
+            emergency_contact_name='Ben', emergency_contact_phone='09170000000',
+            emergency_contact_relationship='Sibling',
+        )
+        for _ in range(6):
+            Invoice.objects.create(clinic=cls.clinic, patient=patient, invoice_date=date(2026, 3, 1))
+
+    def _get(self, path: str, events: list) -> list[dict]:
+        """Run one GET through Django's ASGI handler and return the sent messages."""
+        scope = {
+            'type':         'http',
+            'asgi':         {'version': '3.0'},
+            'http_version': '1.1',
+            'method':       'GET',
+            'scheme':       'http',
+            'path':         path,
+            'raw_path':     path.encode(),
+            'query_string': b'',
+            'headers':      [
+                (b'host', b'testserver'),
+                (b'authorization', f'Bearer {AccessToken.for_user(self.user)}'.encode()),
+            ],
+            'server':       ('testserver', 80),
+            'client':       ('127.0.0.1', 50000),
+        }
+        messages = []
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()        # the client never disconnects
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                events.append('sent')
+            messages.append(message)
+
+        # Keep the test transaction's connection open, as the test client does
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            async_to_sync(ASGIHandler())(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+        return messages
+
+    def test_zip_chunks_are_sent_while_the_archive_is_being_built(self):
+        events = []
+        original = views.stream_invoice_zip
+
+        def tracked(invoices):
+            for chunk in original(invoices):
+                events.append('produced')
+                yield chunk
+
+        with mock.patch.object(views, 'stream_invoice_zip', tracked), \
+                mock.patch.object(pdf_export_service, '_write_pdf', return_value=b'%PDF-1.4 test'), \
+                mock.patch.object(pdf_export_service, 'EXPORT_MAX_WORKERS', 1):
+            messages = self._get('/api/invoices/export-pdfs/', events)
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertGreater(events.count('produced'), 1)
+        # A buffered response would only start sending after the last chunk
+        self.assertLess(events.index('sent'), len(events) - 1 - events[::-1].index('produced'))
+
+        body = b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(len(archive.namelist()), 6)
+
+    def test_print_export_streams_rows_under_asgi(self):
+        patient = Patient.objects.get()
+        Appointment.objects.bulk_create([
+            Appointment(clinic=self.clinic, patient=patient, date=date(2026, 3, day),
+                        start_time=time(9), end_time=time(10))
+            for day in range(1, 11)
+        ])
+        events = []
+        original = views.iter_print_ndjson
+
+        def tracked(qs):
+            for line in original(qs):
+                events.append('produced')
+                yield line
+
+        with mock.patch.object(views, 'iter_print_ndjson', tracked), \
+                mock.patch.object(views, 'STREAM_MIN_CHUNK', 1):
+            messages = self._get('/api/appointments-print/export/', events)
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertLess(events.index('sent'), len(events) - 1 - events[::-1].index('produced'))
+        lines = b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body').splitlines()
+        self.assertEqual(len(lines), 11)      # 10 rows + summary
+
+
+class UpdateTotalsIfChangedTests(TestCase):
+    """download-pdf recalculates totals; an unchanged invoice must keep its PDF cache key."""
+
+    def test_unchanged_invoice_is_not_saved(self):
+        clinic  = Clinic.objects.create(name='Main Clinic')
+        patient = Patient.objects.create(
+            clinic=clinic, first_name='Ana', last_name='Cruz',
+            date_of_birth=date(1990, 1, 1), gender='F', phone='09171234567',
+            address='1 Street', city='City', province='Province',
+            emergency_contact_name='Ben', emergency_contact_phone='09170000000',
+            emergency_contact_relationship='Sibling',
+        )
+        invoice = Invoice.objects.create(clinic=clinic, patient=patient, invoice_date=date(2026, 3, 1))
+        invoice = Invoice.objects.get(pk=invoice.pk)
+        stamp   = invoice.updated_at
+
+        self.assertFalse(invoice.update_totals_if_changed())
+        self.assertEqual(Invoice.objects.get(pk=invoice.pk).updated_at, stamp)
 
-# Create your tests here.
+        Invoice.objects.filter(pk=invoice.pk).update(total_amount=50)
+        invoice = Invoice.objects.get(pk=invoice.pk)
+        self.assertTrue(invoice.update_totals_if_changed())
+        self.assertEqual(Invoice.objects.get(pk=invoice.pk).total_amount, 0)
@@ -8,26 +8,37 @@ from django.template.response import TemplateResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from apps.appointments.models import Appointment
+from apps.common.streaming import STREAM_MIN_CHUNK, aiter_chunks
 from .authentication import QueryParamJWTAuthentication
 from .bulk_invoice_service import preview_bulk_invoice, run_bulk_invoice
 from .filters import AppointmentPrintFilter, InvoiceBatchFilter, InvoiceFilter
 from .models import Invoice, InvoiceItem, InvoiceBatch, InvoicePrintSettings, Payment, Service
-from .print_service import build_print_payload
+from .ledger_service import aging_report, ledger_totals
+from .pdf_export_service import render_invoice_pdf, stream_invoice_zip
+from .print_service import (
+    build_print_payload,
+    build_print_summary,
+    iter_print_csv,
+    iter_print_ndjson,
+    serialize_print_row,
+    with_invoice_flag,
+)
 from .serializers import (
     AppointmentPrintSerializer,
     BulkInvoiceRequestSerializer,
     InvoiceBatchSerializer,
     InvoiceCreateSerializer,
+    InvoiceItemBulkSerializer,
     InvoiceItemSerializer,
     InvoiceSerializer,
     PaymentSerializer,
     ServiceSerializer,
 )
-from io import BytesIO
 
 logger = logging.getLogger(__name__)
 
@@ -163,36 +174,15 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                             service_code     = item_data.get('service_code', ''),
                         )
                 else:
-                    from apps.clinics.services.models import Service as ClinicService
+                    from apps.clinics.services.matcher import get_service_matcher
 
                     description = appt.get_appointment_type_display()
                     unit_price  = Decimal('0')
 
-                    main_clinic    = clinic.main_clinic if hasattr(clinic, 'main_clinic') else clinic
-                    all_branch_ids = list(
-                        main_clinic.get_all_branches().values_list('id', flat=True)
-                    )
-
-                    service_qs = ClinicService.objects.filter(
-                        clinic_id__in=all_branch_ids,
-                        is_active=True,
-                        is_deleted=False,
-                    )
-
-                    matching_service = (
-                        service_qs.filter(name__iexact=description).first()
-                        or service_qs.filter(name__icontains=description).first()
-                        or service_qs.filter(name__icontains=appt.appointment_type).first()
-                        or service_qs.filter(name__iexact=appt.appointment_type).first()
+                    matching_service = get_service_matcher(clinic).best_match(
+                        description, appt.appointment_type,
                     )
 
-                    # Word-by-word fallback
-                    if not matching_service:
-                        for word in [w for w in description.split() if len(w) > 3]:
-                            matching_service = service_qs.filter(name__icontains=word).first()
-                            if matching_service:
-                                break
-
                     if matching_service:
                         description = matching_service.name
                         unit_price  = Decimal(str(matching_service.price))
@@ -315,6 +305,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         else:
             # Scoped update — only this invoice's row
             Invoice.objects.filter(pk=invoice.pk).update(status=new_status)
+            invoice.mark_ledger_dirty()
 
         logger.info(
             "Invoice %s (pk=%s) status → %s by %s",
@@ -360,6 +351,77 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         fresh = Invoice.objects.get(pk=invoice.pk)
         return Response(InvoiceSerializer(fresh).data, status=status.HTTP_201_CREATED)
 
+    # ── Bulk line-item changes ────────────────────────────────────────────────
+    @action(detail=True, methods=['post'], url_path='bulk-items', url_name='bulk-items')
+    def bulk_items(self, request, pk=None):
+        """
+        POST /api/invoices/{id}/bulk-items/
+        { "create": [...], "update": [{"id": 1, ...}], "delete": [2, 3] }
+        Applies all item changes in one transaction, then recalculates the
+        invoice totals once.
+        """
+        from django.utils import timezone
+
+        invoice = self.get_object()
+
+        ser = InvoiceItemBulkSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        data = ser.validated_data
+
+        with transaction.atomic():
+            touched_ids = {row['id'] for row in data['update']} | set(data['delete'])
+            existing    = {
+                item.id: item
+                for item in InvoiceItem.objects.select_for_update().filter(
+                    invoice=invoice, id__in=touched_ids,
+                )
+            }
+            missing = sorted(touched_ids - existing.keys())
+            if missing:
+                return Response(
+                    {'detail': f'Items not found on this invoice: {missing}'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            if data['delete']:
+                InvoiceItem.objects.filter(invoice=invoice, id__in=data['delete']).delete()
+
+            updated_fields = set()
+            to_update      = []
+            for row in data['update']:
+                item = existing[row['id']]
+                for field, value in row.items():
+                    if field != 'id':
+                        setattr(item, field, value)
+                        updated_fields.add(field)
+                item.compute_total()
+                item.updated_at = timezone.now()  # bulk_update skips auto_now
+                to_update.append(item)
+            if to_update:
+                InvoiceItem.objects.bulk_update(
+                    to_update, sorted(updated_fields | {'total', 'updated_at'}),
+                )
+
+            to_create = []
+            for row in data['create']:
+                row = {k: v for k, v in row.items() if k != 'id'}
+                item = InvoiceItem(invoice=invoice, **row)
+                item.compute_total()
+                to_create.append(item)
+            if to_create:
+                InvoiceItem.objects.bulk_create(to_create)
+
+            invoice.recalculate_totals()
+
+        logger.info(
+            "Invoice %s bulk items: created=%s updated=%s deleted=%s by %s",
+            invoice.invoice_number, len(data['create']), len(data['update']),
+            len(data['delete']), request.user.email,
+        )
+
+        fresh = self.get_queryset().get(pk=invoice.pk)
+        return Response(InvoiceSerializer(fresh).data)
+
     # ── Print invoice (HTML) ──────────────────────────────────────────────────
     @action(
         detail=True,
@@ -447,67 +509,26 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         try:
             # Try to generate PDF using WeasyPrint
             try:
-                from weasyprint import HTML
-                
-                # Force recalculate totals from items to ensure accuracy
-                invoice.update_totals()
-                invoice = Invoice.objects.get(pk=invoice.pk)
-                items    = list(invoice.items.all().order_by('id'))
-                payments = invoice.payments.all().order_by('-payment_date')
-
-                print_settings      = InvoicePrintSettings.get_for_clinic(invoice.clinic)
-                clinic_display_name = print_settings.clinic_name or invoice.clinic.name
-
-                date_format = print_settings.date_format or '%B %d, %Y'
-                template_date_format = 'F j, Y'
-
-                has_discounts = any(item.discount_percent > 0 for item in items)
-                has_taxes     = any(item.tax_percent > 0 for item in items)
-                currency      = print_settings.currency_symbol or '₱'
-
-                computed_subtotal    = sum(
-                    Decimal(str(item.quantity)) * Decimal(str(item.unit_price)) for item in items
-                )
-                computed_items_total = sum(Decimal(str(item.total)) for item in items)
-                discount_amount      = Decimal(str(invoice.discount_amount or 0))
-                tax_amount           = Decimal(str(invoice.tax_amount or 0))
-                amount_paid          = Decimal(str(invoice.amount_paid or 0))
-                computed_total       = computed_items_total - discount_amount + tax_amount
-                computed_balance_due = max(computed_total - amount_paid, Decimal('0'))
-
-                context = {
-                    'invoice':              invoice,
-                    'items':                items,
-                    'payments':             payments,
-                    'settings':             print_settings,
-                    'clinic_display_name':  clinic_display_name,
-                    'date_format':          template_date_format,
-                    'has_discounts':        has_discounts,
-                    'has_taxes':            has_taxes,
-                    'currency':             currency,
-                    'computed_subtotal':    f'{computed_subtotal:,.2f}',
-                    'computed_total':       f'{computed_total:,.2f}',
-                    'computed_balance_due': f'{computed_balance_due:,.2f}',
-                }
+                # Recalculate totals from items; saves only if they were stale,
+                # so an unchanged invoice keeps its cached PDF
+                if invoice.update_totals_if_changed():
+                    invoice = Invoice.objects.get(pk=invoice.pk)
 
-                html_string = render_to_string('billing/invoice_print.html', context)
-                pdf_file = BytesIO()
-                html = HTML(string=html_string)
-                html.write_pdf(pdf_file)
-                pdf_file.seek(0)
+                print_settings = InvoicePrintSettings.get_for_clinic(invoice.clinic)
+                pdf_content    = render_invoice_pdf(invoice, print_settings)
 
-                response = HttpResponse(pdf_file.getvalue(), content_type='application/pdf')
+                response = HttpResponse(pdf_content, content_type='application/pdf')
                 response['Content-Disposition'] = f'attachment; filename="Invoice_{invoice.invoice_number}.pdf"'
                 logger.info(f"Generated PDF for invoice #{invoice.invoice_number}")
                 return response
-                
+
             except Exception as pdf_err:
                 # Fall back to HTML
                 logger.warning(f"PDF generation failed for invoice #{invoice.invoice_number}, falling back to HTML: {pdf_err}")
                 
                 # Build context for HTML
-                invoice.update_totals()
-                invoice = Invoice.objects.get(pk=invoice.pk)
+                if invoice.update_totals_if_changed():
+                    invoice = Invoice.objects.get(pk=invoice.pk)
                 items    = list(invoice.items.all().order_by('id'))
                 payments = invoice.payments.all().order_by('-payment_date')
 
@@ -549,6 +570,57 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    # ── Export many invoices as a streamed ZIP of PDFs ────────────────────────
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='export-pdfs',
+        url_name='export-pdfs',
+        authentication_classes=[QueryParamJWTAuthentication],
+    )
+    def export_pdfs(self, request):
+        """
+        GET /api/invoices/export-pdfs/?date_from=&date_to=&bulk_batch=&status=&patient=
+        Streams every matching invoice as a PDF inside one ZIP archive.
+        Accepts the same filters as the invoice list.
+        """
+        from django.conf import settings
+        from django.http import StreamingHttpResponse
+        from django.utils import timezone
+
+        max_invoices = getattr(settings, 'INVOICE_PDF_EXPORT_MAX', 500)
+
+        qs    = self.filter_queryset(self.get_queryset())
+        count = qs.count()
+        if count == 0:
+            return Response(
+                {'detail': 'No invoices match the given filters.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if count > max_invoices:
+            return Response(
+                {'detail': f'Too many invoices ({count}). Narrow the filters to at most {max_invoices}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        invoices = (
+            qs.select_related('appointment__practitioner__user')
+            .prefetch_related(None)
+            .iterator(chunk_size=100)
+        )
+
+        logger.info(
+            "Exporting %s invoice PDFs as ZIP for %s", count, request.user.email,
+        )
+
+        # Async iterator, so daphne sends each ZIP chunk as it is written
+        response = StreamingHttpResponse(
+            aiter_chunks(stream_invoice_zip(invoices)), content_type='application/zip',
+        )
+        filename = f"Invoices_{timezone.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     # ── Send invoice via email ─────────────────────────────────────────────────
     @action(
         detail=True,
@@ -559,6 +631,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     def send_email(self, request, pk=None):
         """POST /api/invoices/{id}/send-email/ — Send invoice PDF via email."""
         from django.core.mail import EmailMessage
+        from apps.common.mail_transport import send_message
         from django.conf import settings
         from io import BytesIO
 
@@ -721,7 +794,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                         mimetype='text/html'
                     )
             
-            email.send(fail_silently=False)
+            send_message(email)
 
             logger.info(f"Invoice #{invoice.invoice_number} sent to {to_email}")
 
@@ -739,8 +812,28 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             )
 
     # ── Stats ─────────────────────────────────────────────────────────────────
+    def _has_list_filters(self, request):
+        params = set(request.query_params)
+        return bool(
+            params & (set(InvoiceFilter.base_filters) | {'search', 'appointment'})
+        )
+
     @action(detail=False, methods=['get'], url_path='stats', url_name='stats')
     def stats(self, request):
+        # Unfiltered dashboard stats come from the receivables ledger
+        if request.user.clinic and not self._has_list_filters(request):
+            all_branch_ids = list(
+                request.user.clinic.main_clinic.get_all_branches().values_list('id', flat=True)
+            )
+            totals = ledger_totals(all_branch_ids)
+            return Response({
+                'total_invoiced': totals['total_invoiced'],
+                'total_paid':     totals['total_paid'],
+                'total_balance':  totals['total_balance'],
+                'count':          totals['count'],
+                'by_status':      totals['by_status'],
+            })
+
         qs  = self.filter_queryset(self.get_queryset())
         agg = qs.aggregate(
             total_invoiced = Sum('total_amount'),
@@ -764,6 +857,50 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             ],
         })
 
+    # ── Aged receivables ──────────────────────────────────────────────────────
+    @action(detail=False, methods=['get'], url_path='aging', url_name='aging')
+    def aging(self, request):
+        """
+        GET /api/invoices/aging/?as_of=YYYY-MM-DD&clinic=<branch id>
+        Open balances in 0–30 / 31–60 / 61–90 / 90+ day buckets.
+        """
+        from datetime import date as date_type
+
+        user = request.user
+        if not user.clinic:
+            return Response(
+                {'detail': 'User has no clinic assigned.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        all_branch_ids = list(
+            user.clinic.main_clinic.get_all_branches().values_list('id', flat=True)
+        )
+        clinic_ids = all_branch_ids
+        branch_id  = request.query_params.get('clinic')
+        if branch_id:
+            try:
+                bid = int(branch_id)
+            except (ValueError, TypeError):
+                bid = None
+            if bid not in all_branch_ids:
+                return Response(
+                    {'detail': 'Invalid clinic.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            clinic_ids = [bid]
+
+        as_of_str = request.query_params.get('as_of')
+        try:
+            as_of = date_type.fromisoformat(as_of_str) if as_of_str else None
+        except ValueError:
+            return Response(
+                {'detail': 'Invalid date format. Use YYYY-MM-DD.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(aging_report(clinic_ids, as_of=as_of))
+
 
 # ── Invoice Item ──────────────────────────────────────────────────────────────
 
@@ -883,6 +1020,20 @@ class InvoiceBatchViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ── Print Appointments ────────────────────────────────────────────────────────
 
+class PrintPayloadPagination(PageNumberPagination):
+    page_size             = 100
+    page_size_query_param = 'page_size'
+    max_page_size         = 500
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count':    self.page.paginator.count,
+            'next':     self.get_next_link(),
+            'previous': self.get_previous_link(),
+            **data,
+        })
+
+
 class AppointmentPrintViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class   = AppointmentPrintSerializer
     permission_classes = [IsAuthenticated]
@@ -927,8 +1078,56 @@ class AppointmentPrintViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='payload')
     def payload(self, request):
+        """
+        GET /api/appointments-print/payload/
+        Whole payload in one document. With ?page= (and optional ?page_size=)
+        returns one page of rows plus the summaries, for the UI.
+        """
+        qs = self.filter_queryset(self.get_queryset())
+
+        if 'page' not in request.query_params:
+            return Response(build_print_payload(qs))
+
+        paginator = PrintPayloadPagination()
+        page      = paginator.paginate_queryset(with_invoice_flag(qs.prefetch_related(None)), request, view=self)
+        return paginator.get_paginated_response({
+            'summary':      build_print_summary(qs),
+            'appointments': [serialize_print_row(appt) for appt in page],
+        })
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        GET /api/appointments-print/export/?output=ndjson|csv
+        Streams every matching row from a server-side cursor; summaries are
+        computed in the same pass (last NDJSON line / trailing CSV rows).
+        """
+        from django.http import StreamingHttpResponse
+        from django.utils import timezone
+
+        output = request.query_params.get('output', 'ndjson').lower()
+        if output not in ('ndjson', 'csv'):
+            return Response(
+                {'detail': "output must be 'ndjson' or 'csv'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         qs = self.filter_queryset(self.get_queryset())
-        return Response(build_print_payload(qs))
+
+        # Async iterators, so daphne sends rows as the cursor produces them
+        # instead of collecting the whole export first
+        if output == 'csv':
+            response = StreamingHttpResponse(
+                aiter_chunks(iter_print_csv(qs), min_size=STREAM_MIN_CHUNK), content_type='text/csv',
+            )
+            filename = f"Appointments_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        else:
+            response = StreamingHttpResponse(
+                aiter_chunks(iter_print_ndjson(qs), min_size=STREAM_MIN_CHUNK),
+                content_type='application/x-ndjson',
+            )
+        return response
 
 
 
@@ -6,6 +6,7 @@ from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.core.mail import EmailMultiAlternatives
+from apps.common.mail_transport import send_message
 from django.conf import settings
 from django.template.loader import render_to_string
 from .models import ClinicalTemplate, ClinicalNote, ClinicalNoteAuditLog
@@ -416,7 +417,7 @@ class ClinicalNoteViewSet(viewsets.ModelViewSet):
                         attachment_bytes,
                         'application/pdf',
                     )
-                email_msg.send(fail_silently=True)
+                send_message(email_msg)
             except Exception:
                 pass
 
@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class ClinicServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.clinics.services'
-    label = 'clinic_services'   # ← unique label avoids clash with billing's 'services'
\ No newline at end of file
+    label = 'clinic_services'   # ← unique label avoids clash with billing's 'services'
+
+    def ready(self):
+        # Invalidate the service matcher when the catalog changes
+        from apps.clinics.services.signals import connect_signals
+        connect_signals()
@@ -0,0 +1,220 @@
+"""
+In-process matcher for clinic services.
+
+Used to auto-price invoices from an appointment's description when no line
+items are given (create-from-appointment, bulk invoicing). The active
+services of a clinic family are loaded once into a small token index and
+kept per process. Each lookup compares a cheap database fingerprint of the
+family's catalog (branch ids, service count, latest updated_at) with the
+one the index was built from, so an edit saved by any process — web
+worker, cron command, workflow runner child — is picked up on the next
+lookup.
+
+    matcher = get_service_matcher(clinic)
+    service = matcher.best_match('Initial Consultation', 'INITIAL')
+
+Scoring (highest wins, ties broken by sort_order, name, id):
+    exact name            100
+    name starts with query / query starts with name   80
+    name contains query   60
+    token overlap         up to 50 (share of query words found in the name)
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Count, Max
+
+SCORE_EXACT     = 100
+SCORE_PREFIX    = 80
+SCORE_CONTAINS  = 60
+SCORE_TOKEN_MAX = 50
+
+MIN_TOKEN_LENGTH = 4          # same cut-off as the old word-by-word fallback
+
+_local_matchers: dict[int, tuple[tuple, 'ServiceMatcher']] = {}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    return ' '.join(_TOKEN_RE.findall((text or '').lower()))
+
+
+def tokenize(text: str) -> set[str]:
+    return {t for t in _TOKEN_RE.findall((text or '').lower()) if len(t) >= MIN_TOKEN_LENGTH}
+
+
+@dataclass(frozen=True)
+class ServiceEntry:
+    id:         int
+    name:       str
+    price:      Decimal
+    sort_order: int
+    normalized: str
+    tokens:     frozenset
+
+
+@dataclass(frozen=True)
+class ServiceMatch:
+    service: ServiceEntry
+    score:   int
+    reason:  str
+
+
+class ServiceMatcher:
+    """Immutable index over one clinic family's active services."""
+
+    def __init__(self, entries: list[ServiceEntry]):
+        self.entries = sorted(entries, key=lambda e: (e.sort_order, e.name, e.id))
+        self._rank   = {e.id: i for i, e in enumerate(self.entries)}
+        self._by_name: dict[str, ServiceEntry] = {}
+        self._by_token: dict[str, list[ServiceEntry]] = {}
+        for entry in self.entries:
+            self._by_name.setdefault(entry.normalized, entry)
+            for token in entry.tokens:
+                self._by_token.setdefault(token, []).append(entry)
+
+    @classmethod
+    def from_services(cls, services) -> 'ServiceMatcher':
+        """
+        Build from Service instances or dicts with id/name/price/sort_order.
+        Services whose name has no letters or digits are left out — an empty
+        name would prefix-match every description.
+        """
+        entries = []
+        for s in services:
+            if not isinstance(s, dict):
+                s = {'id': s.id, 'name': s.name, 'price': s.price, 'sort_order': s.sort_order}
+            normalized = normalize(s['name'])
+            if not normalized:
+                continue
+            entries.append(ServiceEntry(
+                id         = s['id'],
+                name       = s['name'],
+                price      = Decimal(str(s['price'] or 0)),
+                sort_order = s['sort_order'] or 0,
+                normalized = normalized,
+                tokens     = frozenset(tokenize(s['name'])),
+            ))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _score(self, entry: ServiceEntry, query: str, query_tokens: set[str]) -> tuple[int, str]:
+        if not query:
+            return 0, ''
+        if entry.normalized == query:
+            return SCORE_EXACT, 'exact'
+        if entry.normalized.startswith(query) or query.startswith(entry.normalized):
+            return SCORE_PREFIX, 'prefix'
+        if query in entry.normalized:
+            return SCORE_CONTAINS, 'contains'
+        if query_tokens:
+            # A query word also counts when it is part of a longer word in the
+            # name ("therapy" → "Physiotherapy"), like the old icontains fallback.
+            overlap = sum(
+                1 for t in query_tokens if t in entry.tokens or t in entry.normalized
+            )
+            if overlap:
+                return max(1, SCORE_TOKEN_MAX * overlap // len(query_tokens)), 'tokens'
+        return 0, ''
+
+    def matches(self, *queries: str) -> list[ServiceMatch]:
+        """
+        All services scoring above zero for any of the queries, best first.
+        Each service keeps its best score across the queries.
+        """
+        best: dict[int, ServiceMatch] = {}
+        for raw in queries:
+            query        = normalize(raw)
+            query_tokens = tokenize(raw)
+            if not query:
+                continue
+
+            # Exact hit is a dict lookup; everything else only needs the
+            # candidates that share a token, plus a substring/prefix pass.
+            candidates = {}
+            exact = self._by_name.get(query)
+            if exact:
+                candidates[exact.id] = exact
+            for token in query_tokens:
+                for entry in self._by_token.get(token, ()):
+                    candidates[entry.id] = entry
+            for entry in self.entries:
+                if entry.id not in candidates and (
+                    query in entry.normalized
+                    or query.startswith(entry.normalized)
+                    or any(t in entry.normalized for t in query_tokens)
+                ):
+                    candidates[entry.id] = entry
+
+            for entry in candidates.values():
+                score, reason = self._score(entry, query, query_tokens)
+                if score and (entry.id not in best or score > best[entry.id].score):
+                    best[entry.id] = ServiceMatch(entry, score, reason)
+
+        return sorted(best.values(), key=lambda m: (-m.score, self._rank[m.service.id]))
+
+    def best_match(self, *queries: str) -> ServiceEntry | None:
+        found = self.matches(*queries)
+        return found[0].service if found else None
+
+
+# ── Per-clinic cache ──────────────────────────────────────────────────────────
+
+def _family_id(clinic) -> int:
+    main = clinic.main_clinic if hasattr(clinic, 'main_clinic') else clinic
+    return main.id
+
+
+def _fingerprint(branch_ids: list[int]) -> tuple:
+    """
+    Changes whenever the family's catalog does: a service saved or
+    soft-deleted (updated_at), hard-deleted or added (count), or a branch
+    added to or removed from the family (branch ids).
+    """
+    from .models import Service
+
+    stats = Service.objects.filter(clinic_id__in=branch_ids).aggregate(
+        total=Count('id'), changed=Max('updated_at'),
+    )
+    return tuple(branch_ids), stats['total'], stats['changed']
+
+
+def invalidate_service_matcher(clinic) -> None:
+    """
+    Drop this process's matcher for the clinic family. Other processes see
+    the change through the catalog fingerprint on their next lookup.
+    """
+    _local_matchers.pop(_family_id(clinic), None)
+
+
+def get_service_matcher(clinic) -> ServiceMatcher:
+    """
+    Return the matcher for the clinic's whole family (main + branches).
+    Rebuilt with one query when a service in the family has changed.
+    """
+    from .models import Service
+
+    family_id      = _family_id(clinic)
+    main           = clinic.main_clinic if hasattr(clinic, 'main_clinic') else clinic
+    all_branch_ids = sorted(main.get_all_branches().values_list('id', flat=True))
+    fingerprint    = _fingerprint(all_branch_ids)
+
+    cached = _local_matchers.get(family_id)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    services = Service.objects.filter(
+        clinic_id__in=all_branch_ids,
+        is_active=True,
+        is_deleted=False,
+    ).values('id', 'name', 'price', 'sort_order')
+
+    matcher = ServiceMatcher.from_services(services)
+    _local_matchers[family_id] = (fingerprint, matcher)
+    return matcher
@@ -0,0 +1,26 @@
+"""
+Keeps the clinic service matcher in sync with the catalog.
+Connected in apps.py → ready().
+"""
+from django.db.models.signals import post_delete, post_save
+
+
+def connect_signals():
+    """
+    Called from ClinicServicesConfig.ready().
+    Deferred import prevents AppRegistryNotReady errors.
+    """
+    from apps.clinics.models import Clinic
+    from .matcher import invalidate_service_matcher
+    from .models import Service
+
+    def on_service_changed(sender, instance, **kwargs):
+        invalidate_service_matcher(instance.clinic)
+
+    def on_clinic_changed(sender, instance, **kwargs):
+        # Adding, removing or deactivating a branch changes the family's services
+        invalidate_service_matcher(instance)
+
+    post_save.connect(on_service_changed,   sender=Service, weak=False, dispatch_uid='service_matcher_save')
+    post_delete.connect(on_service_changed, sender=Service, weak=False, dispatch_uid='service_matcher_delete')
+    post_save.connect(on_clinic_changed,    sender=Clinic,  weak=False, dispatch_uid='service_matcher_clinic')
@@ -0,0 +1,211 @@
+"""
+Email rendering.
+
+Every patient email is a .txt / .html template pair rendered against the
+message fields plus the clinic's branding (name, phone, email, address,
+logo URL). Sending 5 000 reminders used to resolve both templates and
+rebuild the branding — including the logo URL from storage — 5 000 times.
+This module does that work once:
+
+    from apps.common.email_rendering import clinic_branding, render_email, render_batch
+
+    context     = {**clinic_branding(clinic), 'patient_first_name': 'Ana', …}
+    text, html  = render_email('appointments/email/reminder', context)
+    results     = render_batch('appointments/email/reminder', contexts)   # one RenderResult each
+
+  • compiled templates are kept per template prefix for the life of the
+    process, so a render is just Template.render() — except with DEBUG on,
+    where every lookup goes through the template loaders so edited
+    templates show up without a restart;
+  • branding is cached per clinic for EMAIL_BRANDING_TTL seconds and
+    rebuilt as soon as the clinic's updated_at changes;
+  • render_batch looks the templates up once for the whole batch and never
+    raises — a bad context gives a RenderResult with .error set;
+  • every render is timed; render_stats() reports counts, cache hits and
+    average render time per template.
+
+Public API
+----------
+clinic_branding(clinic)  →  dict
+clinic_logo_url(clinic)  →  str | None
+email_templates(prefix)  →  (txt Template, html Template)
+render_email(prefix, context)  →  (text, html)
+render_batch(prefix, contexts)  →  list[RenderResult]
+render_stats()  →  dict
+clear_caches()  →  None
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+EMAIL_BRANDING_TTL   = getattr(settings, 'EMAIL_BRANDING_TTL', 300)     # seconds
+EMAIL_BRANDING_LIMIT = getattr(settings, 'EMAIL_BRANDING_LIMIT', 2048)  # clinics kept
+
+
+@dataclass
+class RenderResult:
+    text:        str = ''
+    html:        str = ''
+    error:       str = ''
+    elapsed_ms:  float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+_templates  = {}
+_branding   = {}                     # clinic pk → (updated_at, expires, dict)
+_lock       = threading.Lock()
+_stats      = Counter()
+_timing     = defaultdict(lambda: {'renders': 0, 'ms': 0.0})
+
+
+# ── Branding ─────────────────────────────────────────────────────────────────
+
+def clinic_logo_url(clinic) -> str | None:
+    """Absolute URL of the clinic logo, usable from an email client."""
+    if not clinic.logo:
+        return None
+    if hasattr(clinic.logo, 'url'):
+        try:
+            url = clinic.logo.url
+            # Cloudinary / absolute URLs are already usable
+            if url.startswith('http'):
+                return url
+            # Local storage: build an absolute URL so email clients can fetch it
+            backend_url = getattr(
+                settings, 'BACKEND_URL',
+                os.environ.get('BACKEND_URL', 'http://localhost:8000'),
+            )
+            return f"{backend_url.rstrip('/')}{url}"
+        except Exception:
+            return None
+    return None
+
+
+def clinic_branding(clinic) -> dict:
+    """
+    The clinic_* template variables for `clinic`. Cached per clinic; a
+    copy is returned, so callers may add to it.
+    """
+    stamp = getattr(clinic, 'updated_at', None)
+    now   = time.monotonic()
+
+    entry = _branding.get(clinic.pk)
+    if entry is not None and entry[0] == stamp and entry[1] > now:
+        _stats['branding_hits'] += 1
+        return dict(entry[2])
+
+    branding = {
+        'clinic_name':      clinic.name,
+        'clinic_phone':     getattr(clinic, 'phone', ''),
+        'clinic_address':   getattr(clinic, 'address', ''),
+        'clinic_email':     getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
+        'clinic_logo_url':  clinic_logo_url(clinic),
+    }
+    with _lock:
+        if len(_branding) >= EMAIL_BRANDING_LIMIT:
+            _branding.clear()
+        _branding[clinic.pk] = (stamp, now + EMAIL_BRANDING_TTL, branding)
+        _stats['branding_misses'] += 1
+    return dict(branding)
+
+
+# ── Templates ────────────────────────────────────────────────────────────────
+
+def email_templates(prefix: str):
+    """The compiled (txt, html) templates for `prefix`, e.g. 'appointments/email/reminder'."""
+    if settings.DEBUG:
+        # Leave reloading to Django's loaders while templates are being edited
+        return get_template(f'{prefix}.txt'), get_template(f'{prefix}.html')
+
+    pair = _templates.get(prefix)
+    if pair is not None:
+        _stats['template_hits'] += 1
+        return pair
+
+    pair = (get_template(f'{prefix}.txt'), get_template(f'{prefix}.html'))
+    with _lock:
+        _templates[prefix] = pair
+        _stats['template_misses'] += 1
+    return pair
+
+
+def _record(prefix: str, elapsed_ms: float, renders: int = 1) -> None:
+    with _lock:
+        _timing[prefix]['renders'] += renders
+        _timing[prefix]['ms']      += elapsed_ms
+
+
+def render_email(prefix: str, context: dict) -> tuple[str, str]:
+    """Render the (text, html) pair for one message. Raises on template errors."""
+    txt, html = email_templates(prefix)
+    started   = time.perf_counter()
+    rendered  = txt.render(context), html.render(context)
+    _record(prefix, (time.perf_counter() - started) * 1000)
+    return rendered
+
+
+def render_batch(prefix: str, contexts: list[dict]) -> list[RenderResult]:
+    """
+    Render one message per context against the same compiled templates.
+    Returns a RenderResult per context, in order; never raises for a single
+    bad context.
+    """
+    if not contexts:
+        return []
+    try:
+        txt, html = email_templates(prefix)
+    except Exception as exc:
+        error = f"Template load error ({prefix}): {exc}"
+        logger.error(error)
+        return [RenderResult(error=error) for _ in contexts]
+
+    results = []
+    started = time.perf_counter()
+    for context in contexts:
+        began = time.perf_counter()
+        try:
+            result = RenderResult(txt.render(context), html.render(context))
+        except Exception as exc:
+            result = RenderResult(error=f"Template render error ({prefix}): {exc}")
+            logger.error(result.error)
+        result.elapsed_ms = (time.perf_counter() - began) * 1000
+        results.append(result)
+
+    _record(prefix, (time.perf_counter() - started) * 1000, renders=len(contexts))
+    return results
+
+
+# ── Stats ────────────────────────────────────────────────────────────────────
+
+def render_stats() -> dict:
+    """Snapshot of this process's cache counters and per-template render times."""
+    return {
+        **_stats,
+        'templates': {
+            prefix: {
+                'renders':       t['renders'],
+                'avg_render_ms': round(t['ms'] / t['renders'], 3) if t['renders'] else 0.0,
+            }
+            for prefix, t in _timing.items()
+        },
+    }
+
+
+def clear_caches() -> None:
+    """Forget compiled templates and branding (e.g. after editing templates)."""
+    with _lock:
+        _templates.clear()
+        _branding.clear()
@@ -3,34 +3,14 @@ Reusable email utilities for the PMS.
 Centralises booking-confirmation and new-client-welcome emails.
 """
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from apps.common.mail_transport import send_message
+from apps.common.email_rendering import clinic_branding, render_email
 from django.conf import settings
-import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def _get_clinic_logo_url(clinic) -> str | None:
-    if not clinic.logo:
-        return None
-    if hasattr(clinic.logo, 'url'):
-        try:
-            url = clinic.logo.url
-            # Cloudinary / absolute URLs are already usable
-            if url.startswith('http'):
-                return url
-            # Local storage: build an absolute URL so email clients can fetch it
-            backend_url = getattr(
-                settings, 'BACKEND_URL',
-                os.environ.get('BACKEND_URL', 'http://localhost:8000'),
-            )
-            return f"{backend_url.rstrip('/')}{url}"
-        except Exception:
-            return None
-    return None
-
-
 # ── Booking confirmation email ────────────────────────────────────────────────
 
 def send_booking_confirmation_email(booking) -> tuple[bool, str]:
@@ -66,11 +46,7 @@ def send_booking_confirmation_email(booking) -> tuple[bool, str]:
         'appointment_time':   booking.appointment_time.strftime('%I:%M %p'),
         'service_name':       service_name,
         'practitioner_name':  practitioner_name,
-        'clinic_name':        clinic.name,
-        'clinic_phone':       getattr(clinic, 'phone', ''),
-        'clinic_address':     getattr(clinic, 'address', ''),
-        'clinic_email':       getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':    _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'notes':              booking.notes or '',
         'reference_number':   booking.reference_number,
     }
@@ -80,8 +56,7 @@ def send_booking_confirmation_email(booking) -> tuple[bool, str]:
             f"Booking Confirmed – {context['appointment_date']} "
             f"at {context['appointment_time']} | {clinic.name}"
         )
-        text_content = render_to_string('appointments/email/booking_confirmation.txt', context)
-        html_content = render_to_string('appointments/email/booking_confirmation.html', context)
+        text_content, html_content = render_email('appointments/email/booking_confirmation', context)
     except Exception as e:
         msg = f"Template render error for booking #{booking.reference_number}: {e}"
         logger.error(msg)
@@ -96,7 +71,7 @@ def send_booking_confirmation_email(booking) -> tuple[bool, str]:
             reply_to=[context['clinic_email']],
         )
         msg_obj.attach_alternative(html_content, 'text/html')
-        msg_obj.send(fail_silently=False)
+        send_message(msg_obj)
 
         logger.info(
             "Booking confirmation sent → booking=%s email=%s",
@@ -140,17 +115,12 @@ def send_new_client_welcome_email(patient) -> tuple[bool, str]:
         'patient_first_name': patient.first_name,
         'patient_full_name':  patient.get_full_name(),
         'patient_number':     patient.patient_number,
-        'clinic_name':        clinic.name,
-        'clinic_phone':       getattr(clinic, 'phone', ''),
-        'clinic_address':     getattr(clinic, 'address', ''),
-        'clinic_email':       getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':    _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
     }
 
     try:
         subject = f"Welcome to {clinic.name}!"
-        text_content = render_to_string('appointments/email/new_client_welcome.txt', context)
-        html_content = render_to_string('appointments/email/new_client_welcome.html', context)
+        text_content, html_content = render_email('appointments/email/new_client_welcome', context)
     except Exception as e:
         msg = f"Template render error for welcome email, patient {patient.id}: {e}"
         logger.error(msg)
@@ -165,7 +135,7 @@ def send_new_client_welcome_email(patient) -> tuple[bool, str]:
             reply_to=[context['clinic_email']],
         )
         msg_obj.attach_alternative(html_content, 'text/html')
-        msg_obj.send(fail_silently=False)
+        send_message(msg_obj)
 
         logger.info(
             "Welcome email sent → patient=%s (%s) email=%s",
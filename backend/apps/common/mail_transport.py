@@ -0,0 +1,242 @@
+"""
+Pooled email transport.
+
+EmailMessage.send() opens a new backend connection per message — with the
+SMTP backend that is a TCP + STARTTLS + AUTH handshake for every email.
+This module keeps a small per-process pool of open connections and sends
+through them:
+
+    from apps.common.mail_transport import send_message, send_messages
+
+    send_message(email)                 # raises like email.send(fail_silently=False)
+    results = send_messages(emails)     # batch; one MailResult per message
+    results = send_messages(emails, throttle=bucket.acquire)   # rate-limited
+
+  • up to MAIL_POOL_SIZE connections are kept open; a caller checks one out
+    exclusively, so worker threads never share an SMTP session;
+  • connections idle for MAIL_POOL_IDLE_TIMEOUT seconds, or that have
+    carried MAIL_POOL_MAX_MESSAGES messages, are closed and replaced;
+  • batches use one connection per MAIL_BATCH_SIZE chunk and report a
+    result per message, so a rejected recipient only fails itself;
+  • a send interrupted by a dropped connection is retried once on a fresh
+    connection;
+  • throttle, if given, is called right before every SMTP send, so a rate
+    limit spaces out the sends themselves.
+
+mail_stats() returns the per-process counters (sent, failed, connections
+opened, reconnects, average send time).
+
+Public API
+----------
+send_message(message)  →  None
+send_messages(messages, throttle=None)  →  list[MailResult]
+mail_stats()  →  dict
+close_pool()  →  None
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import smtplib
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+MAIL_POOL_SIZE          = getattr(settings, 'MAIL_POOL_SIZE', 4)
+MAIL_POOL_IDLE_TIMEOUT  = getattr(settings, 'MAIL_POOL_IDLE_TIMEOUT', 60)
+MAIL_POOL_MAX_MESSAGES  = getattr(settings, 'MAIL_POOL_MAX_MESSAGES', 100)
+MAIL_BATCH_SIZE         = getattr(settings, 'MAIL_BATCH_SIZE', 50)
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    """True if the connection is gone, as opposed to the message being rejected."""
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    # SMTPException subclasses OSError — only plain socket errors count here
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+@dataclass
+class MailResult:
+    message:    object
+    ok:         bool
+    error:      str = ''
+    elapsed_ms: float = 0.0
+    exception:  Exception | None = None
+
+
+_stats      = Counter()
+_timing     = {'send_ms': 0.0}
+_stats_lock = threading.Lock()
+
+
+def mail_stats() -> dict:
+    """Snapshot of this process's mail transport counters."""
+    sent = _stats['sent']
+    return {
+        **_stats,
+        'pooled':      _pool.qsize(),
+        'avg_send_ms': round(_timing['send_ms'] / sent, 2) if sent else 0.0,
+    }
+
+
+# ── Connection pool ──────────────────────────────────────────────────────────
+
+class _PooledConnection:
+    __slots__ = ('backend', 'last_used', 'sent')
+
+    def __init__(self):
+        self.backend   = get_connection(fail_silently=False)
+        self.backend.open()
+        self.last_used = time.monotonic()
+        self.sent      = 0
+        with _stats_lock:
+            _stats['connections_opened'] += 1
+
+    def expired(self) -> bool:
+        return (
+            time.monotonic() - self.last_used > MAIL_POOL_IDLE_TIMEOUT
+            or self.sent >= MAIL_POOL_MAX_MESSAGES
+        )
+
+    def close(self) -> None:
+        try:
+            self.backend.close()
+        except Exception:
+            pass
+
+
+_pool: 'queue.LifoQueue[_PooledConnection]' = queue.LifoQueue(maxsize=MAIL_POOL_SIZE)
+_slots = threading.BoundedSemaphore(MAIL_POOL_SIZE)
+
+
+@contextmanager
+def _connection():
+    """Check out an open connection; it goes back to the pool unless broken."""
+    with _slots:
+        conn = None
+        while conn is None:
+            try:
+                conn = _pool.get_nowait()
+            except queue.Empty:
+                conn = _PooledConnection()
+                break
+            if conn.expired():
+                conn.close()
+                conn = None
+
+        broken = False
+        try:
+            yield conn
+        except Exception as exc:
+            broken = _is_connection_error(exc)
+            raise
+        finally:
+            if broken:
+                conn.close()
+            else:
+                conn.last_used = time.monotonic()
+                try:
+                    _pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+
+def close_pool() -> None:
+    """Close every idle pooled connection (e.g. at the end of a command)."""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+# ── Sending ──────────────────────────────────────────────────────────────────
+
+def _send_one(conn: _PooledConnection, message) -> None:
+    started = time.perf_counter()
+    conn.backend.send_messages([message])
+    with _stats_lock:
+        _timing['send_ms'] += (time.perf_counter() - started) * 1000
+    conn.sent += 1
+
+
+def send_message(message) -> None:
+    """
+    Send one EmailMessage over a pooled connection. Raises on failure, like
+    message.send(fail_silently=False).
+    """
+    result = send_messages([message])[0]
+    if not result.ok:
+        raise result.exception
+
+
+def send_messages(messages: list, throttle=None) -> list[MailResult]:
+    """
+    Send a batch over pooled connections: one checkout per MAIL_BATCH_SIZE
+    chunk, one result per message. A rejected message fails alone; a
+    dropped connection is replaced and the interrupted message retried once.
+    throttle() is called before each send (e.g. a rate limiter's acquire).
+    """
+    results = []
+    for start in range(0, len(messages), MAIL_BATCH_SIZE):
+        pending = list(messages[start:start + MAIL_BATCH_SIZE])
+        retried = False
+        with _stats_lock:
+            _stats['batches'] += 1
+
+        while pending:
+            try:
+                with _connection() as conn:
+                    while pending:
+                        message = pending[0]
+                        if throttle is not None:
+                            throttle()
+                        started = time.perf_counter()
+                        try:
+                            _send_one(conn, message)
+                        except Exception as exc:
+                            if _is_connection_error(exc):
+                                raise
+                            results.append(_failed(message, exc, started))
+                        else:
+                            with _stats_lock:
+                                _stats['sent'] += 1
+                            results.append(MailResult(message, True, elapsed_ms=_ms_since(started)))
+                        pending.pop(0)
+                        retried = False
+            except Exception as exc:
+                if not pending:
+                    break
+                if retried or not _is_connection_error(exc):
+                    # Could not (re)connect, or the same message broke two connections
+                    results.append(_failed(pending.pop(0), exc, time.perf_counter()))
+                    retried = False
+                    continue
+                with _stats_lock:
+                    _stats['reconnects'] += 1
+                retried = True
+                logger.warning('Mail connection dropped (%s) — retrying on a fresh connection', exc)
+
+    return results
+
+
+def _ms_since(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _failed(message, exc: Exception, started: float) -> MailResult:
+    with _stats_lock:
+        _stats['failed'] += 1
+    logger.error('Mail to %s failed: %s', getattr(message, 'to', '?'), exc)
+    return MailResult(
+        message, False, error=f'{type(exc).__name__}: {exc}',
+        elapsed_ms=_ms_since(started), exception=exc,
+    )
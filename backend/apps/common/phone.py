@@ -0,0 +1,48 @@
+"""
+Phone number normalisation.
+
+Patient phones are typed in many shapes (0917 123 4567, 639171234567,
++63 917-123-4567 …) while Twilio always reports E.164. to_e164() maps
+them to one form so numbers can be compared with an indexed equality
+lookup:
+
+    to_e164('0917 123 4567')   →  '+639171234567'
+    to_e164('+1 (415) 555-0100') →  '+14155550100'
+    to_e164('8123-4567')       →  None
+"""
+import re
+
+
+def to_e164(phone: str) -> str | None:
+    """
+    Normalize a phone number to E.164. Philippine mobiles are accepted in
+    local, international and E.164 form; other numbers only when they
+    already carry a +country code. Returns None if it cannot be normalized.
+    """
+    if not phone:
+        return None
+
+    # Strip all non-digit characters except leading +
+    cleaned = re.sub(r'[^\d+]', '', phone.strip())
+
+    # Already in E.164
+    if cleaned.startswith('+63') and len(cleaned) == 13:
+        return cleaned
+
+    # International without +
+    if cleaned.startswith('63') and len(cleaned) == 12:
+        return f'+{cleaned}'
+
+    # Local format 09XXXXXXXXX
+    if cleaned.startswith('09') and len(cleaned) == 11:
+        return f'+63{cleaned[1:]}'
+
+    # 10-digit without prefix
+    if cleaned.startswith('9') and len(cleaned) == 10:
+        return f'+63{cleaned}'
+
+    # Any other country, given with its + prefix
+    if re.fullmatch(r'\+[1-9]\d{7,14}', cleaned) and not cleaned.startswith('+63'):
+        return cleaned
+
+    return None
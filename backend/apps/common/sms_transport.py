@@ -0,0 +1,224 @@
+"""
+SMS transport.
+
+Sending used to build a new twilio.rest.Client per message and wait for
+each HTTP round trip in turn. This module keeps one long-lived backend per
+process and fans batches out over a bounded thread pool:
+
+    from apps.common.sms_transport import send_sms, send_bulk
+
+    result  = send_sms('+639171234567', 'Hi!')            # SMSResult
+    results = send_bulk([(to, body), …])                  # one SMSResult each, in order
+    results = send_bulk(messages, throttle=bucket.acquire)  # rate-limited per send
+
+  • SMS_BACKEND picks the backend (dotted path), like EMAIL_BACKEND:
+      'apps.common.sms_transport.TwilioBackend'   (default)
+      'apps.common.sms_transport.LocmemBackend'   records messages in memory
+  • at most SMS_MAX_CONCURRENCY sends are in flight at once, so a batch
+    takes about len(batch) / SMS_MAX_CONCURRENCY provider round trips;
+  • every send returns an SMSResult with the provider id, error code /
+    message and latency — send_bulk never raises for a single failure;
+  • throttle, if given, is called by each worker right before its provider
+    call, so a rate limit holds even with several sends in flight.
+
+LocmemBackend is the stand-in for tests and benchmarks: messages are
+appended to LocmemBackend.outbox, SMS_LOCMEM_LATENCY_MS simulates the
+provider round trip and SMS_LOCMEM_FAIL_PREFIXES makes numbers with those
+prefixes fail.
+
+Public API
+----------
+send_sms(to, body)  →  SMSResult
+send_bulk(messages, throttle=None)  →  list[SMSResult]
+get_backend()  →  backend instance (process-wide)
+is_configured()  →  bool
+sms_stats()  →  dict
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SMS_BACKEND              = getattr(settings, 'SMS_BACKEND', 'apps.common.sms_transport.TwilioBackend')
+SMS_MAX_CONCURRENCY      = getattr(settings, 'SMS_MAX_CONCURRENCY', 8)
+SMS_LOCMEM_LATENCY_MS    = getattr(settings, 'SMS_LOCMEM_LATENCY_MS', 0)
+SMS_LOCMEM_FAIL_PREFIXES = getattr(settings, 'SMS_LOCMEM_FAIL_PREFIXES', ())
+
+
+@dataclass
+class SMSResult:
+    to:          str
+    ok:          bool
+    sid:         str = ''
+    error_code:  str = ''
+    error:       str = ''
+    elapsed_ms:  float = 0.0
+
+
+class SMSError(Exception):
+    """Provider rejected a message. code is the provider's error code, if any."""
+
+    def __init__(self, message: str, code: str = ''):
+        super().__init__(message)
+        self.code = code
+
+
+# ── Backends ─────────────────────────────────────────────────────────────────
+
+class TwilioBackend:
+    """Twilio REST API. One Client (and its HTTP session) for the whole process."""
+
+    def __init__(self):
+        from twilio.rest import Client
+
+        self.client      = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        self.from_number = settings.TWILIO_FROM_NUMBER
+
+    @staticmethod
+    def is_configured() -> bool:
+        return all([
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            settings.TWILIO_FROM_NUMBER,
+        ])
+
+    def send(self, to: str, body: str) -> str:
+        from twilio.base.exceptions import TwilioRestException
+
+        try:
+            return self.client.messages.create(body=body, from_=self.from_number, to=to).sid
+        except TwilioRestException as exc:
+            raise SMSError(exc.msg, code=str(exc.code or exc.status)) from exc
+
+
+class LocmemBackend:
+    """Records messages in LocmemBackend.outbox instead of sending them."""
+
+    outbox: list[dict] = []
+    _lock = threading.Lock()
+
+    @staticmethod
+    def is_configured() -> bool:
+        return True
+
+    def send(self, to: str, body: str) -> str:
+        if SMS_LOCMEM_LATENCY_MS:
+            time.sleep(SMS_LOCMEM_LATENCY_MS / 1000)
+        if to.startswith(tuple(SMS_LOCMEM_FAIL_PREFIXES)):
+            raise SMSError(f'Simulated failure for {to}', code='LOCMEM')
+        sid = f'LM{uuid.uuid4().hex}'
+        with self._lock:
+            self.outbox.append({'sid': sid, 'to': to, 'body': body})
+        return sid
+
+
+# ── Process-wide backend and pool ────────────────────────────────────────────
+
+_backend       = None
+_backend_lock  = threading.Lock()
+_executor      = None
+_stats         = Counter()
+_timing        = {'send_ms': 0.0}
+_stats_lock    = threading.Lock()
+
+
+def _backend_class():
+    return import_string(SMS_BACKEND)
+
+
+def is_configured() -> bool:
+    """True if the configured backend has what it needs to send."""
+    return _backend_class().is_configured()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _backend_class()()
+    return _backend
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _backend_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=SMS_MAX_CONCURRENCY,
+                    thread_name_prefix='sms-send',
+                )
+    return _executor
+
+
+def sms_stats() -> dict:
+    """Snapshot of this process's SMS transport counters."""
+    done = _stats['sent'] + _stats['failed']
+    return {
+        **_stats,
+        'backend':     SMS_BACKEND.rsplit('.', 1)[-1],
+        'avg_send_ms': round(_timing['send_ms'] / done, 2) if done else 0.0,
+    }
+
+
+# ── Sending ──────────────────────────────────────────────────────────────────
+
+def send_sms(to: str, body: str) -> SMSResult:
+    """Send one SMS on the calling thread. Never raises; check result.ok."""
+    started = time.perf_counter()
+    try:
+        sid = get_backend().send(to, body)
+    except Exception as exc:
+        result = SMSResult(
+            to, False,
+            error_code = getattr(exc, 'code', '') or type(exc).__name__,
+            error      = str(exc),
+            elapsed_ms = (time.perf_counter() - started) * 1000,
+        )
+        logger.error('SMS to %s failed [%s]: %s', to, result.error_code, result.error)
+    else:
+        result = SMSResult(to, True, sid=sid, elapsed_ms=(time.perf_counter() - started) * 1000)
+
+    with _stats_lock:
+        _stats['sent' if result.ok else 'failed'] += 1
+        _timing['send_ms'] += result.elapsed_ms
+    return result
+
+
+def send_bulk(messages: list[tuple[str, str]], throttle=None) -> list[SMSResult]:
+    """
+    Send [(to, body), …] with up to SMS_MAX_CONCURRENCY requests in flight.
+    throttle() is called before each send (e.g. a rate limiter's acquire).
+    Returns one SMSResult per message, in input order.
+    """
+    def send(message):
+        if throttle is not None:
+            throttle()
+        return send_sms(*message)
+
+    if not messages:
+        return []
+    if len(messages) == 1:
+        return [send(messages[0])]
+
+    started = time.perf_counter()
+    results = list(_get_executor().map(send, messages))
+    with _stats_lock:
+        _stats['batches'] += 1
+    logger.info(
+        'SMS batch: %d sent, %d failed in %.0f ms',
+        sum(r.ok for r in results), sum(not r.ok for r in results),
+        (time.perf_counter() - started) * 1000,
+    )
+    return results
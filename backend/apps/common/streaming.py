@@ -0,0 +1,68 @@
+"""
+Streaming responses under ASGI.
+
+The app is served by daphne. Under ASGI, Django turns a StreamingHttpResponse
+built from a *sync* iterator into a list first (sync_to_async(list)), so the
+whole body sits in memory before the first byte is sent. Wrapping the
+iterator makes Django pull one chunk at a time:
+
+    return StreamingHttpResponse(aiter_chunks(stream_invoice_zip(invoices)), …)
+    return StreamingHttpResponse(aiter_chunks(iter_print_csv(qs), min_size=STREAM_MIN_CHUNK), …)
+
+Generators that yield many small pieces (a CSV line, an NDJSON row) should
+pass min_size. Pieces are then joined on the sync thread until the chunk
+reaches min_size, so there is one thread hop per chunk, not one per row.
+
+Each chunk is produced on Django's thread-sensitive sync thread, which is the
+thread that ran the view. Lazy querysets and server-side cursors therefore
+stay on the request's database connection. If the client disconnects, the
+wrapped generator is closed, so its thread pools and files are released.
+
+Public API
+----------
+aiter_chunks(iterable, min_size=0)  →  async iterator
+STREAM_MIN_CHUNK  →  default min_size for row-by-row generators
+"""
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterable
+
+from asgiref.sync import sync_to_async
+
+STREAM_MIN_CHUNK = 64 * 1024
+
+_DONE = object()
+
+
+def _next_chunk(iterator, min_size: int):
+    """The next item, joined with the following ones until min_size is reached."""
+    first = next(iterator, _DONE)
+    if first is _DONE or len(first) >= min_size:
+        return first
+    parts, size = [first], len(first)
+    for item in iterator:
+        parts.append(item)
+        size += len(item)
+        if size >= min_size:
+            break
+    return first[:0].join(parts)
+
+
+async def aiter_chunks(iterable: Iterable, min_size: int = 0) -> AsyncIterator:
+    """
+    Yield the str / bytes chunks of a sync iterable, pulling each one off
+    the event loop. With min_size, small pieces are joined into chunks of
+    at least that length (the last one may be shorter).
+    """
+    iterator = iter(iterable)
+    pull     = sync_to_async(_next_chunk)
+    try:
+        while True:
+            chunk = await pull(iterator, min_size)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
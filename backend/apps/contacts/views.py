@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.core.mail import EmailMultiAlternatives
+from apps.common.mail_transport import send_message
 from django.conf import settings
 
 from .models import Contact
@@ -160,7 +161,7 @@ Yours Truly,
                 to=[contact.email],
             )
             mail.attach_alternative(html_message, 'text/html')
-            mail.send(fail_silently=False)
+            send_message(mail)
             
             return Response({'success': True, 'message': 'Email sent successfully'})
         except Exception as e:
@@ -4,6 +4,11 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
 
+from . import presence
+from .persistence import WRITE_BEHIND_ENABLED, save_message, write_behind
+from .presence import PresenceMixin
+from .typing import typing_throttle
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,10 +48,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.room_group,  self.channel_name)
         await self.channel_layer.group_add(self.user_group,  self.channel_name)
 
+        # Sender info for outgoing events, resolved once per connection
+        self.sender_name   = self.user.get_full_name()
+        self.sender_avatar = await self._get_avatar_url()
+
+        self.typing_key = (self.conversation_id, self.user.pk)
+        typing_throttle.attach(self.typing_key)
+
         await self.accept()
         logger.info(f'WS connect: user={self.user.pk} conversation={self.conversation_id}')
 
     async def disconnect(self, close_code):
+        if hasattr(self, 'typing_key'):
+            await typing_throttle.detach(self.typing_key, self._publish_typing)
         if hasattr(self, 'room_group'):
             await self.channel_layer.group_discard(self.room_group, self.channel_name)
         if hasattr(self, 'user_group'):
@@ -83,7 +97,12 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.send_json({'error': 'Message body is required.'})
             return
 
-        message = await self._save_message(body)
+        if WRITE_BEHIND_ENABLED:
+            message = await write_behind.submit(self.conversation_id, self.user.pk, body)
+        else:
+            message = await database_sync_to_async(save_message)(
+                self.conversation_id, self.user.pk, body,
+            )
         if message is None:
             await self.send_json({'error': 'Failed to save message.'})
             return
@@ -94,8 +113,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'id':            message['id'],
                 'conversation':  int(self.conversation_id),
                 'sender_id':     self.user.pk,
-                'sender_name':   self.user.get_full_name(),
-                'sender_avatar': message['sender_avatar'],
+                'sender_name':   self.sender_name,
+                'sender_avatar': self.sender_avatar,
                 'body':          body,
                 'is_edited':     False,
                 'created_at':    message['created_at'],
@@ -103,17 +122,27 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }
         # Broadcast to all participants in the room
         await self.channel_layer.group_send(self.room_group, payload)
+        # The message itself ends the typing burst
+        await typing_throttle.stop(self.typing_key, self._publish_typing)
 
     async def _handle_mark_read(self):
         await self._update_last_read()
         await self.send_json({'type': 'marked_read', 'conversation': int(self.conversation_id)})
 
     async def _handle_typing(self, data):
+        # Throttled per (conversation, user) — see typing.py
+        await typing_throttle.event(
+            self.typing_key,
+            bool(data.get('is_typing', False)),
+            self._publish_typing,
+        )
+
+    async def _publish_typing(self, is_typing):
         await self.channel_layer.group_send(self.room_group, {
             'type':    'typing_indicator',
             'user_id': self.user.pk,
-            'name':    self.user.get_full_name(),
-            'is_typing': bool(data.get('is_typing', False)),
+            'name':    self.sender_name,
+            'is_typing': is_typing,
         })
 
     # ── Group message handlers (called by channel layer) ──────────────────
@@ -142,37 +171,12 @@ class ChatConsumer(AsyncWebsocketConsumer):
         ).exists()
 
     @database_sync_to_async
-    def _save_message(self, body):
-        from .models import Conversation, Message
-        from django.utils import timezone
-
+    def _get_avatar_url(self):
+        if not self.user.avatar:
+            return None
         try:
-            conversation = Conversation.objects.get(
-                pk=self.conversation_id,
-                is_deleted=False,
-            )
-            msg = Message.objects.create(
-                conversation=conversation,
-                sender=self.user,
-                body=body,
-            )
-            # Bump conversation updated_at for ordering
-            conversation.updated_at = timezone.now()
-            conversation.save(update_fields=['updated_at'])
-
-            avatar_url = None
-            if self.user.avatar:
-                try:
-                    avatar_url = self.user.avatar.url
-                except Exception:
-                    pass
-
-            return {
-                'id':           msg.pk,
-                'created_at':   msg.created_at.isoformat(),
-                'sender_avatar': avatar_url,
-            }
-        except Conversation.DoesNotExist:
+            return self.user.avatar.url
+        except Exception:
             return None
 
     @database_sync_to_async
@@ -181,7 +185,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         ConversationParticipant.objects.filter(
             conversation_id=self.conversation_id,
             user=self.user,
-        ).update(last_read_at=timezone.now())
+        ).update(last_read_at=timezone.now(), unread_count=0)
 
     # ── Utility ───────────────────────────────────────────────────────────
 
@@ -191,11 +195,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
 # ── Presence consumer (personal channel) ─────────────────────────────────────
 
-class PresenceConsumer(AsyncWebsocketConsumer):
+class PresenceConsumer(PresenceMixin, AsyncWebsocketConsumer):
     """
     Lightweight consumer connected at ws/presence/ .
     Pushes unread-count badges and new-message notifications
     to users who are NOT currently in a chat window.
+
+    Also tracks who is online: the socket is registered in the presence
+    store, the client receives a snapshot of online colleagues on connect,
+    then batched `presence` events with online/offline transitions.
     """
 
     async def connect(self):
@@ -206,15 +214,48 @@ class PresenceConsumer(AsyncWebsocketConsumer):
 
         self.user_group = f'user_{self.user.pk}'
         await self.channel_layer.group_add(self.user_group, self.channel_name)
+
+        main_clinic_id = await self._get_main_clinic_id()
+        if main_clinic_id:
+            self.presence_group = presence.clinic_group_name(main_clinic_id)
+            await self.channel_layer.group_add(self.presence_group, self.channel_name)
+
         await self.accept()
 
+        if main_clinic_id:
+            await self.presence_join(self.user.pk, main_clinic_id)
+            online = await database_sync_to_async(presence.online_users)(main_clinic_id)
+            await self.send(text_data=json.dumps({'type': 'presence_snapshot', 'online': sorted(online)}))
+
     async def disconnect(self, close_code):
+        await self.presence_leave()
         if hasattr(self, 'user_group'):
             await self.channel_layer.group_discard(self.user_group, self.channel_name)
+        if hasattr(self, 'presence_group'):
+            await self.channel_layer.group_discard(self.presence_group, self.channel_name)
 
     # Forward any group message directly to the client
     async def chat_message(self, event):
         await self.send(text_data=json.dumps({'type': 'chat_message', 'message': event['message']}, default=str))
 
+    async def presence_batch(self, event):
+        await self.send(text_data=json.dumps({
+            'type':    'presence',
+            'online':  event['online'],
+            'offline': event['offline'],
+        }))
+
     async def receive(self, text_data=None, bytes_data=None):
-        pass   # presence consumer is receive-only from server side
\ No newline at end of file
+        # Optional client heartbeat — the server also refreshes on its own timer
+        try:
+            data = json.loads(text_data or '{}')
+        except json.JSONDecodeError:
+            return
+        if data.get('type') in ('ping', 'heartbeat'):
+            await self.presence_beat()
+            await self.send(text_data=json.dumps({'type': 'pong'}))
+
+    @database_sync_to_async
+    def _get_main_clinic_id(self):
+        clinic = getattr(self.user, 'clinic', None)
+        return clinic.main_clinic.id if clinic else None
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    ConversationParticipant = apps.get_model('clinic_messages', 'ConversationParticipant')
+    Message                 = apps.get_model('clinic_messages', 'Message')
+
+    def unread(*filters):
+        return Coalesce(Subquery(
+            Message.objects
+            .filter(conversation_id=OuterRef('conversation_id'), is_deleted=False, *filters)
+            .exclude(sender_id=OuterRef('user_id'))
+            .order_by()
+            .values('conversation_id')
+            .annotate(n=Count('id'))
+            .values('n')
+        ), 0)
+
+    ConversationParticipant.objects.filter(last_read_at__isnull=True).update(
+        unread_count=unread(),
+    )
+    ConversationParticipant.objects.filter(last_read_at__isnull=False).update(
+        unread_count=unread(Q(created_at__gt=OuterRef('last_read_at'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_messages', '0002_conversation_deleted_at_message_deleted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
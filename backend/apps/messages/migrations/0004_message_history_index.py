@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_messages', '0003_participant_unread_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'is_deleted', 'created_at'], name='messages_convers_c8c4a1_idx'),
+        ),
+    ]
@@ -33,6 +33,9 @@ class ConversationParticipant(TimeStampedModel):
     """
     Through model — tracks last-read timestamp per participant
     so we can compute unread counts.
+
+    unread_count is a denormalized counter for the sidebar badge: bumped for
+    the other participants when a message is sent, zeroed on mark-read.
     """
     conversation = models.ForeignKey(
         Conversation,
@@ -45,6 +48,7 @@ class ConversationParticipant(TimeStampedModel):
         related_name='conversation_memberships',
     )
     last_read_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         db_table = 'message_conversation_participants'
@@ -74,6 +78,10 @@ class Message(TimeStampedModel, SoftDeleteModel):
     class Meta:
         db_table = 'messages'
         ordering = ['created_at']
+        indexes  = [
+            # Keyset pagination of a conversation's history
+            models.Index(fields=['conversation', 'is_deleted', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Message #{self.pk} by {self.sender.email}"
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Chat message persistence.
+
+save_message() stores one chat line in a single transaction:
+
+  UPDATE conversations SET updated_at = now WHERE id = … AND NOT is_deleted
+  INSERT INTO messages …
+  UPDATE conversation_participants SET unread_count = unread_count + 1 …
+
+The conversation row is never loaded — a zero-row UPDATE means the
+conversation is gone and nothing is inserted.
+
+For bursty rooms, WriteBehindBuffer collects the lines sent to a
+conversation for CHAT_WRITE_BEHIND_WINDOW seconds and stores them with one
+bulk INSERT (save_messages). Each sender awaits its own result, so a line
+is only broadcast once it has an id. Lines keep their arrival order: one
+flush per conversation runs at a time, and bulk_create assigns ids and
+timestamps in list order.
+
+Public API
+----------
+save_message(conversation_id, sender_id, body)  →  dict | None
+save_messages(conversation_id, items)  →  list[dict] | None
+write_behind  →  WriteBehindBuffer (process-wide instance)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Conversation, ConversationParticipant, Message
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = getattr(settings, 'CHAT_WRITE_BEHIND', False)
+WRITE_BEHIND_WINDOW  = getattr(settings, 'CHAT_WRITE_BEHIND_WINDOW', 0.05)
+WRITE_BEHIND_MAX     = getattr(settings, 'CHAT_WRITE_BEHIND_MAX', 100)
+
+
+def _result(msg: Message) -> dict:
+    return {'id': msg.pk, 'created_at': msg.created_at.isoformat()}
+
+
+# ── Synchronous paths ────────────────────────────────────────────────────────
+
+def save_message(conversation_id, sender_id, body: str) -> dict | None:
+    """Store one message. Returns {'id', 'created_at'} or None if the conversation is gone."""
+    results = save_messages(conversation_id, [(sender_id, body)])
+    return results[0] if results else None
+
+
+def save_messages(conversation_id, items: list[tuple]) -> list[dict] | None:
+    """
+    Store [(sender_id, body), …] in order, in one transaction.
+    Returns one result per item, or None if the conversation is gone.
+    """
+    with transaction.atomic():
+        bumped = Conversation.objects.filter(
+            pk=conversation_id,
+            is_deleted=False,
+        ).update(updated_at=timezone.now())
+        if not bumped:
+            return None
+
+        messages = Message.objects.bulk_create([
+            Message(conversation_id=conversation_id, sender_id=sender_id, body=body)
+            for sender_id, body in items
+        ])
+
+        # Unread badge counters for everyone but the sender of each line
+        for sender_id, count in Counter(sender_id for sender_id, _ in items).items():
+            ConversationParticipant.objects.filter(
+                conversation_id=conversation_id,
+            ).exclude(user_id=sender_id).update(unread_count=F('unread_count') + count)
+
+    # PostgreSQL returns the new ids from the bulk INSERT
+    return [_result(msg) for msg in messages]
+
+
+# ── Write-behind buffer ──────────────────────────────────────────────────────
+
+class WriteBehindBuffer:
+    """
+    Per-conversation buffer that batches chat lines into one bulk insert.
+    Lives on the event loop; every await resolves to save_message()'s result.
+    """
+
+    def __init__(self, window: float = WRITE_BEHIND_WINDOW, max_batch: int = WRITE_BEHIND_MAX):
+        self.window    = window
+        self.max_batch = max_batch
+        self._pending: dict[int, list] = {}
+        self._timers:  dict[int, asyncio.TimerHandle] = {}
+        self._locks:   dict[int, asyncio.Lock] = {}
+
+    async def submit(self, conversation_id, sender_id, body: str) -> dict | None:
+        conversation_id = int(conversation_id)
+        loop   = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch  = self._pending.setdefault(conversation_id, [])
+        batch.append((sender_id, body, future))
+
+        if len(batch) >= self.max_batch:
+            self._schedule(conversation_id, 0)
+        elif conversation_id not in self._timers:
+            self._schedule(conversation_id, self.window)
+        return await future
+
+    def _schedule(self, conversation_id, delay: float) -> None:
+        timer = self._timers.pop(conversation_id, None)
+        if timer is not None:
+            timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timers[conversation_id] = loop.call_later(
+            delay, lambda: loop.create_task(self._flush(conversation_id)),
+        )
+
+    async def _flush(self, conversation_id) -> None:
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            self._timers.pop(conversation_id, None)
+            batch = self._pending.pop(conversation_id, [])
+            if not batch:
+                return
+            try:
+                results = await database_sync_to_async(save_messages)(
+                    conversation_id,
+                    [(sender_id, body) for sender_id, body, _ in batch],
+                )
+            except Exception as exc:
+                logger.exception(f'Write-behind flush failed for conversation {conversation_id}: {exc}')
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+
+            for i, (*_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(results[i] if results else None)
+
+        if not self._pending.get(conversation_id):
+            self._locks.pop(conversation_id, None)
+
+
+write_behind = WriteBehindBuffer()
@@ -0,0 +1,388 @@
+"""
+Presence — who has a live socket right now.
+
+Every PresenceConsumer / NotificationConsumer connection registers its
+channel name here and refreshes it on a heartbeat. An entry that misses
+heartbeats for PRESENCE_TTL seconds (crashed worker, dropped network) is
+treated as gone.
+
+Storage follows the channel layer: the RedisChannelLayer's Redis in
+production, an in-process store with the same semantics when the layer is
+InMemoryChannelLayer (DEBUG / tests).
+
+Redis keys
+----------
+presence:online:<user_id>    string with TTL — O(1) "is this user online?"
+presence:user:<user_id>      zset channel_name → expiry (live sockets)
+presence:clinic:<main_id>    zset user_id → expiry (who is online per clinic)
+
+Online/offline transitions are queued per clinic and broadcast in one
+`presence.batch` event per PRESENCE_BROADCAST_INTERVAL to the
+presence_clinic_<main_id> group; a user who flaps inside one window is
+sent once, with their final state.
+
+Public API
+----------
+get_store()  →  PresenceStore
+is_online(user_id)  →  bool
+any_online(main_clinic_id)  →  bool
+online_users(main_clinic_id)  →  set[int]
+clinic_group_name(main_clinic_id)  →  str
+broadcaster  (PresenceBroadcaster — queue(clinic_id, user_id, online))
+PresenceMixin  (consumer mixin — presence_join / presence_beat / presence_leave)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL                = getattr(settings, 'PRESENCE_TTL', 60)
+PRESENCE_HEARTBEAT          = getattr(settings, 'PRESENCE_HEARTBEAT', 20)
+PRESENCE_BROADCAST_INTERVAL = getattr(settings, 'PRESENCE_BROADCAST_INTERVAL', 1.0)
+
+
+def clinic_group_name(main_clinic_id) -> str:
+    return f'presence_clinic_{main_clinic_id}'
+
+
+# ── Stores ────────────────────────────────────────────────────────────────────
+
+class PresenceStore(ABC):
+    """Interface shared by the Redis and in-memory stores (all calls are sync)."""
+
+    @abstractmethod
+    def add_connection(self, user_id, clinic_id, channel_name) -> bool:
+        """Register a socket. True when the user just came online."""
+
+    @abstractmethod
+    def remove_connection(self, user_id, clinic_id, channel_name) -> bool:
+        """Drop a socket. True when it was the user's last one."""
+
+    @abstractmethod
+    def heartbeat(self, user_id, clinic_id, channel_name) -> None:
+        """Extend the socket's (and user's) expiry by PRESENCE_TTL."""
+
+    @abstractmethod
+    def is_online(self, user_id) -> bool:
+        """True while the user has at least one live socket."""
+
+    @abstractmethod
+    def any_online(self, clinic_id) -> bool:
+        """True if anyone in the clinic family is online."""
+
+    @abstractmethod
+    def online_users(self, clinic_id) -> set[int]:
+        """Ids of the clinic family's online users."""
+
+    @abstractmethod
+    def sweep(self, clinic_id) -> list[int]:
+        """Forget users whose heartbeats expired. Returns their ids."""
+
+
+class InMemoryPresenceStore(PresenceStore):
+    """Process-local stand-in for DEBUG / tests — same TTL semantics as Redis."""
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._sockets: dict[int, dict[str, float]] = {}     # user → {channel: expiry}
+        self._clinics: dict[int, dict[int, float]] = {}     # clinic → {user: expiry}
+
+    def _live(self, user_id, now) -> dict[str, float]:
+        sockets = self._sockets.get(user_id, {})
+        for channel, expiry in list(sockets.items()):
+            if expiry <= now:
+                del sockets[channel]
+        return sockets
+
+    def add_connection(self, user_id, clinic_id, channel_name) -> bool:
+        now = time.time()
+        with self._lock:
+            sockets = self._live(user_id, now)
+            was_online = bool(sockets)
+            sockets[channel_name] = now + PRESENCE_TTL
+            self._sockets[user_id] = sockets
+            self._clinics.setdefault(clinic_id, {})[user_id] = now + PRESENCE_TTL
+            return not was_online
+
+    def remove_connection(self, user_id, clinic_id, channel_name) -> bool:
+        now = time.time()
+        with self._lock:
+            sockets = self._live(user_id, now)
+            sockets.pop(channel_name, None)
+            if sockets:
+                return False
+            self._sockets.pop(user_id, None)
+            self._clinics.get(clinic_id, {}).pop(user_id, None)
+            return True
+
+    def heartbeat(self, user_id, clinic_id, channel_name) -> None:
+        expiry = time.time() + PRESENCE_TTL
+        with self._lock:
+            self._sockets.setdefault(user_id, {})[channel_name] = expiry
+            self._clinics.setdefault(clinic_id, {})[user_id] = expiry
+
+    def is_online(self, user_id) -> bool:
+        with self._lock:
+            return bool(self._live(user_id, time.time()))
+
+    def any_online(self, clinic_id) -> bool:
+        now = time.time()
+        with self._lock:
+            return any(exp > now for exp in self._clinics.get(clinic_id, {}).values())
+
+    def online_users(self, clinic_id) -> set[int]:
+        now = time.time()
+        with self._lock:
+            return {uid for uid, exp in self._clinics.get(clinic_id, {}).items() if exp > now}
+
+    def sweep(self, clinic_id) -> list[int]:
+        now = time.time()
+        with self._lock:
+            users   = self._clinics.get(clinic_id, {})
+            expired = [uid for uid, exp in users.items() if exp <= now]
+            for uid in expired:
+                users.pop(uid, None)
+                self._sockets.pop(uid, None)
+            return expired
+
+
+class RedisPresenceStore(PresenceStore):
+    """Presence kept in the channel layer's Redis, shared by every worker."""
+
+    ONLINE_KEY = 'presence:online:{}'
+    USER_KEY   = 'presence:user:{}'
+    CLINIC_KEY = 'presence:clinic:{}'
+
+    def __init__(self, client):
+        self.redis = client
+
+    def add_connection(self, user_id, clinic_id, channel_name) -> bool:
+        now, expiry = time.time(), time.time() + PRESENCE_TTL
+        user_key    = self.USER_KEY.format(user_id)
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(user_key, '-inf', now)
+        pipe.zadd(user_key, {channel_name: expiry})
+        pipe.zcard(user_key)
+        pipe.expire(user_key, PRESENCE_TTL * 2)
+        pipe.set(self.ONLINE_KEY.format(user_id), 1, ex=PRESENCE_TTL)
+        pipe.zadd(self.CLINIC_KEY.format(clinic_id), {user_id: expiry})
+        live = pipe.execute()[2]
+        return live == 1
+
+    def remove_connection(self, user_id, clinic_id, channel_name) -> bool:
+        user_key = self.USER_KEY.format(user_id)
+        pipe = self.redis.pipeline()
+        pipe.zrem(user_key, channel_name)
+        pipe.zremrangebyscore(user_key, '-inf', time.time())
+        pipe.zcard(user_key)
+        live = pipe.execute()[2]
+        if live:
+            return False
+        pipe = self.redis.pipeline()
+        pipe.delete(self.ONLINE_KEY.format(user_id), user_key)
+        pipe.zrem(self.CLINIC_KEY.format(clinic_id), user_id)
+        pipe.execute()
+        return True
+
+    def heartbeat(self, user_id, clinic_id, channel_name) -> None:
+        expiry   = time.time() + PRESENCE_TTL
+        user_key = self.USER_KEY.format(user_id)
+        pipe = self.redis.pipeline()
+        pipe.zadd(user_key, {channel_name: expiry})
+        pipe.expire(user_key, PRESENCE_TTL * 2)
+        pipe.set(self.ONLINE_KEY.format(user_id), 1, ex=PRESENCE_TTL)
+        pipe.zadd(self.CLINIC_KEY.format(clinic_id), {user_id: expiry})
+        pipe.execute()
+
+    def is_online(self, user_id) -> bool:
+        return bool(self.redis.exists(self.ONLINE_KEY.format(user_id)))
+
+    def any_online(self, clinic_id) -> bool:
+        return self.redis.zcount(self.CLINIC_KEY.format(clinic_id), time.time(), '+inf') > 0
+
+    def online_users(self, clinic_id) -> set[int]:
+        members = self.redis.zrangebyscore(self.CLINIC_KEY.format(clinic_id), time.time(), '+inf')
+        return {int(m) for m in members}
+
+    def sweep(self, clinic_id) -> list[int]:
+        key, now = self.CLINIC_KEY.format(clinic_id), time.time()
+        pipe = self.redis.pipeline()
+        pipe.zrangebyscore(key, '-inf', now)
+        pipe.zremrangebyscore(key, '-inf', now)
+        expired = [int(m) for m in pipe.execute()[0]]
+        if expired:
+            self.redis.delete(*(self.USER_KEY.format(uid) for uid in expired))
+        return expired
+
+
+_store: PresenceStore | None = None
+_store_lock = threading.Lock()
+
+
+def _redis_client():
+    import redis
+
+    url = getattr(settings, 'PRESENCE_REDIS_URL', None)
+    if not url:
+        host = settings.CHANNEL_LAYERS['default'].get('CONFIG', {}).get('hosts', [None])[0]
+        if isinstance(host, dict):
+            url = host.get('address')
+        elif isinstance(host, (tuple, list)):
+            return redis.Redis(host=host[0], port=host[1])
+        else:
+            url = host
+    return redis.Redis.from_url(url or 'redis://127.0.0.1:6379')
+
+
+def get_store() -> PresenceStore:
+    """The process-wide store — Redis when the channel layer is Redis-backed."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = settings.CHANNEL_LAYERS['default']['BACKEND']
+                _store  = (
+                    RedisPresenceStore(_redis_client())
+                    if 'redis' in backend.lower()
+                    else InMemoryPresenceStore()
+                )
+    return _store
+
+
+def is_online(user_id) -> bool:
+    try:
+        return get_store().is_online(user_id)
+    except Exception as exc:
+        # Presence is an optimisation — assume online if the store is down
+        logger.warning('Presence lookup failed for user %s: %s', user_id, exc)
+        return True
+
+
+def any_online(main_clinic_id) -> bool:
+    try:
+        return get_store().any_online(main_clinic_id)
+    except Exception as exc:
+        logger.warning('Presence lookup failed for clinic %s: %s', main_clinic_id, exc)
+        return True
+
+
+def online_users(main_clinic_id) -> set[int]:
+    return get_store().online_users(main_clinic_id)
+
+
+# ── Batched broadcasts ────────────────────────────────────────────────────────
+
+class PresenceBroadcaster:
+    """
+    Coalesces online/offline transitions per clinic and sends them as one
+    presence.batch event per window. Runs on the ASGI event loop.
+    """
+
+    def __init__(self):
+        self._pending: dict[int, dict[int, bool]] = {}
+        self._tasks:   dict[int, asyncio.Task] = {}
+
+    def queue(self, clinic_id, user_id, online: bool) -> None:
+        self._pending.setdefault(clinic_id, {})[user_id] = online
+        task = self._tasks.get(clinic_id)
+        if task is None or task.done():
+            self._tasks[clinic_id] = asyncio.get_running_loop().create_task(
+                self._flush_later(clinic_id),
+            )
+
+    async def _flush_later(self, clinic_id) -> None:
+        await asyncio.sleep(PRESENCE_BROADCAST_INTERVAL)
+        await self.flush(clinic_id)
+
+    async def flush(self, clinic_id) -> None:
+        from asgiref.sync import sync_to_async
+        from channels.layers import get_channel_layer
+
+        changes = self._pending.pop(clinic_id, {})
+        try:
+            for user_id in await sync_to_async(get_store().sweep)(clinic_id):
+                changes.setdefault(user_id, False)
+        except Exception as exc:
+            logger.warning('Presence sweep failed for clinic %s: %s', clinic_id, exc)
+
+        if not changes:
+            return
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        await channel_layer.group_send(clinic_group_name(clinic_id), {
+            'type':    'presence.batch',
+            'online':  sorted(uid for uid, up in changes.items() if up),
+            'offline': sorted(uid for uid, up in changes.items() if not up),
+        })
+
+
+broadcaster = PresenceBroadcaster()
+
+
+# ── Consumer mixin ────────────────────────────────────────────────────────────
+
+class PresenceMixin:
+    """
+    Registers a consumer's socket in the presence store and keeps it alive
+    with a server-side heartbeat. Call presence_join() after accept() and
+    presence_leave() from disconnect().
+    """
+
+    async def presence_join(self, user_id, main_clinic_id) -> None:
+        from asgiref.sync import sync_to_async
+
+        self.presence_user_id   = user_id
+        self.presence_clinic_id = main_clinic_id
+        try:
+            came_online = await sync_to_async(get_store().add_connection)(
+                user_id, main_clinic_id, self.channel_name,
+            )
+        except Exception as exc:
+            logger.warning('Presence register failed for user %s: %s', user_id, exc)
+            return
+        if came_online:
+            broadcaster.queue(main_clinic_id, user_id, True)
+        self._presence_task = asyncio.get_running_loop().create_task(self._presence_heartbeat())
+
+    async def presence_beat(self) -> None:
+        from asgiref.sync import sync_to_async
+
+        if getattr(self, 'presence_clinic_id', None) is None:
+            return
+        try:
+            await sync_to_async(get_store().heartbeat)(
+                self.presence_user_id, self.presence_clinic_id, self.channel_name,
+            )
+        except Exception as exc:
+            logger.warning('Presence heartbeat failed for user %s: %s', self.presence_user_id, exc)
+
+    async def _presence_heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(PRESENCE_HEARTBEAT)
+            await self.presence_beat()
+
+    async def presence_leave(self) -> None:
+        from asgiref.sync import sync_to_async
+
+        task = getattr(self, '_presence_task', None)
+        if task is not None:
+            task.cancel()
+        if getattr(self, 'presence_clinic_id', None) is None:
+            return
+        try:
+            went_offline = await sync_to_async(get_store().remove_connection)(
+                self.presence_user_id, self.presence_clinic_id, self.channel_name,
+            )
+        except Exception as exc:
+            logger.warning('Presence unregister failed for user %s: %s', self.presence_user_id, exc)
+            return
+        if went_offline:
+            broadcaster.queue(self.presence_clinic_id, self.presence_user_id, False)
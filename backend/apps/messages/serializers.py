@@ -68,14 +68,25 @@ class ConversationSerializer(serializers.ModelSerializer):
 
     def get_other_participant(self, obj):
         request = self.context.get('request')
-        other   = obj.get_other_participant(request.user)
+        # Iterate the prefetched participants rather than querying per row
+        other   = next(
+            (p for p in obj.participants.all() if p.pk != request.user.pk), None,
+        )
         return ParticipantSerializer(other, context=self.context).data if other else None
 
     def get_last_message(self, obj):
-        msg = obj.messages.filter(is_deleted=False).last()
+        last_messages = self.context.get('last_messages')
+        if last_messages is not None and hasattr(obj, 'last_message_id'):
+            msg = last_messages.get(obj.last_message_id)
+        else:
+            msg = obj.messages.filter(is_deleted=False).last()
         return MessageSerializer(msg, context=self.context).data if msg else None
 
     def get_unread_count(self, obj):
+        # Annotated by ConversationViewSet._base_qs
+        if hasattr(obj, 'my_unread_count'):
+            return obj.my_unread_count
+
         request = self.context.get('request')
         try:
             membership = obj.memberships.get(user=request.user)
@@ -0,0 +1,178 @@
+"""
+Server-side throttling of chat typing indicators.
+
+Clients send a `typing` action on every keystroke. Forwarding each one to
+the conversation group costs a channel-layer publish, so events are
+coalesced per (conversation, user):
+
+  • every publish — start, refresh or stop — is at least
+    CHAT_TYPING_MIN_INTERVAL seconds after the previous one; the client's
+    indicator stays up as long as refreshes arrive more often than its 3s
+    timeout;
+  • a change that arrives sooner is held and sent once the interval is up,
+    only if it still differs from what was last published — a quick stop
+    followed by a start (or the reverse) sends nothing;
+  • a trailing "stopped typing" is sent CHAT_TYPING_IDLE_TIMEOUT seconds
+    after the last event, so indicators never get stuck on.
+
+Publishes per (conversation, user) are therefore bounded by the interval
+regardless of client behaviour (plus one final stop when the user's last
+socket closes). Counters (received / forwarded / dropped) are kept per
+process for monitoring — see typing_counters().
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+from django.conf import settings
+
+TYPING_MIN_INTERVAL = getattr(settings, 'CHAT_TYPING_MIN_INTERVAL', 2.0)
+TYPING_IDLE_TIMEOUT = getattr(settings, 'CHAT_TYPING_IDLE_TIMEOUT', 4.0)
+
+_counters: Counter = Counter()
+
+Publish = Callable[[bool], Awaitable[None]]
+
+
+def typing_counters() -> dict:
+    """Snapshot of this process's typing counters."""
+    return dict(_counters)
+
+
+class _State:
+    __slots__ = ('announced', 'wanted', 'last_sent', 'trailing', 'flush', 'publish', 'holders')
+
+    def __init__(self):
+        self.announced = False                  # last state published to the group
+        self.wanted    = False                  # state the client asked for last
+        self.last_sent = float('-inf')
+        self.trailing: asyncio.TimerHandle | None = None
+        self.flush:    asyncio.TimerHandle | None = None
+        self.publish:  Publish | None = None
+        self.holders   = 0
+
+
+class TypingThrottle:
+    """
+    Per-process registry of typing state keyed by (conversation, user), so
+    several sockets of the same user in one conversation share one budget.
+    """
+
+    def __init__(self):
+        self._states: dict[tuple, _State] = {}
+
+    def attach(self, key) -> None:
+        self._states.setdefault(key, _State()).holders += 1
+
+    async def detach(self, key, publish: Publish) -> None:
+        """Last socket for the key is closing — send a final stop if needed."""
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.holders -= 1
+        if state.holders > 0:
+            return
+        self._states.pop(key, None)
+        self._cancel_trailing(state)
+        self._cancel_flush(state)
+        if state.announced:
+            _counters['forwarded'] += 1
+            await publish(False)
+
+    async def event(self, key, is_typing: bool, publish: Publish) -> None:
+        """Handle one client typing event; publish only when it changes something."""
+        _counters['received'] += 1
+        state = self._states.setdefault(key, _State())
+        if is_typing:
+            self._schedule_trailing(key, state, publish)
+        else:
+            self._cancel_trailing(state)
+        if not await self._update(key, state, is_typing, publish):
+            _counters['dropped'] += 1
+
+    async def stop(self, key, publish: Publish) -> None:
+        """Explicit stop (message sent)."""
+        state = self._states.get(key)
+        if state is None:
+            return
+        self._cancel_trailing(state)
+        await self._update(key, state, False, publish)
+
+    # ── publishing ────────────────────────────────────────────────────────
+
+    async def _update(self, key, state: _State, wanted: bool, publish: Publish) -> bool:
+        """Record the wanted state; publish it now if allowed. True if published."""
+        state.wanted  = wanted
+        state.publish = publish
+        now = time.monotonic()
+        due = state.last_sent + TYPING_MIN_INTERVAL
+
+        if wanted == state.announced and not (wanted and now >= due):
+            # Already published (a held opposite change is coalesced away),
+            # or a refresh that is not due yet
+            self._cancel_flush(state)
+            return False
+
+        if now < due:
+            # Too soon after the last publish — send the final state later
+            if state.flush is None:
+                loop = asyncio.get_running_loop()
+                state.flush = loop.call_later(
+                    due - now, lambda: loop.create_task(self._flush(key)),
+                )
+            return False
+
+        self._cancel_flush(state)
+        await self._publish(state, wanted)
+        return True
+
+    async def _flush(self, key) -> None:
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.flush = None
+        if state.wanted != state.announced:
+            await self._publish(state, state.wanted)
+
+    @staticmethod
+    async def _publish(state: _State, is_typing: bool) -> None:
+        state.announced = is_typing
+        state.last_sent = time.monotonic()
+        _counters['forwarded'] += 1
+        await state.publish(is_typing)
+
+    @staticmethod
+    def _cancel_flush(state: _State) -> None:
+        if state.flush is not None:
+            state.flush.cancel()
+            state.flush = None
+
+    # ── trailing stop ─────────────────────────────────────────────────────
+
+    def _schedule_trailing(self, key, state: _State, publish: Publish) -> None:
+        self._cancel_trailing(state)
+        loop = asyncio.get_running_loop()
+        state.trailing = loop.call_later(
+            TYPING_IDLE_TIMEOUT,
+            lambda: loop.create_task(self._trailing_stop(key, publish)),
+        )
+
+    async def _trailing_stop(self, key, publish: Publish) -> None:
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.trailing = None
+        if await self._update(key, state, False, publish):
+            _counters['trailing_stops'] += 1
+
+    @staticmethod
+    def _cancel_trailing(state: _State) -> None:
+        if state.trailing is not None:
+            state.trailing.cancel()
+            state.trailing = None
+
+
+typing_throttle = TypingThrottle()
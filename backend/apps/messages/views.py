@@ -2,10 +2,11 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
 from django.utils import timezone
 import logging
 
+from . import presence
 from .models import Conversation, ConversationParticipant, Message
 from .serializers import (
     ConversationSerializer,
@@ -18,6 +19,9 @@ logger = logging.getLogger(__name__)
 
 ALLOWED_ROLES = ('ADMIN', 'STAFF', 'PRACTITIONER')
 
+MESSAGE_PAGE_SIZE     = 50
+MESSAGE_PAGE_SIZE_MAX = 200
+
 
 class ConversationViewSet(viewsets.GenericViewSet):
     """
@@ -29,30 +33,65 @@ class ConversationViewSet(viewsets.GenericViewSet):
     POST   /api/conversations/{id}/mark_read/  → mark conversation as read
     GET    /api/conversations/contacts/        → list messageable colleagues
     GET    /api/conversations/unread_count/    → total unread badge count
+    GET    /api/conversations/online/          → colleagues with a live socket
     """
 
     permission_classes = [IsAuthenticated]
     serializer_class   = ConversationSerializer
 
     def _base_qs(self):
-        """Conversations where the requesting user is a participant."""
+        """
+        Conversations where the requesting user is a participant, annotated
+        in one query with the user's unread count and the last message id.
+        """
+        user = self.request.user
+
+        my_membership = ConversationParticipant.objects.filter(
+            conversation=OuterRef('pk'),
+            user=user,
+        )
+        last_message = (
+            Message.objects
+            .filter(conversation=OuterRef('pk'), is_deleted=False)
+            .order_by('-created_at', '-id')
+        )
+        unread = (
+            Q(messages__is_deleted=False)
+            & ~Q(messages__sender_id=user.pk)
+            & (
+                Q(my_last_read_at__isnull=True)
+                | Q(messages__created_at__gt=F('my_last_read_at'))
+            )
+        )
+
         return (
             Conversation.objects
             .filter(
-                memberships__user=self.request.user,
+                id__in=ConversationParticipant.objects.filter(user=user).values('conversation_id'),
                 is_deleted=False,
             )
             .select_related('clinic')
-            .prefetch_related('participants', 'memberships')
-            .distinct()
+            .prefetch_related('participants__clinic', 'participants__clinic_branch')
+            .annotate(
+                my_last_read_at = Subquery(my_membership.values('last_read_at')[:1]),
+                last_message_id = Subquery(last_message.values('id')[:1]),
+            )
+            .annotate(my_unread_count=Count('messages', filter=unread))
             .order_by('-updated_at')
         )
 
     # ── List conversations ────────────────────────────────────────────────
 
     def list(self, request):
-        qs = self._base_qs()
-        serializer = ConversationSerializer(qs, many=True, context={'request': request})
+        conversations = list(self._base_qs())
+        last_messages = Message.objects.select_related('sender').in_bulk(
+            [c.last_message_id for c in conversations if c.last_message_id]
+        )
+        serializer = ConversationSerializer(
+            conversations,
+            many=True,
+            context={'request': request, 'last_messages': last_messages},
+        )
         return Response(serializer.data)
 
     # ── Start / retrieve a conversation ───────────────────────────────────
@@ -115,9 +154,83 @@ class ConversationViewSet(viewsets.GenericViewSet):
         if isinstance(conversation, Response):
             return conversation
 
-        qs  = conversation.messages.filter(is_deleted=False).order_by('created_at')
-        ser = MessageSerializer(qs, many=True, context={'request': request})
-        return Response(ser.data)
+        qs = (
+            conversation.messages
+            .filter(is_deleted=False)
+            .select_related('sender')
+            .order_by('created_at', 'id')
+        )
+
+        params = request.query_params
+        if not any(k in params for k in ('limit', 'before', 'after')):
+            # Legacy: full history as a bare list
+            ser = MessageSerializer(qs, many=True, context={'request': request})
+            return Response(ser.data)
+
+        return self._paginate_messages(request, conversation, qs)
+
+    def _paginate_messages(self, request, conversation, qs):
+        """
+        Keyset pagination on (created_at, id).
+
+          ?limit=N           → latest N messages (default 50, max 200)
+          ?before=<msg_id>   → N messages older than that message
+          ?after=<msg_id>    → N messages newer than that message
+
+        Results are always oldest → newest; `before` / `after` in the response
+        are the anchors for the next older / newer page.
+        """
+        params = request.query_params
+        try:
+            limit = int(params.get('limit', MESSAGE_PAGE_SIZE))
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MESSAGE_PAGE_SIZE_MAX))
+
+        anchor_key = next((k for k in ('before', 'after') if k in params), None)
+        anchor     = None
+        if anchor_key:
+            anchor_id = params.get(anchor_key, '')
+            if anchor_id.isdigit():
+                anchor = (
+                    Message.objects
+                    .filter(conversation=conversation, pk=anchor_id)
+                    .values('created_at', 'id')
+                    .first()
+                )
+            if anchor is None:
+                return Response(
+                    {'detail': f'{anchor_key} must be a message id in this conversation.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        if anchor_key == 'after':
+            page = list(qs.filter(
+                Q(created_at__gt=anchor['created_at'])
+                | Q(created_at=anchor['created_at'], id__gt=anchor['id'])
+            )[:limit + 1])
+            has_newer = len(page) > limit
+            page      = page[:limit]
+            has_older = True
+        else:
+            if anchor_key == 'before':
+                qs = qs.filter(
+                    Q(created_at__lt=anchor['created_at'])
+                    | Q(created_at=anchor['created_at'], id__lt=anchor['id'])
+                )
+            page = list(qs.order_by('-created_at', '-id')[:limit + 1])
+            has_older = len(page) > limit
+            page      = page[:limit][::-1]
+            has_newer = anchor_key == 'before'
+
+        ser = MessageSerializer(page, many=True, context={'request': request})
+        return Response({
+            'results':   ser.data,
+            'has_older': has_older,
+            'has_newer': has_newer,
+            'before':    page[0].id if page and has_older else None,
+            'after':     page[-1].id if page else (anchor['id'] if anchor else None),
+        })
 
     # ── Mark as read ──────────────────────────────────────────────────────
 
@@ -130,7 +243,7 @@ class ConversationViewSet(viewsets.GenericViewSet):
         ConversationParticipant.objects.filter(
             conversation=conversation,
             user=request.user,
-        ).update(last_read_at=timezone.now())
+        ).update(last_read_at=timezone.now(), unread_count=0)
 
         return Response({'detail': 'Marked as read.'})
 
@@ -162,26 +275,28 @@ class ConversationViewSet(viewsets.GenericViewSet):
             ParticipantSerializer(users, many=True, context={'request': request}).data
         )
 
+    # ── Who is online ─────────────────────────────────────────────────────
+
+    @action(detail=False, methods=['get'])
+    def online(self, request):
+        """IDs of colleagues in the user's clinic family with a live socket."""
+        if not request.user.clinic:
+            return Response({'online': []})
+
+        online_ids = presence.online_users(request.user.clinic.main_clinic.id)
+        online_ids.discard(request.user.pk)
+        return Response({'online': sorted(online_ids)})
+
     # ── Total unread badge count ──────────────────────────────────────────
 
     @action(detail=False, methods=['get'], url_path='unread_count')
     def unread_count(self, request):
-        total = 0
-        for conv in self._base_qs():
-            try:
-                membership = conv.memberships.get(user=request.user)
-                if membership.last_read_at is None:
-                    total += conv.messages.filter(is_deleted=False).exclude(
-                        sender=request.user
-                    ).count()
-                else:
-                    total += conv.messages.filter(
-                        is_deleted=False,
-                        created_at__gt=membership.last_read_at,
-                    ).exclude(sender=request.user).count()
-            except ConversationParticipant.DoesNotExist:
-                pass
-        return Response({'unread_count': total})
+        # Denormalized per-participant counters — one aggregate, no message scan
+        total = ConversationParticipant.objects.filter(
+            user=request.user,
+            conversation__is_deleted=False,
+        ).aggregate(total=Sum('unread_count'))['total']
+        return Response({'unread_count': total or 0})
 
     # ── Helper ────────────────────────────────────────────────────────────
 
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Notification, NotificationRead, EmailLog, SMSLog
+from .models import (
+    ArchivedNotification, Notification, NotificationRead, NotificationReadState, EmailLog, SMSLog,
+    InboundSMS, OutboundMessage, WorkflowCheckpoint, WorkflowRun,
+)
 
 
 @admin.register(Notification)
@@ -17,6 +20,50 @@ class NotificationReadAdmin(admin.ModelAdmin):
     raw_id_fields = ['notification', 'user']
 
 
+@admin.register(NotificationReadState)
+class NotificationReadStateAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'user', 'clinic', 'last_read_id', 'unread_count', 'last_read_at']
+    raw_id_fields = ['user', 'clinic']
+
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'clinic_id', 'notification_type', 'title', 'created_at', 'archived_at']
+    list_filter   = ['notification_type']
+    search_fields = ['title', 'message']
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'comm_type', 'channel', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter   = ['status', 'channel', 'comm_type']
+    search_fields = ['recipient', 'idempotency_key']
+    raw_id_fields = ['clinic', 'patient', 'appointment']
+
+
+@admin.register(InboundSMS)
+class InboundSMSAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'from_number', 'reply', 'status', 'attempts', 'result', 'created_at', 'processed_at']
+    list_filter   = ['status', 'reply']
+    search_fields = ['from_number', 'from_e164', 'message_sid']
+    raw_id_fields = ['patient', 'appointment']
+
+
+class WorkflowCheckpointInline(admin.TabularInline):
+    model           = WorkflowCheckpoint
+    extra           = 0
+    raw_id_fields   = ['clinic']
+    readonly_fields = ['status', 'attempts', 'started_at', 'finished_at', 'duration_ms', 'result', 'error']
+
+
+@admin.register(WorkflowRun)
+class WorkflowRunAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'run_key', 'job', 'status', 'started_at', 'duration_ms']
+    list_filter   = ['job', 'status']
+    search_fields = ['run_key']
+    inlines       = [WorkflowCheckpointInline]
+
+
 @admin.register(EmailLog)
 class EmailLogAdmin(admin.ModelAdmin):
     list_display = ['id', 'recipient_email', 'subject', 'is_sent', 'sent_at']
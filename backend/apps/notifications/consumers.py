@@ -1,20 +1,31 @@
 import json
 import logging
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.contrib.auth.models import AnonymousUser
 
+from apps.messages.presence import PresenceMixin
+
+from apps.notifications.services.notification_service import (
+    clinic_group_name,
+    user_group_name,
+)
+
 logger = logging.getLogger(__name__)
 
 
-class NotificationConsumer(AsyncJsonWebsocketConsumer):
+class NotificationConsumer(PresenceMixin, AsyncJsonWebsocketConsumer):
     """
     WebSocket consumer for real-time notification push.
 
-    Each authenticated user joins their own private group:
-        notifications_<user_id>
+    Each authenticated user joins two groups:
+        notifications_<user_id>            — targeted, per-user events
+        notifications_clinic_<main_id>     — clinic-wide notifications
 
-    The notification service pushes to ALL users in a clinic
-    by iterating their individual groups.
+    The notification service publishes a clinic-wide notification ONCE to
+    the clinic-family group, so the cost of a push does not depend on how
+    many users the clinic has. The socket is also registered in the presence
+    store, so pushes can be skipped for users with no live connection.
     """
 
     async def connect(self):
@@ -24,25 +35,28 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
             await self.close(code=4001)
             return
 
-        self.group_name = f'notifications_{self.user.id}'
+        self.group_names = [user_group_name(self.user.id)]
 
-        await self.channel_layer.group_add(
-            self.group_name,
-            self.channel_name,
-        )
+        main_clinic_id = await self._get_main_clinic_id()
+        if main_clinic_id:
+            self.group_names.append(clinic_group_name(main_clinic_id))
+
+        for group_name in self.group_names:
+            await self.channel_layer.group_add(group_name, self.channel_name)
         await self.accept()
 
+        if main_clinic_id:
+            await self.presence_join(self.user.id, main_clinic_id)
+
         logger.debug(
-            '[WS:notifications] user %s connected to group %s',
-            self.user.id, self.group_name,
+            '[WS:notifications] user %s connected to groups %s',
+            self.user.id, self.group_names,
         )
 
     async def disconnect(self, close_code):
-        if hasattr(self, 'group_name'):
-            await self.channel_layer.group_discard(
-                self.group_name,
-                self.channel_name,
-            )
+        await self.presence_leave()
+        for group_name in getattr(self, 'group_names', []):
+            await self.channel_layer.group_discard(group_name, self.channel_name)
         logger.debug(
             '[WS:notifications] user %s disconnected (code=%s)',
             getattr(self.user, 'id', '?'), close_code,
@@ -53,12 +67,23 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
         msg_type = content.get('type', '')
 
         if msg_type == 'ping':
+            await self.presence_beat()
             await self.send_json({'type': 'pong'})
 
+    @database_sync_to_async
+    def _get_main_clinic_id(self):
+        """Root clinic of the user's clinic family — None for inactive or clinic-less users."""
+        if not self.user.is_active or getattr(self.user, 'is_deleted', False):
+            return None
+        clinic = getattr(self.user, 'clinic', None)
+        if clinic is None:
+            return None
+        return clinic.main_clinic.id
+
     # ── Handler for notification.new events ───────────────────────────────────
     async def notification_new(self, event):
         """Called by channel layer group_send when a new notification is created."""
         await self.send_json({
             'type': 'notification.new',
             'notification': event['notification'],
-        })
\ No newline at end of file
+        })
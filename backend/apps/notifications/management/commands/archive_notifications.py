@@ -0,0 +1,82 @@
+"""
+Move expired notifications (and their read receipts) to the archive tables.
+
+Usage:
+    python manage.py archive_notifications
+    python manage.py archive_notifications --dry-run
+    python manage.py archive_notifications --type DAILY_SUMMARY --batch-size 500
+    python manage.py archive_notifications --max-batches 20
+
+Retention windows come from NOTIFICATION_RETENTION_DAYS (per type) and
+NOTIFICATION_RETENTION_DEFAULT_DAYS. Safe to interrupt and re-run.
+"""
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.notifications.models import Notification
+from apps.notifications.services.retention_service import (
+    ARCHIVE_BATCH_SIZE,
+    archive_expired,
+    retention_cutoffs,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Archive notifications older than their retention window.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type', dest='types', action='append', default=None,
+            help='Only archive this notification type (repeatable).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f'Rows moved per transaction. Default {ARCHIVE_BATCH_SIZE}.',
+        )
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='Stop after this many batches (the next run resumes).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count what would be archived.',
+        )
+
+    def handle(self, *args, **options):
+        types       = options['types']
+        batch_size  = options['batch_size']
+        max_batches = options['max_batches']
+        dry_run     = options['dry_run']
+
+        known = {code for code, _ in Notification.NOTIFICATION_TYPE_CHOICES}
+        if types and set(types) - known:
+            raise CommandError(f"Unknown notification type(s): {', '.join(sorted(set(types) - known))}")
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{'[DRY RUN] ' if dry_run else ''}Notification Archive"
+        ))
+
+        cutoffs = retention_cutoffs()
+        for code, cutoff in cutoffs.items():
+            if types and code not in types:
+                continue
+            self.stdout.write(f"  {code:<14} before {cutoff:%Y-%m-%d %H:%M}")
+        self.stdout.write("")
+
+        if dry_run:
+            for code, cutoff in cutoffs.items():
+                if types and code not in types:
+                    continue
+                count = Notification.objects.filter(notification_type=code, created_at__lt=cutoff).count()
+                self.stdout.write(f"  {code:<14} {count} notification(s) would be archived")
+            return
+
+        archived = archive_expired(batch_size=batch_size, max_batches=max_batches, types=types)
+        for code, count in archived.items():
+            self.stdout.write(self.style.SUCCESS(f"  {code:<14} archived {count}"))
+        logger.info("archive_notifications complete: %s", archived)
@@ -0,0 +1,162 @@
+"""
+Load-test the communication commands offline.
+
+Usage:
+    python manage.py benchmark_communications
+    python manage.py benchmark_communications --clinics 20 --patients 500
+    python manage.py benchmark_communications --jobs send_dna_followups send_inactive_checkins
+    python manage.py benchmark_communications --sms-latency-ms 150 --email-backend file
+    python manage.py benchmark_communications --json --max-queries-per-message 6   # CI gate
+
+Seeds clinics, patients and appointments, swaps in local transports (no
+SMTP, no Twilio) and runs each communication command end to end: the
+command itself, then delivery of everything it queued in the outbox.
+Reports per job:
+
+  messages    outbox rows queued (an email and an SMS count as two)
+  msg/s       messages / (command + delivery time)
+  q/msg       SQL queries per message, command and delivery together
+  p50 / p95   latency of one recipient's service call, in ms (skipped
+              calls are not sampled)
+
+SMS reminders are switched on (SMS_REMINDERS_ENABLED) for the run, so the
+SMS path is measured whatever the environment says.
+
+Every job starts from the freshly seeded data, and everything is rolled
+back at the end unless --keep is given.
+"""
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.common import mail_transport, sms_transport
+from apps.notifications.services import benchmark, inbound_sms, outbox
+
+EMAIL_BACKENDS = {
+    'locmem':  'django.core.mail.backends.locmem.EmailBackend',
+    'file':    'django.core.mail.backends.filebased.EmailBackend',
+    'console': 'django.core.mail.backends.console.EmailBackend',
+}
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic data and benchmark the communication commands against local transports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinics', type=int, default=5, help='Main clinics to seed. Default 5.')
+        parser.add_argument('--patients', type=int, default=200, help='Patients per clinic. Default 200.')
+        parser.add_argument(
+            '--channel', choices=['EMAIL', 'SMS', 'BOTH'], default='BOTH',
+            help='reminder_method for the seeded clinics. Default BOTH.',
+        )
+        parser.add_argument(
+            '--jobs', nargs='+', choices=list(benchmark.BENCH_JOBS), default=list(benchmark.BENCH_JOBS),
+            help='Commands to run. Default: all.',
+        )
+        parser.add_argument(
+            '--email-backend', choices=list(EMAIL_BACKENDS), default='locmem',
+            help='Where emails go: memory, .eml files in a temp directory, or stdout. Default locmem.',
+        )
+        parser.add_argument('--sms-latency-ms', type=float, default=0, help='Simulated provider round trip per SMS.')
+        parser.add_argument('--rate-limits', action='store_true', help='Keep the outbox per-channel rate limits.')
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded data and the last job\'s results.')
+        parser.add_argument('--force', action='store_true', help='Allow running with DEBUG off.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument(
+            '--max-queries-per-message', type=float, default=None,
+            help='Fail if any job needs more queries per message than this.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to seed benchmark data with DEBUG off — pass --force to run anyway.")
+
+        email_backend = EMAIL_BACKENDS[options['email_backend']]
+        mail_dir      = tempfile.mkdtemp(prefix='pms-bench-mail-') if options['email_backend'] == 'file' else None
+
+        saved = (
+            settings.EMAIL_BACKEND, getattr(settings, 'EMAIL_FILE_PATH', None),
+            sms_transport.SMS_BACKEND, sms_transport.SMS_LOCMEM_LATENCY_MS, sms_transport._backend,
+            outbox.OUTBOX_AUTOSTART, inbound_sms.INBOUND_SMS_AUTOSTART,
+            settings.SMS_REMINDERS_ENABLED,
+        )
+        settings.EMAIL_BACKEND                = email_backend
+        settings.EMAIL_FILE_PATH              = mail_dir
+        sms_transport.SMS_BACKEND             = 'apps.common.sms_transport.LocmemBackend'
+        sms_transport.SMS_LOCMEM_LATENCY_MS   = options['sms_latency_ms']
+        sms_transport._backend                = None
+        outbox.OUTBOX_AUTOSTART               = False
+        inbound_sms.INBOUND_SMS_AUTOSTART     = False
+        settings.SMS_REMINDERS_ENABLED        = True
+        mail_transport.close_pool()
+
+        try:
+            reports, counts = self._run(options)
+        finally:
+            (
+                settings.EMAIL_BACKEND, settings.EMAIL_FILE_PATH,
+                sms_transport.SMS_BACKEND, sms_transport.SMS_LOCMEM_LATENCY_MS, sms_transport._backend,
+                outbox.OUTBOX_AUTOSTART, inbound_sms.INBOUND_SMS_AUTOSTART,
+                settings.SMS_REMINDERS_ENABLED,
+            ) = saved
+            mail_transport.close_pool()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'seed': counts, 'jobs': [r.as_dict() for r in reports]}, indent=2))
+        else:
+            self._print(reports, counts, mail_dir)
+
+        limit = options['max_queries_per_message']
+        if limit is not None:
+            over = [r for r in reports if r.queries_per_message > limit]
+            if over:
+                raise CommandError(
+                    'Queries per message above %s: %s' % (
+                        limit, ', '.join(f'{r.job} ({r.queries_per_message:.2f})' for r in over),
+                    )
+                )
+
+    def _run(self, options):
+        reports = []
+        with transaction.atomic():
+            counts = benchmark.seed(options['clinics'], options['patients'], channel=options['channel'])
+
+            for n, job in enumerate(options['jobs']):
+                last = n == len(options['jobs']) - 1
+                savepoint = transaction.savepoint()
+                sms_transport.LocmemBackend.outbox.clear()
+                reports.append(benchmark.run_job(job, rate_limits=options['rate_limits']))
+                # Undo the job so the next one sees the seeded data unchanged
+                if not (options['keep'] and last):
+                    transaction.savepoint_rollback(savepoint)
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+        return reports, counts
+
+    def _print(self, reports, counts, mail_dir):
+        self.stdout.write(self.style.MIGRATE_HEADING("\nCommunication benchmark"))
+        self.stdout.write(
+            f"  Seeded  : {counts['clinics']} clinics, {counts['patients']} patients, "
+            f"{counts['appointments']} appointments"
+        )
+        if mail_dir:
+            self.stdout.write(f"  Emails  : {mail_dir}")
+
+        self.stdout.write(
+            f"\n  {'Job':<30} {'Recip.':>6} {'Msgs':>6} {'Failed':>6} {'Cmd s':>7} {'Dlv s':>7} "
+            f"{'msg/s':>8} {'q/msg':>6} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        self.stdout.write("  " + "─" * 104)
+        for report in reports:
+            row = report.as_dict()
+            line = (
+                f"  {row['job']:<30} {row['recipients']:>6} {row['messages']:>6} {row['failed']:>6} "
+                f"{row['command_s']:>7.2f} {row['delivery_s']:>7.2f} {row['throughput']:>8.1f} "
+                f"{row['queries_per_message']:>6.2f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['failed'] else line)
+        self.stdout.write("")
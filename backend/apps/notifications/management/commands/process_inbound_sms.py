@@ -0,0 +1,47 @@
+"""
+Process SMS replies recorded by the webhook.
+
+Usage:
+    python manage.py process_inbound_sms            # process what is pending, then exit
+    python manage.py process_inbound_sms --stats
+
+Web processes handle new replies on an in-process pool as they arrive
+(INBOUND_SMS_AUTOSTART); this command retries failures and picks up
+anything left behind by a restart.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from apps.notifications.models import InboundSMS
+from apps.notifications.services import inbound_sms
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Apply pending inbound SMS replies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Only print inbound SMS counts by status.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            rows = InboundSMS.objects.values('status').annotate(n=Count('id')).order_by('status')
+            for row in rows:
+                self.stdout.write(f"  {row['status']:<10} {row['n']}")
+            return
+
+        started   = time.monotonic()
+        processed = inbound_sms.process_pending()
+        elapsed   = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"  Processed {processed} reply(ies) in {elapsed:.1f}s"
+        ))
+        logger.info("process_inbound_sms: %s replies in %.1fs", processed, elapsed)
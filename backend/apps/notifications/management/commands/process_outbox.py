@@ -0,0 +1,73 @@
+"""
+Deliver queued patient emails / SMS from the outbox.
+
+Usage:
+    python manage.py process_outbox                 # drain what is due, then exit
+    python manage.py process_outbox --workers 8
+    python manage.py process_outbox --forever       # long-running worker pool
+    python manage.py process_outbox --stats
+
+Web processes also start an in-process worker pool when they enqueue
+(OUTBOX_AUTOSTART); this command picks up retries and anything left behind
+by a restart.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from apps.notifications.models import OutboundMessage
+from apps.notifications.services import outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send due outbox messages with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=outbox.OUTBOX_WORKERS,
+            help=f'Concurrent sender threads. Default {outbox.OUTBOX_WORKERS}.',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=None,
+            help='Stop claiming new batches after this many seconds.',
+        )
+        parser.add_argument(
+            '--forever', action='store_true',
+            help='Keep running and poll for new messages.',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Only print outbox counts by status.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            rows = OutboundMessage.objects.values('channel', 'status').annotate(n=Count('id')).order_by('channel', 'status')
+            for row in rows:
+                self.stdout.write(f"  {row['channel']:<6} {row['status']:<8} {row['n']}")
+            return
+
+        if options['forever']:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\nOutbox worker pool ({options['workers']} threads) — Ctrl+C to stop"
+            ))
+            outbox.start_workers(options['workers'])
+            try:
+                while True:
+                    time.sleep(outbox.OUTBOX_IDLE_POLL)
+                    outbox.wake()       # pick up retries that became due
+            except KeyboardInterrupt:
+                return
+
+        started   = time.monotonic()
+        processed = outbox.drain(timeout=options['timeout'], workers=options['workers'])
+        elapsed   = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"  Processed {processed} message(s) in {elapsed:.1f}s"
+        ))
+        logger.info("process_outbox: %s messages in %.1fs", processed, elapsed)
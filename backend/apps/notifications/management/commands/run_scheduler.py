@@ -0,0 +1,65 @@
+"""
+Run the continuous communication scheduler (Y/N reminders and rebook
+follow-ups dispatched at their own due time instead of in daily bursts).
+
+Usage:
+    python manage.py run_scheduler                   # run until stopped
+    python manage.py run_scheduler --rate 5 --jitter 120
+    python manage.py run_scheduler --once            # dispatch what is due now, then exit
+    python manage.py run_scheduler --once --dry-run  # list what is queued, send nothing
+
+Set COMMUNICATION_SCHEDULER = True while this runs so the 08:00 / 10:00
+crons for the same workflows stand down.
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.services import outbox, scheduler
+
+
+class Command(BaseCommand):
+    help = 'Dispatch reminders and rebook follow-ups continuously at their due time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rate', type=float, default=scheduler.SCHEDULER_RATE,
+            help=f'Max dispatches per second. Default {scheduler.SCHEDULER_RATE}.',
+        )
+        parser.add_argument(
+            '--jitter', type=float, default=scheduler.SCHEDULER_JITTER,
+            help=f'± seconds spread around each due time. Default {scheduler.SCHEDULER_JITTER}.',
+        )
+        parser.add_argument('--once', action='store_true', help='Load, dispatch what is due now, and exit.')
+        parser.add_argument('--dry-run', action='store_true', help='With --once: list the queue, send nothing.')
+
+    def handle(self, *args, **options):
+        sched = scheduler.CommunicationScheduler(rate=options['rate'], jitter=options['jitter'])
+
+        if options['once']:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{'[DRY RUN] ' if options['dry_run'] else ''}Communication Scheduler — single pass"
+            ))
+            added = sched.refresh()
+            self.stdout.write(f"  Loaded: {added} item(s)")
+            if options['dry_run']:
+                for item in sched.pending():
+                    self.stdout.write(f"    {item.due_at:%Y-%m-%d %H:%M:%S}  {item.kind:<8}  appointment {item.appointment_id}")
+                return
+            dispatched = sched.dispatch_due()
+            outbox.drain()
+            self.stdout.write(f"  Dispatched: {dispatched}")
+            self.stdout.write(f"  Stats: {sched.stats()}\n")
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nCommunication Scheduler"))
+        self.stdout.write(f"  Rate: {options['rate']}/s   Jitter: ±{options['jitter']}s   Ctrl+C to stop\n")
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        outbox.start_workers()
+        sched.run(stop)
+        self.stdout.write(f"\n  Stopped. Stats: {sched.stats()}\n")
@@ -0,0 +1,73 @@
+"""
+Run a communication workflow sharded per clinic across worker processes,
+with a resumable checkpoint per clinic.
+
+Usage:
+    python manage.py run_workflow send_communication_reminders
+    python manage.py run_workflow send_appointment_reminders --workers 8
+    python manage.py run_workflow send_dna_followups --clinic-id 3
+    python manage.py run_workflow send_communication_reminders --run-key reminders:2026-03-10
+    python manage.py run_workflow send_communication_reminders --status    # last run, no work
+
+Running the same run key again (the default key is the job plus today's
+date) resumes it: clinics that already finished are not run again.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.notifications.models import WorkflowRun
+from apps.notifications.services import workflow_runner
+
+
+class Command(BaseCommand):
+    help = 'Run a communication workflow per clinic across a process pool, resumably.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job', choices=sorted(workflow_runner.JOBS))
+        parser.add_argument(
+            '--workers', type=int, default=workflow_runner.WORKFLOW_WORKERS,
+            help=f'Worker processes. Default {workflow_runner.WORKFLOW_WORKERS}.',
+        )
+        parser.add_argument('--clinic-id', type=int, default=None, help='Restrict to one clinic family.')
+        parser.add_argument('--run-key', type=str, default=None, help='Run identifier to start or resume.')
+        parser.add_argument('--status', action='store_true', help='Show the latest run of this job and exit.')
+
+    def handle(self, *args, **options):
+        job = options['job']
+
+        if options['status']:
+            run = WorkflowRun.objects.filter(job=job).first()
+            if run is None:
+                raise CommandError(f"No runs recorded for {job}.")
+            self._report(run)
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nWorkflow: {job}"))
+        run = workflow_runner.run_workflow(
+            job,
+            workers   = options['workers'],
+            run_key   = options['run_key'],
+            clinic_id = options['clinic_id'],
+        )
+        self._report(run)
+        if run.status == 'FAILED':
+            raise CommandError(f"{run.run_key}: some clinics did not finish — run again to resume.")
+
+    def _report(self, run):
+        self.stdout.write(f"  Run     : {run.run_key}")
+        self.stdout.write(f"  Status  : {run.status}")
+        if run.duration_ms is not None:
+            self.stdout.write(f"  Duration: {run.duration_ms / 1000:.1f}s")
+
+        rows = workflow_runner.timing_summary(run)
+        if not rows:
+            return
+        self.stdout.write(f"\n  {'Clinic':<32} {'Status':<8} {'Tries':>5} {'ms':>8}  Result")
+        self.stdout.write("  " + "─" * 90)
+        for row in rows:
+            line = (
+                f"  {row['clinic'][:32]:<32} {row['status']:<8} {row['attempts']:>5} "
+                f"{row['duration_ms'] if row['duration_ms'] is not None else '—':>8}  "
+                f"{row['error'] or row['result']}"
+            )
+            style = self.style.ERROR if row['status'] == 'FAILED' else self.style.SUCCESS if row['status'] == 'DONE' else self.style.WARNING
+            self.stdout.write(style(line))
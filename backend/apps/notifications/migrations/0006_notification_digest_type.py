@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_communicationlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('NEW_BOOKING', 'New Appointment Booking'), ('DAILY_SUMMARY', 'Daily Appointments Summary'), ('DIGEST', 'Activity Digest')], db_index=True, max_length=30),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0013_cliniccommunicationsettings'),
+        ('notifications', '0006_notification_digest_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.BigIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('clinic', models.ForeignKey(help_text='The root/main clinic the watermark applies to.', on_delete=django.db.models.deletion.CASCADE, related_name='notification_read_states', to='clinics.clinic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_read_states',
+                'unique_together': {('user', 'clinic')},
+            },
+        ),
+    ]
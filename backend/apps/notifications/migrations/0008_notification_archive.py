@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_notification_read_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('clinic_id', models.BigIntegerField(db_index=True)),
+                ('clinic_branch_id', models.BigIntegerField(blank=True, null=True)),
+                ('appointment_id', models.BigIntegerField(blank=True, null=True)),
+                ('notification_type', models.CharField(max_length=30)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('link_url', models.CharField(blank=True, max_length=500)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'notifications_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='notificatio_created_055a5c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedNotificationRead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField()),
+                ('read_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'notification_reads_archive',
+                'indexes': [models.Index(fields=['notification_id'], name='notificatio_notific_e93fb3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0012_alter_blockappointment_visibility_type'),
+        ('clinics', '0013_cliniccommunicationsettings'),
+        ('notifications', '0008_notification_archive'),
+        ('patients', '0008_patient_last_checkin_sent_at_patient_last_visit_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('comm_type', models.CharField(choices=[('BOOKING_CONFIRMATION', 'Booking Confirmation'), ('RECURRING_CONFIRMATION', 'Recurring Booking Confirmation'), ('APPOINTMENT_REMINDER', 'Appointment Reminder'), ('DNA_FOLLOWUP', 'DNA / Decline Follow-up'), ('REBOOK_FOLLOWUP', 'No-Rebook Follow-up'), ('INACTIVE_CHECKIN', 'Inactive Patient Check-in'), ('CANCELLATION_NOTICE', 'Cancellation Notice')], max_length=30)),
+                ('channel', models.CharField(choices=[('EMAIL', 'Email'), ('SMS', 'SMS')], max_length=5)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='QUEUED', max_length=10)),
+                ('idempotency_key', models.CharField(max_length=200, unique=True)),
+                ('recipient', models.CharField(help_text='Email or phone number', max_length=200)),
+                ('subject', models.CharField(blank=True, max_length=500)),
+                ('body', models.TextField(help_text='Plain-text body (SMS text or email text part)')),
+                ('html_body', models.TextField(blank=True)),
+                ('reply_to', models.CharField(blank=True, max_length=254)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('provider_message_id', models.CharField(blank=True, max_length=100)),
+                ('error_message', models.TextField(blank=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbound_messages', to='appointments.appointment')),
+                ('clinic', models.ForeignKey(help_text='The root/main clinic the message is sent for.', on_delete=django.db.models.deletion.CASCADE, related_name='outbound_messages', to='clinics.clinic')),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbound_messages', to='patients.patient')),
+            ],
+            options={
+                'db_table': 'outbound_messages',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbound_me_status_805da6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0013_cliniccommunicationsettings'),
+        ('notifications', '0009_outbound_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50)),
+                ('run_key', models.CharField(max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='RUNNING', max_length=10)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'db_table': 'workflow_runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['job', 'started_at'], name='workflow_ru_job_ebed05_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkflowCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, help_text='Summary line printed by the command', max_length=200)),
+                ('error', models.TextField(blank=True)),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workflow_checkpoints', to='clinics.clinic')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='notifications.workflowrun')),
+            ],
+            options={
+                'db_table': 'workflow_checkpoints',
+                'indexes': [models.Index(fields=['run', 'status'], name='workflow_ch_run_id_114bc1_idx')],
+                'unique_together': {('run', 'clinic')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0013_appointment_starts_at'),
+        ('notifications', '0010_workflow_runs'),
+        ('patients', '0009_patient_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='communicationlog',
+            name='comm_type',
+            field=models.CharField(choices=[('BOOKING_CONFIRMATION', 'Booking Confirmation'), ('RECURRING_CONFIRMATION', 'Recurring Booking Confirmation'), ('APPOINTMENT_REMINDER', 'Appointment Reminder'), ('DNA_FOLLOWUP', 'DNA / Decline Follow-up'), ('REBOOK_FOLLOWUP', 'No-Rebook Follow-up'), ('INACTIVE_CHECKIN', 'Inactive Patient Check-in'), ('CANCELLATION_NOTICE', 'Cancellation Notice'), ('REPLY_ACKNOWLEDGEMENT', 'Reply Acknowledgement')], db_index=True, max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='outboundmessage',
+            name='comm_type',
+            field=models.CharField(choices=[('BOOKING_CONFIRMATION', 'Booking Confirmation'), ('RECURRING_CONFIRMATION', 'Recurring Booking Confirmation'), ('APPOINTMENT_REMINDER', 'Appointment Reminder'), ('DNA_FOLLOWUP', 'DNA / Decline Follow-up'), ('REBOOK_FOLLOWUP', 'No-Rebook Follow-up'), ('INACTIVE_CHECKIN', 'Inactive Patient Check-in'), ('CANCELLATION_NOTICE', 'Cancellation Notice'), ('REPLY_ACKNOWLEDGEMENT', 'Reply Acknowledgement')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='InboundSMS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('message_sid', models.CharField(max_length=64, unique=True)),
+                ('from_number', models.CharField(max_length=32)),
+                ('from_e164', models.CharField(blank=True, max_length=16)),
+                ('to_number', models.CharField(blank=True, max_length=32)),
+                ('reply', models.CharField(help_text='Y or N', max_length=1)),
+                ('status', models.CharField(choices=[('RECEIVED', 'Received'), ('PROCESSING', 'Processing'), ('PROCESSED', 'Processed'), ('UNMATCHED', 'Unmatched'), ('FAILED', 'Failed')], default='RECEIVED', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, max_length=200)),
+                ('error', models.TextField(blank=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inbound_sms', to='appointments.appointment')),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inbound_sms', to='patients.patient')),
+            ],
+            options={
+                'db_table': 'inbound_sms',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='inbound_sms_status_902066_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0013_appointment_starts_at'),
+        ('notifications', '0011_inbound_sms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='digest_appointments',
+            field=models.ManyToManyField(blank=True, related_name='digest_notifications', to='appointments.appointment'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:05
+
+from django.db import migrations
+
+
+def recount_unread_window(apps, schema_editor):
+    """
+    Read states created before the list window existed start at watermark 0,
+    so their badge counts notifications the list no longer shows. Advance each
+    watermark to the window seed (as get_read_state does for new states) and
+    recount inside the window.
+    """
+    from datetime import timedelta
+    from django.conf import settings
+    from django.utils import timezone
+
+    Notification          = apps.get_model('notifications', 'Notification')
+    NotificationReadState = apps.get_model('notifications', 'NotificationReadState')
+
+    window_start = timezone.now() - timedelta(days=getattr(settings, 'NOTIFICATION_LIST_WINDOW_DAYS', 30))
+    seeds = {}
+
+    for state in NotificationReadState.objects.order_by('id').iterator():
+        if state.clinic_id not in seeds:
+            seeds[state.clinic_id] = (
+                Notification.objects
+                .filter(clinic_id=state.clinic_id, created_at__lt=window_start)
+                .order_by('-created_at', '-id')
+                .values_list('id', flat=True)
+                .first()
+            ) or 0
+        last_read_id = max(state.last_read_id, seeds[state.clinic_id])
+        unread = (
+            Notification.objects
+            .filter(clinic_id=state.clinic_id, id__gt=last_read_id, created_at__gte=window_start)
+            .exclude(reads__user_id=state.user_id)
+            .count()
+        )
+        if (last_read_id, unread) != (state.last_read_id, state.unread_count):
+            NotificationReadState.objects.filter(pk=state.pk).update(
+                last_read_id=last_read_id, unread_count=unread,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0012_notification_digest_appointments'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_unread_window, migrations.RunPython.noop),
+    ]
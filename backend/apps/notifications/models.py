@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from apps.common.models import TimeStampedModel
 
 
@@ -7,17 +8,19 @@ class Notification(TimeStampedModel):
     Clinic-wide notification.
 
     ONE record per notification per clinic.  Every active user in that clinic
-    sees the same notification.  Per-user read status is tracked via the
-    NotificationRead join table.
+    sees the same notification.  Per-user read status is tracked via a
+    NotificationReadState watermark plus sparse NotificationRead rows.
 
     Covers:
       - NEW_BOOKING   : fired when a patient books an appointment
       - DAILY_SUMMARY : fired once per day per clinic branch
+      - DIGEST        : one summary for a bulk operation or a burst of bookings
     """
 
     NOTIFICATION_TYPE_CHOICES = [
         ('NEW_BOOKING',   'New Appointment Booking'),
         ('DAILY_SUMMARY', 'Daily Appointments Summary'),
+        ('DIGEST',        'Activity Digest'),
     ]
 
     # ── Scoping — clinic-wide, NOT per-user ───────────────────────────────────
@@ -47,6 +50,14 @@ class Notification(TimeStampedModel):
         related_name='notifications',
     )
 
+    # DIGEST only — the appointments it listed, so a later CONFIRMED update
+    # does not raise a NEW_BOOKING for them again
+    digest_appointments = models.ManyToManyField(
+        'appointments.Appointment',
+        blank=True,
+        related_name='digest_notifications',
+    )
+
     # The specific branch this notification concerns (display purposes)
     clinic_branch = models.ForeignKey(
         'clinics.Clinic',
@@ -98,6 +109,95 @@ class NotificationRead(models.Model):
         return f"User {self.user_id} read notification {self.notification_id}"
 
 
+class NotificationReadState(models.Model):
+    """
+    Per-user read watermark for a clinic's notifications.
+
+    A notification is read when its id is <= last_read_id, OR when a
+    NotificationRead row exists for it (sparse exceptions above the
+    watermark, from marking single notifications read).
+
+    unread_count is a cached counter — bumped when a notification is created
+    for the clinic, decremented by mark-read, zeroed by mark-all-read — so the
+    badge poll is a single-row read. It only counts notifications inside the
+    list window (NOTIFICATION_LIST_WINDOW_DAYS).
+    """
+
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        related_name='notification_read_states',
+    )
+    clinic = models.ForeignKey(
+        'clinics.Clinic',
+        on_delete=models.CASCADE,
+        related_name='notification_read_states',
+        help_text='The root/main clinic the watermark applies to.',
+    )
+
+    last_read_id = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table        = 'notification_read_states'
+        unique_together = [('user', 'clinic')]
+
+    def __str__(self):
+        return f"User {self.user_id} — clinic {self.clinic_id} read up to {self.last_read_id}"
+
+
+# ── Archive (cold storage) ────────────────────────────────────────────────────
+
+class ArchivedNotification(models.Model):
+    """
+    Notification moved out of the hot table by the retention job.
+
+    Keeps the original id and timestamps. References are plain ids (no FK
+    constraints), so archiving never cascades and old rows can be dropped by
+    created_at range.
+    """
+
+    id                = models.BigIntegerField(primary_key=True)
+    clinic_id         = models.BigIntegerField(db_index=True)
+    clinic_branch_id  = models.BigIntegerField(null=True, blank=True)
+    appointment_id    = models.BigIntegerField(null=True, blank=True)
+    notification_type = models.CharField(max_length=30)
+    title             = models.CharField(max_length=200)
+    message           = models.TextField()
+    link_url          = models.CharField(max_length=500, blank=True)
+    created_at        = models.DateTimeField()
+    updated_at        = models.DateTimeField()
+    archived_at       = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'notifications_archive'
+        ordering = ['-created_at']
+        indexes  = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"[archived {self.notification_type}] {self.title} — clinic {self.clinic_id}"
+
+
+class ArchivedNotificationRead(models.Model):
+    """Read receipt of an archived notification."""
+
+    notification_id = models.BigIntegerField()
+    user_id         = models.BigIntegerField()
+    read_at         = models.DateTimeField()
+
+    class Meta:
+        db_table = 'notification_reads_archive'
+        indexes  = [
+            models.Index(fields=['notification_id']),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id} read archived notification {self.notification_id}"
+
+
 class EmailLog(TimeStampedModel):
     """Log of emails sent"""
 
@@ -159,6 +259,7 @@ class CommunicationLog(TimeStampedModel):
         ('REBOOK_FOLLOWUP',         'No-Rebook Follow-up'),
         ('INACTIVE_CHECKIN',        'Inactive Patient Check-in'),
         ('CANCELLATION_NOTICE',     'Cancellation Notice'),
+        ('REPLY_ACKNOWLEDGEMENT',   'Reply Acknowledgement'),
     ]
 
     CHANNEL_CHOICES = [
@@ -214,4 +315,205 @@ class CommunicationLog(TimeStampedModel):
         ]
 
     def __str__(self):
-        return f"[{self.comm_type}] {self.channel} → {self.recipient} ({self.status})"
\ No newline at end of file
+        return f"[{self.comm_type}] {self.channel} → {self.recipient} ({self.status})"
+
+class OutboundMessage(TimeStampedModel):
+    """
+    Outbox row for one patient email / SMS.
+
+    Request handlers and cron commands enqueue rows here; the outbox worker
+    pool (services/outbox.py) sends them, retries failures with exponential
+    backoff and writes the final CommunicationLog entry.
+
+    idempotency_key is unique — enqueueing the same (comm_type, channel,
+    appointment) twice yields the existing row instead of a second send.
+    """
+
+    STATUS_CHOICES = [
+        ('QUEUED',  'Queued'),
+        ('SENDING', 'Sending'),
+        ('SENT',    'Sent'),
+        ('FAILED',  'Failed'),
+    ]
+
+    clinic = models.ForeignKey(
+        'clinics.Clinic',
+        on_delete=models.CASCADE,
+        related_name='outbound_messages',
+        help_text='The root/main clinic the message is sent for.',
+    )
+    patient = models.ForeignKey(
+        'patients.Patient',
+        on_delete=models.CASCADE,
+        related_name='outbound_messages',
+        null=True,
+        blank=True,
+    )
+    appointment = models.ForeignKey(
+        'appointments.Appointment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbound_messages',
+    )
+
+    comm_type       = models.CharField(max_length=30, choices=CommunicationLog.COMM_TYPE_CHOICES)
+    channel         = models.CharField(max_length=5,  choices=CommunicationLog.CHANNEL_CHOICES)
+    status          = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    idempotency_key = models.CharField(max_length=200, unique=True)
+
+    recipient = models.CharField(max_length=200, help_text='Email or phone number')
+    subject   = models.CharField(max_length=500, blank=True)
+    body      = models.TextField(help_text='Plain-text body (SMS text or email text part)')
+    html_body = models.TextField(blank=True)
+    reply_to  = models.CharField(max_length=254, blank=True)
+
+    attempts            = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at     = models.DateTimeField(default=timezone.now)
+    locked_at           = models.DateTimeField(null=True, blank=True)
+    sent_at             = models.DateTimeField(null=True, blank=True)
+    provider_message_id = models.CharField(max_length=100, blank=True)
+    error_message       = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'outbound_messages'
+        ordering = ['-created_at']
+        indexes  = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"[{self.comm_type}] {self.channel} → {self.recipient} ({self.status})"
+
+
+class InboundSMS(TimeStampedModel):
+    """
+    A Y/N reply received on the Twilio SMS webhook.
+
+    The webhook stores the row and acknowledges Twilio straight away;
+    services/inbound_sms.py matches the patient and appointment, applies
+    the reply and queues the acknowledgement SMS in the outbox.
+
+    message_sid is unique, so a Twilio retry of the same message is ignored.
+    """
+
+    STATUS_CHOICES = [
+        ('RECEIVED',   'Received'),
+        ('PROCESSING', 'Processing'),
+        ('PROCESSED',  'Processed'),
+        ('UNMATCHED',  'Unmatched'),
+        ('FAILED',     'Failed'),
+    ]
+
+    message_sid = models.CharField(max_length=64, unique=True)
+    from_number = models.CharField(max_length=32)
+    from_e164   = models.CharField(max_length=16, blank=True)
+    to_number   = models.CharField(max_length=32, blank=True)
+    reply       = models.CharField(max_length=1, help_text='Y or N')
+
+    patient = models.ForeignKey(
+        'patients.Patient',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='inbound_sms',
+    )
+    appointment = models.ForeignKey(
+        'appointments.Appointment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='inbound_sms',
+    )
+
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default='RECEIVED')
+    attempts     = models.PositiveSmallIntegerField(default=0)
+    locked_at    = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    result       = models.CharField(max_length=200, blank=True)
+    error        = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'inbound_sms'
+        ordering = ['-created_at']
+        indexes  = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.from_number}: {self.reply} ({self.status})"
+
+
+# ── Workflow runs (cron job checkpoints) ──────────────────────────────────────
+
+class WorkflowRun(models.Model):
+    """
+    One run of a communication workflow (send_communication_reminders, …)
+    through the workflow runner. run_key names the run — by default the job
+    plus its cron slot (the local date, or the hour for jobs that run several
+    times a day) — so re-running after a crash resumes the same run.
+    """
+
+    STATUS_CHOICES = [
+        ('RUNNING',   'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED',    'Failed'),
+    ]
+
+    job         = models.CharField(max_length=50)
+    run_key     = models.CharField(max_length=100, unique=True)
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default='RUNNING')
+    started_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    summary     = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = 'workflow_runs'
+        ordering = ['-started_at']
+        indexes  = [
+            models.Index(fields=['job', 'started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.run_key} ({self.status})"
+
+
+class WorkflowCheckpoint(models.Model):
+    """Progress of one clinic shard within a WorkflowRun."""
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE',    'Done'),
+        ('FAILED',  'Failed'),
+    ]
+
+    run = models.ForeignKey(
+        WorkflowRun,
+        on_delete=models.CASCADE,
+        related_name='checkpoints',
+    )
+    clinic = models.ForeignKey(
+        'clinics.Clinic',
+        on_delete=models.CASCADE,
+        related_name='workflow_checkpoints',
+    )
+
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts    = models.PositiveSmallIntegerField(default=0)
+    started_at  = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    result      = models.CharField(max_length=200, blank=True, help_text='Summary line printed by the command')
+    error       = models.TextField(blank=True)
+
+    class Meta:
+        db_table        = 'workflow_checkpoints'
+        unique_together = [('run', 'clinic')]
+        indexes         = [
+            models.Index(fields=['run', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.run.run_key} — clinic {self.clinic_id} ({self.status})"
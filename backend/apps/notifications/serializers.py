@@ -1,12 +1,13 @@
 from rest_framework import serializers
-from .models import Notification, NotificationRead, EmailLog, SMSLog, CommunicationLog
+from .models import Notification, EmailLog, SMSLog, CommunicationLog
 from apps.clinics.models import ClinicCommunicationSettings
 
 
 class NotificationSerializer(serializers.ModelSerializer):
     """
     Serializes a clinic-wide Notification.
-    `is_read` and `read_at` are computed per-request-user from the NotificationRead table.
+    `is_read` and `read_at` are computed per-request-user from the read watermark
+    (NotificationReadState) and the sparse NotificationRead exceptions.
     """
 
     notification_type_display = serializers.CharField(
@@ -44,28 +45,40 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     def _get_read_map(self):
         """
-        Returns a dict {notification_id: read_at} for the current user.
-        Cached on the serializer context to avoid N+1 queries on list endpoints.
+        Returns (state, {notification_id: read_at}) for the current user —
+        the read watermark plus the sparse exceptions above it.
+        Cached on the request to avoid N+1 queries on list endpoints.
         """
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
-            return {}
+            return None, {}
 
         # Cache on the request object for the duration of this response
         cache_key = '_notification_read_map'
         if not hasattr(request, cache_key):
-            reads = NotificationRead.objects.filter(
-                user=request.user
-            ).values_list('notification_id', 'read_at')
-            setattr(request, cache_key, dict(reads))
+            from apps.notifications.services import read_state_service
+
+            clinic = getattr(request.user, 'clinic', None)
+            if clinic is None:
+                setattr(request, cache_key, (None, {}))
+            else:
+                state = read_state_service.get_read_state(request.user, clinic.main_clinic)
+                _, exceptions = read_state_service.read_map(state)
+                setattr(request, cache_key, (state, exceptions))
 
         return getattr(request, cache_key)
 
     def get_is_read(self, obj) -> bool:
-        return obj.id in self._get_read_map()
+        state, exceptions = self._get_read_map()
+        if state is not None and obj.id <= state.last_read_id:
+            return True
+        return obj.id in exceptions
 
     def get_read_at(self, obj):
-        read_at = self._get_read_map().get(obj.id)
+        state, exceptions = self._get_read_map()
+        read_at = exceptions.get(obj.id)
+        if read_at is None and state is not None and obj.id <= state.last_read_id:
+            read_at = state.last_read_at
         if read_at:
             return read_at.isoformat()
         return None
@@ -0,0 +1,313 @@
+"""
+Offline load test for the communication pipeline.
+
+Seeds synthetic clinics, patients and appointments, then runs each
+communication command end to end — command, outbox enqueue and delivery —
+against local transports, and measures it:
+
+    seed(clinics=20, patients_per_clinic=200, channel='BOTH')
+    report = run_job('send_communication_reminders')
+
+Each clinic's patients are split into four cohorts so that every job has
+work to do:
+
+  0  appointment ~24 h from now          → reminders (both reminder jobs)
+  1  DNA two days ago, no follow-up yet  → send_dna_followups
+  2  DNA follow-up sent long ago         → send_rebook_followups
+  3  last visit six months ago           → send_inactive_checkins
+
+run_job() times the command and the outbox delivery separately, counts the
+SQL queries of each stage and wraps the command's per-recipient service
+call (send_dna_followup, …) to record a latency sample per recipient.
+Calls the service skipped (reminders disabled, no phone number, …) are
+counted but left out of the latency samples.
+
+Delivery runs on the calling thread (process_batch), so the whole run can
+sit inside one transaction and be rolled back. Configure the transports
+before calling run_job: an in-memory / file / console EMAIL_BACKEND and
+sms_transport.LocmemBackend — the benchmark_communications command does
+this.
+
+Public API
+----------
+BENCH_JOBS  →  {command name: per-recipient functions it calls}
+seed(clinics, patients_per_clinic, channel='BOTH')  →  dict
+run_job(job, rate_limits=False)  →  JobReport
+percentile(samples, pct)  →  float
+"""
+from __future__ import annotations
+
+import functools
+import io
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from importlib import import_module
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from apps.appointments.models import Appointment, appointment_starts_at
+from apps.clinics.models import Clinic, ClinicCommunicationSettings
+from apps.common.phone import to_e164
+from apps.notifications.models import OutboundMessage
+from apps.notifications.services import outbox
+from apps.patients.models import Patient
+
+# Per-recipient entry points each command imports into its own module
+BENCH_JOBS = {
+    'send_appointment_reminders':   ('send_appointment_reminder_email', 'send_appointment_reminder_sms'),
+    'send_communication_reminders': ('send_appointment_reminder_with_reply',),
+    'send_dna_followups':           ('send_dna_followup',),
+    'send_rebook_followups':        ('send_rebook_followup',),
+    'send_inactive_checkins':       ('send_inactive_patient_checkin',),
+}
+
+# Options that make each command cover the whole seeded data set
+JOB_OPTIONS = {
+    'send_inactive_checkins': {'limit': 0},
+}
+
+
+@dataclass
+class JobReport:
+    job:                 str
+    recipients:          int = 0
+    skipped:             int = 0
+    messages:            int = 0
+    delivered:           int = 0
+    failed:              int = 0
+    command_s:           float = 0.0
+    delivery_s:          float = 0.0
+    command_queries:     int = 0
+    delivery_queries:    int = 0
+    latencies_ms:        list = field(default_factory=list, repr=False)
+
+    @property
+    def total_s(self) -> float:
+        return self.command_s + self.delivery_s
+
+    @property
+    def throughput(self) -> float:
+        """Messages per second, enqueue to delivered."""
+        return self.messages / self.total_s if self.total_s else 0.0
+
+    @property
+    def queries_per_message(self) -> float:
+        return (self.command_queries + self.delivery_queries) / self.messages if self.messages else 0.0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data.pop('latencies_ms')
+        return {
+            **data,
+            'command_s':           round(self.command_s, 3),
+            'delivery_s':          round(self.delivery_s, 3),
+            'total_s':             round(self.total_s, 3),
+            'throughput':          round(self.throughput, 1),
+            'queries_per_message': round(self.queries_per_message, 2),
+            'p50_ms':              round(percentile(self.latencies_ms, 50), 2),
+            'p95_ms':              round(percentile(self.latencies_ms, 95), 2),
+        }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile (0.0 for no samples)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+# ── Fixtures ──────────────────────────────────────────────────────────────────
+
+def seed(clinics: int, patients_per_clinic: int, channel: str = 'BOTH') -> dict:
+    """Create the benchmark data set. Returns row counts."""
+    run   = get_random_string(6).lower()
+    now   = timezone.now()
+    today = timezone.localdate(now)
+
+    created_clinics = []
+    for i in range(clinics):
+        clinic = Clinic.objects.create(
+            name                        = f'Benchmark Clinic {run}-{i + 1}',
+            email                       = f'clinic{i + 1}.{run}@example.test',
+            phone                       = '0281234567',
+            address                     = f'{i + 1} Benchmark Street',
+            email_notifications_enabled = True,
+            sms_notifications_enabled   = True,
+        )
+        ClinicCommunicationSettings.objects.update_or_create(
+            clinic   = clinic,
+            defaults = dict(
+                reminder_method          = channel,
+                reminders_enabled        = True,
+                dna_followup_enabled     = True,
+                rebook_followup_enabled  = True,
+                inactive_checkin_enabled = True,
+            ),
+        )
+        created_clinics.append(clinic)
+
+    patients = []
+    for clinic_no, clinic in enumerate(created_clinics):
+        for i in range(patients_per_clinic):
+            n     = clinic_no * patients_per_clinic + i
+            phone = f'+63917{n:07d}'
+            patients.append(Patient(
+                clinic                    = clinic,
+                first_name                = f'Bench{n}',
+                last_name                 = 'Patient',
+                date_of_birth             = date(1990, 1, 1),
+                gender                    = 'O',
+                email                     = f'patient{n}.{run}@example.test',
+                phone                     = phone,
+                phone_e164                = to_e164(phone) or '',
+                address                   = '',
+                city                      = '',
+                province                  = '',
+                emergency_contact_name    = '',
+                emergency_contact_phone   = '',
+                emergency_contact_relationship = '',
+                patient_number            = f'BENCH-{run}-{n:07d}',
+                send_email_notifications  = True,
+                sms_notifications_enabled = True,
+                last_visit_date           = today - timedelta(days=180) if i % 4 == 3 else None,
+            ))
+    patients = Patient.objects.bulk_create(patients, batch_size=1000)
+
+    def appointment(patient, starts, **fields):
+        local = timezone.localtime(starts).replace(second=0, microsecond=0)
+        return Appointment(
+            clinic           = patient.clinic,
+            patient          = patient,
+            date             = local.date(),
+            start_time       = local.time(),
+            end_time         = (local + timedelta(minutes=30)).time(),
+            starts_at        = appointment_starts_at(local.date(), local.time()),
+            duration_minutes = 30,
+            **fields,
+        )
+
+    appointments = []
+    for i, patient in enumerate(patients):
+        cohort = (i % patients_per_clinic) % 4
+        if cohort == 0:
+            # Inside the communication-reminder window (24 h ± 1 h) and tomorrow
+            appointments.append(appointment(patient, now + timedelta(hours=24, minutes=(i % 100) - 50)))
+        elif cohort == 1:
+            appointments.append(appointment(patient, now - timedelta(days=2), status='NO_SHOW'))
+        elif cohort == 2:
+            appointments.append(appointment(
+                patient, now - timedelta(days=60), status='NO_SHOW',
+                dna_followup_sent=True, dna_followup_sent_at=now - timedelta(days=58),
+            ))
+        else:
+            appointments.append(appointment(
+                patient, now - timedelta(days=180), status='COMPLETED',
+                chief_complaint='Lower back pain',
+            ))
+    Appointment.objects.bulk_create(appointments, batch_size=1000)
+
+    return {'clinics': len(created_clinics), 'patients': len(patients), 'appointments': len(appointments)}
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+@contextmanager
+def _count_queries():
+    counter = [0]
+
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def _skipped(result) -> bool:
+    """
+    True when a service call did not queue anything: communication_service
+    returns {'skipped': True, …}, the email / SMS services (False, reason).
+    """
+    if isinstance(result, dict):
+        return bool(result.get('skipped'))
+    if isinstance(result, tuple):
+        return not result[0]
+    return False
+
+
+@contextmanager
+def _timed_calls(module, names: tuple[str, ...], report: JobReport):
+    """
+    Time every call to module.<name> for the duration of the block. Only
+    calls that did the work become latency samples; skips are counted.
+    """
+    originals = {name: getattr(module, name) for name in names}
+
+    def timed(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result  = func(*args, **kwargs)
+            elapsed = (time.perf_counter() - started) * 1000
+            if _skipped(result):
+                report.skipped += 1
+            else:
+                report.latencies_ms.append(elapsed)
+            return result
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(module, name, timed(func))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(module, name, func)
+
+
+def _deliver_all() -> None:
+    while outbox.process_batch(limit=100):
+        pass
+
+
+def run_job(job: str, rate_limits: bool = False) -> JobReport:
+    """Run `job` once and deliver what it queued. Leaves its changes in place."""
+    if job not in BENCH_JOBS:
+        raise ValueError(f"Unknown job '{job}'. Choose from: {', '.join(BENCH_JOBS)}")
+
+    report  = JobReport(job)
+    module  = import_module(f'apps.appointments.management.commands.{job}')
+    last_id = OutboundMessage.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    with _timed_calls(module, BENCH_JOBS[job], report), _count_queries() as queries:
+        started = time.perf_counter()
+        call_command(job, stdout=io.StringIO(), **JOB_OPTIONS.get(job, {}))
+        report.command_s       = time.perf_counter() - started
+        report.command_queries = queries[0]
+
+    queued = OutboundMessage.objects.filter(id__gt=last_id)
+    report.recipients = len(report.latencies_ms)
+    report.messages   = queued.count()
+
+    buckets = outbox._buckets
+    if not rate_limits:
+        outbox._buckets = {}
+    try:
+        with _count_queries() as queries:
+            started = time.perf_counter()
+            _deliver_all()
+            report.delivery_s       = time.perf_counter() - started
+            report.delivery_queries = queries[0]
+    finally:
+        outbox._buckets = buckets
+
+    report.delivered = queued.filter(status='SENT').count()
+    report.failed    = report.messages - report.delivered
+    return report
@@ -8,17 +8,21 @@ Orchestrates:
   4. DNA / decline follow-ups (reschedule link)
   5. No-rebook follow-ups    (delayed outreach)
   6. Inactive patient check-ins
+
+Emails and SMS are rendered here and handed to the outbox
+(services/outbox.py); its worker pool does the actual sending.
 """
 import logging
 from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.utils import timezone
 
 from apps.clinics.models import ClinicCommunicationSettings
+from apps.common import sms_transport
+from apps.common.email_rendering import clinic_branding, render_email
 from apps.notifications.models import CommunicationLog
+from apps.notifications.services import outbox
 
 logger = logging.getLogger(__name__)
 
@@ -27,25 +31,6 @@ logger = logging.getLogger(__name__)
 # Helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _get_clinic_logo_url(clinic) -> str | None:
-    import os
-    if not clinic.logo:
-        return None
-    if hasattr(clinic.logo, 'url'):
-        try:
-            url = clinic.logo.url
-            if url.startswith('http'):
-                return url
-            backend_url = getattr(
-                settings, 'BACKEND_URL',
-                os.environ.get('BACKEND_URL', 'http://localhost:8000'),
-            )
-            return f"{backend_url.rstrip('/')}{url}"
-        except Exception:
-            return None
-    return None
-
-
 def _get_portal_booking_url(clinic) -> str:
     """Build the branch-specific patient portal booking URL."""
     base = getattr(settings, 'PORTAL_BASE_URL', 'https://portal.mespms.com')
@@ -101,10 +86,9 @@ def _log_communication(
 
 def _send_email(*, recipient, subject, template_prefix, context, clinic,
                 patient=None, appointment=None, comm_type: str) -> tuple[bool, str]:
-    """Render and send an email, log it."""
+    """Render an email and queue it in the outbox (logged once delivered)."""
     try:
-        text = render_to_string(f'appointments/email/{template_prefix}.txt', context)
-        html = render_to_string(f'appointments/email/{template_prefix}.html', context)
+        text, html = render_email(f'appointments/email/{template_prefix}', context)
     except Exception as e:
         msg = f"Template render error ({template_prefix}): {e}"
         logger.error(msg)
@@ -115,38 +99,18 @@ def _send_email(*, recipient, subject, template_prefix, context, clinic,
         )
         return False, msg
 
-    try:
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[recipient],
-            reply_to=[getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL)],
-        )
-        email.attach_alternative(html, 'text/html')
-        email.send(fail_silently=False)
-
-        _log_communication(
-            clinic=clinic, patient=patient, appointment=appointment,
-            comm_type=comm_type, channel='EMAIL', recipient=recipient,
-            subject=subject, body_preview=text, status='SENT',
-        )
-        logger.info("Email sent → %s [%s] to %s", comm_type, template_prefix, recipient)
-        return True, ''
-    except Exception as e:
-        msg = f"SMTP error ({template_prefix}): {e}"
-        logger.error(msg)
-        _log_communication(
-            clinic=clinic, patient=patient, appointment=appointment,
-            comm_type=comm_type, channel='EMAIL', recipient=recipient,
-            subject=subject, status='FAILED', error_message=msg,
-        )
-        return False, msg
+    outbox.enqueue_email(
+        clinic=clinic, patient=patient, appointment=appointment, comm_type=comm_type,
+        recipient=recipient, subject=subject, body=text, html_body=html,
+        reply_to=getattr(clinic, 'email', '') or settings.DEFAULT_FROM_EMAIL,
+    )
+    logger.info("Email queued → %s [%s] to %s", comm_type, template_prefix, recipient)
+    return True, ''
 
 
 def _send_sms(*, recipient_phone, body, clinic,
               patient=None, appointment=None, comm_type: str) -> tuple[bool, str]:
-    """Send an SMS via Twilio and log it."""
+    """Validate the number and queue an SMS in the outbox (logged once delivered)."""
     from apps.appointments.sms_service import _normalize_phone
 
     to_number = _normalize_phone(recipient_phone)
@@ -159,8 +123,8 @@ def _send_sms(*, recipient_phone, body, clinic,
         )
         return False, msg
 
-    if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_FROM_NUMBER]):
-        msg = "Twilio credentials not configured."
+    if not sms_transport.is_configured():
+        msg = "SMS backend (Twilio credentials) not configured."
         _log_communication(
             clinic=clinic, patient=patient, appointment=appointment,
             comm_type=comm_type, channel='SMS', recipient=to_number,
@@ -168,27 +132,12 @@ def _send_sms(*, recipient_phone, body, clinic,
         )
         return False, msg
 
-    try:
-        from twilio.rest import Client
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        message = client.messages.create(body=body, from_=settings.TWILIO_FROM_NUMBER, to=to_number)
-
-        _log_communication(
-            clinic=clinic, patient=patient, appointment=appointment,
-            comm_type=comm_type, channel='SMS', recipient=to_number,
-            body_preview=body, status='SENT',
-        )
-        logger.info("SMS sent → %s to %s sid=%s", comm_type, to_number, message.sid)
-        return True, ''
-    except Exception as e:
-        msg = f"Twilio error: {e}"
-        logger.error(msg)
-        _log_communication(
-            clinic=clinic, patient=patient, appointment=appointment,
-            comm_type=comm_type, channel='SMS', recipient=to_number,
-            body_preview=body, status='FAILED', error_message=msg,
-        )
-        return False, msg
+    outbox.enqueue_sms(
+        clinic=clinic, patient=patient, appointment=appointment, comm_type=comm_type,
+        recipient=to_number, body=body,
+    )
+    logger.info("SMS queued → %s to %s", comm_type, to_number)
+    return True, ''
 
 
 def _dispatch(*, channel: str, clinic, patient, appointment=None,
@@ -258,10 +207,7 @@ def send_booking_confirmation(appointment) -> dict:
         'service_name':        service_name,
         'practitioner_name':   practitioner_name,
         'location_name':       location_name,
-        'clinic_name':         clinic.name,
-        'clinic_phone':        getattr(clinic, 'phone', ''),
-        'clinic_email':        getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':     _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'duration_minutes':    appointment.duration_minutes,
         'booking_reference':   f"APT-{appointment.id:06d}",
     }
@@ -338,10 +284,7 @@ def send_recurring_booking_confirmation(appointments: list) -> dict:
         'service_name':        service_name,
         'practitioner_name':   practitioner_name,
         'location_name':       location_name,
-        'clinic_name':         clinic.name,
-        'clinic_phone':        getattr(clinic, 'phone', ''),
-        'clinic_email':        getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':     _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'total_appointments':  len(appointments),
         'schedule_list':       schedule_list,
         'schedule_list_text':  '\n'.join(schedule_list),
@@ -408,10 +351,7 @@ def send_appointment_reminder_with_reply(appointment) -> dict:
         'appointment_type':    appointment.service.name if appointment.service else appointment.get_appointment_type_display(),
         'practitioner_name':   practitioner_name,
         'location_name':       location_name,
-        'clinic_name':         clinic.name,
-        'clinic_phone':        getattr(clinic, 'phone', ''),
-        'clinic_email':        getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':     _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
     }
 
     sms_body = (
@@ -467,10 +407,7 @@ def send_dna_followup(appointment) -> dict:
 
     context = {
         'patient_first_name': patient.first_name,
-        'clinic_name':        clinic.name,
-        'clinic_phone':       getattr(clinic, 'phone', ''),
-        'clinic_email':       getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':    _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'booking_url':        booking_url,
         'appointment_date':   appointment.date.strftime('%A, %d %B %Y'),
         'appointment_time':   appointment.start_time.strftime('%I:%M %p'),
@@ -526,10 +463,7 @@ def send_rebook_followup(appointment) -> dict:
 
     context = {
         'patient_first_name': patient.first_name,
-        'clinic_name':        clinic.name,
-        'clinic_phone':       getattr(clinic, 'phone', ''),
-        'clinic_email':       getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':    _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'booking_url':        booking_url,
     }
 
@@ -561,11 +495,16 @@ def send_rebook_followup(appointment) -> dict:
 # 6. INACTIVE PATIENT WELLNESS CHECK-IN
 # ─────────────────────────────────────────────────────────────────────────────
 
-def send_inactive_patient_checkin(patient, clinic) -> dict:
+def send_inactive_patient_checkin(patient, clinic, *, settings_obj=None,
+                                  last_complaint=None, stamp: bool = True) -> dict:
     """
     Send a wellness check-in to a patient who hasn't visited in X months.
+
+    Batch callers (send_inactive_checkins) pass the clinic's settings and the
+    patient's last complaint preloaded, and stamp last_checkin_sent_at
+    themselves in bulk (stamp=False).
     """
-    settings_obj = ClinicCommunicationSettings.get_for_clinic(clinic)
+    settings_obj = settings_obj or ClinicCommunicationSettings.get_for_clinic(clinic)
 
     if not settings_obj.inactive_checkin_enabled:
         return {'skipped': True, 'reason': 'Inactive check-in disabled'}
@@ -582,24 +521,22 @@ def send_inactive_patient_checkin(patient, clinic) -> dict:
         months_away = delta // 30
 
     # Get last treatment info
-    last_complaint = ''
-    from apps.appointments.models import Appointment
-    last_appt = (
-        Appointment.objects
-        .filter(patient=patient, status='COMPLETED', is_deleted=False)
-        .order_by('-date')
-        .first()
-    )
-    if last_appt and last_appt.chief_complaint:
-        last_complaint = last_appt.chief_complaint
+    if last_complaint is None:
+        last_complaint = ''
+        from apps.appointments.models import Appointment
+        last_appt = (
+            Appointment.objects
+            .filter(patient=patient, status='COMPLETED', is_deleted=False)
+            .order_by('-date')
+            .first()
+        )
+        if last_appt and last_appt.chief_complaint:
+            last_complaint = last_appt.chief_complaint
 
     context = {
         'patient_first_name': patient.first_name,
         'patient_full_name':  patient.get_full_name(),
-        'clinic_name':        clinic.name,
-        'clinic_phone':       getattr(clinic, 'phone', ''),
-        'clinic_email':       getattr(clinic, 'email', settings.DEFAULT_FROM_EMAIL),
-        'clinic_logo_url':    _get_clinic_logo_url(clinic),
+        **clinic_branding(clinic),
         'booking_url':        booking_url,
         'months_away':        months_away,
         'last_condition':     last_complaint or 'your previous concern',
@@ -623,8 +560,9 @@ def send_inactive_patient_checkin(patient, clinic) -> dict:
         sms_body=sms_body,
     )
 
-    patient.last_checkin_sent_at = timezone.now()
-    patient.save(update_fields=['last_checkin_sent_at'])
+    if stamp:
+        patient.last_checkin_sent_at = timezone.now()
+        patient.save(update_fields=['last_checkin_sent_at'])
 
     return result
 
@@ -0,0 +1,361 @@
+"""
+Deferred notification dispatcher.
+
+Signal receivers and bulk endpoints record notification *intents* here
+instead of writing Notification rows inline. Intents are only queued once
+the surrounding transaction commits (rolled-back saves never notify), and a
+background worker delivers them in batches:
+
+  • intents are collected for DISPATCH_WINDOW seconds, then grouped per
+    clinic family;
+  • a family with DIGEST_THRESHOLD or more bookings in one window gets ONE
+    digest notification instead of one per booking;
+  • the "already notified?" check for CONFIRMED updates runs once per
+    batch instead of once per save, and counts an appointment listed in a
+    digest (Notification.digest_appointments) as notified.
+
+Bulk operations wrap their loop in notification_digest(); every booking
+saved inside the block — and anything added explicitly — is folded into a
+single digest notification:
+
+    with notification_digest(clinic, 'booked', link_url='/diary'):
+        for day in dates:
+            Appointment.objects.create(...)
+
+With NOTIFICATION_DISPATCH_WINDOW = 0 intents are delivered synchronously
+on commit (no worker thread) — handy for tests and management commands.
+
+Public API
+----------
+enqueue_booking(appointment, check_existing=False)  →  None
+enqueue_portal_booking(portal_booking)  →  None
+notification_digest(clinic, action, link_url='')  →  context manager
+flush()  →  int
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_WINDOW  = getattr(settings, 'NOTIFICATION_DISPATCH_WINDOW', 2.0)
+DIGEST_THRESHOLD = getattr(settings, 'NOTIFICATION_DIGEST_THRESHOLD', 5)
+DIGEST_MAX_LINES = 10
+
+BOOKING = 'booking'
+PORTAL  = 'portal_booking'
+DIGEST  = 'digest'
+
+DIGEST_TITLES = {
+    'booked':    '{count} New Bookings',
+}
+DIGEST_PHRASES = {
+    'booked':    ('appointment', 'booked'),
+}
+
+
+@dataclass
+class Intent:
+    kind:            str
+    object_id:       int | None = None
+    clinic_id:       int | None = None
+    check_existing:  bool = False
+    title:           str = ''
+    message:         str = ''
+    link_url:        str = ''
+    appointment_ids: list[int] = field(default_factory=list)     # DIGEST only
+
+
+_queue: 'queue.Queue[Intent]' = queue.Queue()
+_worker_lock = threading.Lock()
+_worker: threading.Thread | None = None
+_scopes = threading.local()
+
+
+# ── Digest scope ──────────────────────────────────────────────────────────────
+
+@dataclass
+class Digest:
+    """Collects the items of one bulk operation into a single notification."""
+
+    clinic:   object
+    action:   str
+    link_url: str = ''
+    lines:    list[str] = field(default_factory=list)
+    dates:    list = field(default_factory=list)
+    bookings: list = field(default_factory=list)
+
+    def add(self, line: str, day=None) -> None:
+        self.lines.append(line)
+        if day is not None:
+            self.dates.append(day)
+
+    def add_appointment(self, appointment) -> None:
+        from apps.notifications.services.appointment_notifications import _format_time
+
+        patient = appointment.patient
+        name    = f"{patient.first_name} {patient.last_name}" if patient else 'Unknown Patient'
+        self.add(
+            f"  • {appointment.date.strftime('%b %d')} {_format_time(appointment.start_time)} — {name}",
+            appointment.date,
+        )
+        self.bookings.append(appointment)
+
+    def to_intent(self) -> Intent:
+        count = len(self.lines)
+        title = DIGEST_TITLES.get(self.action, '{count} items: ' + self.action).format(count=count)
+
+        period = ''
+        if self.dates:
+            first, last = min(self.dates), max(self.dates)
+            period = (
+                f" on {first.strftime('%B %d, %Y')}" if first == last
+                else f" between {first.strftime('%B %d, %Y')} and {last.strftime('%B %d, %Y')}"
+            )
+        noun, verb = DIGEST_PHRASES.get(self.action, ('item', self.action))
+        shown      = self.lines[:DIGEST_MAX_LINES]
+        more       = count - len(shown)
+        message    = (
+            f"{count} {noun}{'' if count == 1 else 's'} {verb}{period}:\n" + "\n".join(shown)
+        )
+        if more > 0:
+            message += f"\n  … and {more} more"
+
+        return Intent(
+            kind            = DIGEST,
+            clinic_id       = self.clinic.id,
+            title           = title,
+            message         = message,
+            link_url        = self.link_url,
+            appointment_ids = [a.pk for a in self.bookings],
+        )
+
+
+def _active_digest() -> Digest | None:
+    stack = getattr(_scopes, 'stack', None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def notification_digest(clinic, action: str, link_url: str = ''):
+    """
+    Fold every notification raised inside the block into one digest.
+    Nothing is sent if the block raises or records no items.
+    """
+    digest = Digest(clinic=clinic, action=action, link_url=link_url)
+    stack  = getattr(_scopes, 'stack', None)
+    if stack is None:
+        stack = _scopes.stack = []
+    stack.append(digest)
+    try:
+        yield digest
+    finally:
+        stack.pop()
+
+    if clinic is None or (len(digest.lines) == 1 and digest.bookings):
+        # No clinic to address a digest to, or a "digest" of one booking —
+        # fall back to the regular per-booking notifications
+        for appointment in digest.bookings:
+            enqueue_booking(appointment)
+    elif digest.lines:
+        _record(digest.to_intent())
+
+
+# ── Recording ─────────────────────────────────────────────────────────────────
+
+def _record(intent: Intent) -> None:
+    transaction.on_commit(lambda: _submit(intent))
+
+
+def _submit(intent: Intent) -> None:
+    if not DISPATCH_WINDOW:
+        _deliver([intent])
+        return
+    _ensure_worker()
+    _queue.put(intent)
+
+
+def enqueue_booking(appointment, check_existing: bool = False) -> None:
+    """
+    Record a NEW_BOOKING intent for a diary appointment.
+    check_existing=True skips it if the appointment was already notified.
+    """
+    digest = _active_digest()
+    if digest is not None and not check_existing:
+        digest.add_appointment(appointment)
+        return
+    _record(Intent(
+        kind           = BOOKING,
+        object_id      = appointment.pk,
+        clinic_id      = appointment.clinic_id,
+        check_existing = check_existing,
+    ))
+
+
+def enqueue_portal_booking(portal_booking) -> None:
+    """Record a NEW_BOOKING intent for a patient-portal booking."""
+    _record(Intent(kind=PORTAL, object_id=portal_booking.pk))
+
+
+# ── Delivery ──────────────────────────────────────────────────────────────────
+
+def _deliver(intents: list[Intent]) -> int:
+    """Turn a batch of intents into notifications. Returns notifications created."""
+    from apps.appointments.models import Appointment
+    from apps.clinics.models import Clinic
+    from apps.notifications.models import Notification
+    from apps.patients.models import PortalBooking
+    from apps.notifications.services.appointment_notifications import (
+        notify_new_booking,
+        notify_new_portal_booking,
+    )
+    from apps.notifications.services.notification_service import (
+        _get_main_clinic,
+        create_notification,
+    )
+
+    booking_ids = {i.object_id for i in intents if i.kind == BOOKING}
+    check_ids   = {i.object_id for i in intents if i.kind == BOOKING and i.check_existing}
+    portal_ids  = {i.object_id for i in intents if i.kind == PORTAL}
+
+    if check_ids:
+        already = set(
+            Notification.objects.filter(
+                appointment_id__in=check_ids,
+                notification_type='NEW_BOOKING',
+            ).values_list('appointment_id', flat=True)
+        )
+        already.update(
+            Notification.digest_appointments.through.objects.filter(
+                appointment_id__in=check_ids,
+            ).values_list('appointment_id', flat=True)
+        )
+        booking_ids -= already
+
+    appointments = Appointment.objects.filter(id__in=booking_ids).select_related(
+        'patient', 'clinic__parent_clinic',
+    ) if booking_ids else []
+    portal_bookings = PortalBooking.objects.filter(id__in=portal_ids).select_related(
+        'portal_link__clinic__parent_clinic', 'service',
+    ) if portal_ids else []
+
+    # Group per clinic family, keeping the branch for single notifications
+    per_family: dict[int, list] = {}
+    for appt in appointments:
+        per_family.setdefault(_get_main_clinic(appt.clinic).id, []).append(('appt', appt))
+    for booking in portal_bookings:
+        per_family.setdefault(
+            _get_main_clinic(booking.portal_link.clinic).id, [],
+        ).append(('portal', booking))
+
+    created = 0
+    for family_id, items in per_family.items():
+        if len(items) >= DIGEST_THRESHOLD:
+            main   = Clinic.objects.get(pk=family_id)
+            digest = Digest(clinic=main, action='booked', link_url='/diary')
+            for kind, obj in sorted(items, key=_item_sort_key):
+                if kind == 'appt':
+                    digest.add_appointment(obj)
+                else:
+                    digest.add(
+                        f"  • {obj.appointment_date.strftime('%b %d')} — "
+                        f"{obj.patient_first_name} {obj.patient_last_name} "
+                        f"(portal #{obj.reference_number})",
+                        obj.appointment_date,
+                    )
+            intents.append(digest.to_intent())
+            continue
+
+        for kind, obj in items:
+            if kind == 'appt':
+                notify_new_booking(obj)
+            else:
+                notify_new_portal_booking(obj)
+            created += 1
+
+    digests = [i for i in intents if i.kind == DIGEST]
+    clinics = Clinic.objects.in_bulk({i.clinic_id for i in digests}) if digests else {}
+    for intent in digests:
+        clinic = clinics.get(intent.clinic_id)
+        if clinic is None:
+            continue
+        try:
+            notification = create_notification(
+                clinic            = clinic,
+                notification_type = 'DIGEST',
+                title             = intent.title,
+                message           = intent.message,
+                link_url          = intent.link_url,
+                clinic_branch     = clinic,
+            )
+            if intent.appointment_ids:
+                notification.digest_appointments.add(*intent.appointment_ids)
+            created += 1
+        except Exception as exc:
+            logger.exception('Digest notification failed for clinic %s: %s', intent.clinic_id, exc)
+
+    return created
+
+
+def _item_sort_key(item):
+    kind, obj = item
+    if kind == 'appt':
+        return (obj.date, obj.start_time)
+    return (obj.appointment_date, obj.appointment_time)
+
+
+def _drain() -> list[Intent]:
+    intents = []
+    while True:
+        try:
+            intents.append(_queue.get_nowait())
+        except queue.Empty:
+            return intents
+
+
+def flush() -> int:
+    """Deliver everything queued right now. Returns notifications created."""
+    intents = _drain()
+    if not intents:
+        return 0
+    try:
+        return _deliver(intents)
+    except Exception as exc:
+        logger.exception('Notification dispatch failed for %d intents: %s', len(intents), exc)
+        return 0
+
+
+def _run_worker() -> None:
+    while True:
+        first = _queue.get()
+        _queue.put(first)
+        time.sleep(DISPATCH_WINDOW)     # let the rest of the burst arrive
+        close_old_connections()
+        count = flush()
+        close_old_connections()
+        logger.debug('Notification dispatcher delivered %d notifications', count)
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run_worker, name='notification-dispatcher', daemon=True,
+            )
+            _worker.start()
+
+
+# Short-lived processes (cron, management commands) exit before the window
+atexit.register(flush)
@@ -0,0 +1,255 @@
+"""
+Inbound SMS replies.
+
+Twilio waits for the webhook's answer and retries when it is slow, so a
+reply storm after the morning reminders used to pile up retries while each
+request looked up the patient, updated the appointment and sent the DNA
+follow-up. The webhook now only records the reply and returns at once:
+
+  webhook ──receive()──▶ InboundSMS (RECEIVED) ──worker──▶ PROCESSED / UNMATCHED / FAILED
+
+  • receive() stores the reply keyed by Twilio's MessageSid, so a retried
+    delivery of the same message is dropped;
+  • once the row is committed, a small thread pool in the web process
+    (INBOUND_SMS_WORKERS) claims pending rows and processes them;
+  • the patient is matched on Patient.phone_e164 (indexed) and the reply
+    is applied with communication_service.handle_patient_reply;
+  • the thank-you / "no pending appointment" text that used to be in the
+    TwiML response is queued in the outbox instead;
+  • failed rows are retried up to INBOUND_SMS_MAX_ATTEMPTS times, rows stuck
+    in PROCESSING longer than INBOUND_SMS_LOCK_TIMEOUT are claimed again,
+    and the process_inbound_sms command sweeps up anything left behind.
+
+Public API
+----------
+receive(*, message_sid, from_number, to_number, reply)  →  InboundSMS | None
+process(message)  →  None
+process_pending(limit=…)  →  int
+submit()  →  None
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.common.phone import to_e164
+from apps.notifications.models import InboundSMS
+from apps.patients.models import Patient
+
+logger = logging.getLogger(__name__)
+
+INBOUND_SMS_AUTOSTART    = getattr(settings, 'INBOUND_SMS_AUTOSTART', True)
+INBOUND_SMS_WORKERS      = getattr(settings, 'INBOUND_SMS_WORKERS', 2)
+INBOUND_SMS_BATCH_SIZE   = getattr(settings, 'INBOUND_SMS_BATCH_SIZE', 20)
+INBOUND_SMS_MAX_ATTEMPTS = getattr(settings, 'INBOUND_SMS_MAX_ATTEMPTS', 3)
+INBOUND_SMS_LOCK_TIMEOUT = getattr(settings, 'INBOUND_SMS_LOCK_TIMEOUT', 120)    # seconds
+
+
+# ── Receiving (webhook) ───────────────────────────────────────────────────────
+
+def receive(*, message_sid: str, from_number: str, to_number: str, reply: str) -> InboundSMS | None:
+    """
+    Record a Y/N reply and schedule it for processing. Returns the new row,
+    or None if this MessageSid was already received (a Twilio retry).
+    """
+    fields = dict(
+        from_number = from_number,
+        from_e164   = to_e164(from_number) or '',
+        to_number   = to_number,
+        reply       = reply,
+    )
+    try:
+        with transaction.atomic():
+            message, created = InboundSMS.objects.get_or_create(message_sid=message_sid, defaults=fields)
+    except IntegrityError:
+        # Lost a race with a concurrent retry of the same message
+        return None
+
+    if not created:
+        logger.info('Inbound SMS %s already received (status=%s) — retry ignored', message_sid, message.status)
+        return None
+
+    transaction.on_commit(submit)
+    return message
+
+
+# ── Processing ────────────────────────────────────────────────────────────────
+
+def _claim(limit: int) -> list[InboundSMS]:
+    """Move up to `limit` pending rows to PROCESSING and return them."""
+    now   = timezone.now()
+    stale = now - timedelta(seconds=INBOUND_SMS_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            InboundSMS.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status='RECEIVED')
+                | Q(status='FAILED', attempts__lt=INBOUND_SMS_MAX_ATTEMPTS)
+                | Q(status='PROCESSING', locked_at__lt=stale)
+            )
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        InboundSMS.objects.filter(id__in=ids).update(
+            status='PROCESSING',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(InboundSMS.objects.filter(id__in=ids).order_by('created_at', 'id'))
+
+
+def _find_pending_appointment(phone_e164: str):
+    """
+    The earliest upcoming appointment awaiting a reply for any active patient
+    with this number — family members often share one phone.
+    """
+    return (
+        Appointment.objects
+        .select_related('patient', 'clinic', 'practitioner__user', 'location', 'service')
+        .filter(
+            patient__phone_e164=phone_e164,
+            patient__is_archived=False,
+            reminder_sent=True,
+            patient_reply='',
+            confirmation_status='PENDING',
+            is_deleted=False,
+            date__gte=timezone.localdate(),
+        )
+        .order_by('date', 'start_time')
+        .first()
+    )
+
+
+def _acknowledge(message: InboundSMS, *, clinic, body: str, patient=None, appointment=None) -> None:
+    from apps.notifications.services import outbox
+
+    outbox.enqueue_sms(
+        clinic      = clinic,
+        patient     = patient,
+        appointment = appointment,
+        recipient   = message.from_e164 or message.from_number,
+        body        = body,
+        comm_type   = 'REPLY_ACKNOWLEDGEMENT',
+        key         = f'REPLY_ACKNOWLEDGEMENT:SMS:{message.message_sid}',
+    )
+
+
+def process(message: InboundSMS) -> None:
+    """Match a claimed reply to its appointment, apply it and queue the answer."""
+    from apps.notifications.services.communication_service import handle_patient_reply
+
+    appointment = _find_pending_appointment(message.from_e164) if message.from_e164 else None
+
+    if appointment is None:
+        patient = (
+            Patient.objects.select_related('clinic')
+            .filter(phone_e164=message.from_e164, is_archived=False)
+            .first()
+            if message.from_e164 else None
+        )
+        if patient is None:
+            logger.warning('No patient found for phone: %s', message.from_number)
+            _finish(message, 'UNMATCHED', result='no patient')
+            return
+
+        logger.warning('No pending appointment for patient %s', patient.id)
+        _acknowledge(
+            message, clinic=patient.clinic, patient=patient,
+            body=(
+                'We could not find a pending appointment. '
+                'Please contact the clinic directly.'
+            ),
+        )
+        _finish(message, 'UNMATCHED', patient=patient, result='no pending appointment')
+        return
+
+    patient = appointment.patient
+    with transaction.atomic():
+        result = handle_patient_reply(appointment, message.reply)
+        if message.reply == 'Y':
+            body = (
+                f"Thank you, {patient.first_name}! "
+                f"Your appointment has been confirmed. See you soon!"
+            )
+        else:
+            body = (
+                f"Thank you, {patient.first_name}. "
+                f"We'll send you a link to reschedule at your convenience."
+            )
+        _acknowledge(message, clinic=appointment.clinic, patient=patient, appointment=appointment, body=body)
+        _finish(message, 'PROCESSED', patient=patient, appointment=appointment, result=result.get('action', ''))
+
+    logger.info('Reply processed: patient=%s appt=%s result=%s', patient.id, appointment.id, result)
+
+
+def _finish(message: InboundSMS, status: str, *, patient=None, appointment=None,
+            result: str = '', error: str = '') -> None:
+    message.status       = status
+    message.patient      = patient
+    message.appointment  = appointment
+    message.result       = result[:200]
+    message.error        = error
+    message.locked_at    = None
+    message.processed_at = timezone.now()
+    message.save(update_fields=[
+        'status', 'patient', 'appointment', 'result', 'error',
+        'locked_at', 'processed_at', 'updated_at',
+    ])
+
+
+def process_pending(limit: int = INBOUND_SMS_BATCH_SIZE) -> int:
+    """Claim and process pending replies until none are left. Returns the count."""
+    processed = 0
+    while True:
+        messages = _claim(limit)
+        if not messages:
+            return processed
+        for message in messages:
+            try:
+                process(message)
+            except Exception as exc:
+                logger.exception('Inbound SMS %s failed: %s', message.message_sid, exc)
+                _finish(message, 'FAILED', error=f'{type(exc).__name__}: {exc}')
+        processed += len(messages)
+
+
+# ── Worker pool ───────────────────────────────────────────────────────────────
+
+_executor      = None
+_executor_lock = threading.Lock()
+
+
+def _work() -> None:
+    try:
+        close_old_connections()
+        process_pending()
+    except Exception as exc:
+        logger.exception('Inbound SMS worker error: %s', exc)
+    finally:
+        close_old_connections()
+
+
+def submit() -> None:
+    """Process pending replies on the in-process pool (no-op without autostart)."""
+    global _executor
+    if not INBOUND_SMS_AUTOSTART:
+        return
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=INBOUND_SMS_WORKERS,
+                    thread_name_prefix='inbound-sms',
+                )
+    _executor.submit(_work)
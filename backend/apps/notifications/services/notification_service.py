@@ -1,17 +1,27 @@
 """
 Core low-level service for creating clinic-wide Notification records.
-After creation, pushes the notification to ALL active users in the clinic
-via their individual WebSocket channels.
+After creation, pushes the notification ONCE to the clinic-family channel
+group, which every connected user of the clinic (main + branches) joins.
 
-✅ ONE notification record per clinic — WebSocket push to ALL clinic users
+✅ ONE notification record per clinic — ONE WebSocket publish per notification
 """
 import logging
 from asgiref.sync import async_to_sync
-from django.contrib.auth import get_user_model
+from apps.messages import presence
 from apps.notifications.models import Notification
+from apps.notifications.services.read_state_service import bump_unread
 
 logger = logging.getLogger(__name__)
-User = get_user_model()
+
+
+def user_group_name(user_id) -> str:
+    """Private group for targeted, per-user events."""
+    return f'notifications_{user_id}'
+
+
+def clinic_group_name(main_clinic_id) -> str:
+    """Group joined by every connected user of a clinic family."""
+    return f'notifications_clinic_{main_clinic_id}'
 
 
 def _get_main_clinic(clinic):
@@ -21,54 +31,55 @@ def _get_main_clinic(clinic):
     return clinic
 
 
-def _push_to_all_clinic_users(notification: Notification) -> None:
-    """
-    Push the notification via WebSocket to every active user in the clinic.
-    Each user has their own private channel group: notifications_<user_id>
-    """
-    try:
-        from channels.layers import get_channel_layer
-        from apps.notifications.serializers import NotificationSerializer
+def _serialize_for_push(notification: Notification) -> dict:
+    from apps.notifications.serializers import NotificationSerializer
 
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            logger.warning('Channel layer is None — WebSocket push skipped')
-            return
+    # Serialize WITHOUT request context — is_read will default to False
+    # which is correct: it's a brand-new notification, nobody has read it yet
+    payload = NotificationSerializer(notification).data
+    # Force is_read=False and read_at=None for the broadcast
+    payload['is_read'] = False
+    payload['read_at'] = None
+    return payload
 
-        # Serialize WITHOUT request context — is_read will default to False
-        # which is correct: it's a brand-new notification, nobody has read it yet
-        payload = NotificationSerializer(notification).data
-        # Force is_read=False and read_at=None for the broadcast
-        payload['is_read'] = False
-        payload['read_at'] = None
 
-        main_clinic = notification.clinic
+def _group_send(group_name: str, event: dict) -> bool:
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        logger.warning('Channel layer is None — WebSocket push skipped')
+        return False
+    async_to_sync(channel_layer.group_send)(group_name, event)
+    return True
 
-        # Get all active, non-deleted users that belong to this clinic family
-        from django.db.models import Q
-        all_branch_ids = list(
-            main_clinic.get_all_branches().values_list('id', flat=True)
-        )
 
-        users = User.objects.filter(
-            is_active=True,
-            is_deleted=False,
-            clinic_id__in=all_branch_ids,
-        ).values_list('id', flat=True)
-
-        for user_id in users:
-            async_to_sync(channel_layer.group_send)(
-                f'notifications_{user_id}',
-                {
-                    'type': 'notification.new',
-                    'notification': payload,
-                }
+def _push_to_all_clinic_users(notification: Notification) -> None:
+    """
+    Publish the notification to the clinic-family group. One channel-layer
+    call regardless of how many users the clinic has, and none at all when
+    nobody in the clinic has a live socket.
+    """
+    try:
+        if not presence.any_online(notification.clinic_id):
+            logger.debug(
+                'Notification %s: nobody online in clinic %s — push skipped',
+                notification.id, notification.clinic_id,
             )
+            return
 
-        logger.debug(
-            'Notification %s pushed to %d users in clinic %s via WebSocket',
-            notification.id, len(users), main_clinic.id
+        sent = _group_send(
+            clinic_group_name(notification.clinic_id),
+            {
+                'type': 'notification.new',
+                'notification': _serialize_for_push(notification),
+            },
         )
+        if sent:
+            logger.debug(
+                'Notification %s pushed to clinic group %s via WebSocket',
+                notification.id, notification.clinic_id,
+            )
 
     except Exception as exc:
         logger.exception('_push_to_all_clinic_users failed: %s', exc)
@@ -108,6 +119,7 @@ def create_notification(
         clinic_branch=clinic_branch,
     )
 
+    bump_unread(main_clinic.id)
     _push_to_all_clinic_users(notification)
 
     return notification
\ No newline at end of file
@@ -0,0 +1,466 @@
+"""
+Outbound message outbox.
+
+Patient emails and SMS are not sent inside request handlers or cron loops.
+Callers render the message and enqueue an OutboundMessage row (QUEUED); a
+pool of worker threads drains the table concurrently:
+
+  QUEUED ──claim──▶ SENDING ──ok──▶ SENT
+     ▲                 │
+     └──backoff────────┤ error, attempts < OUTBOX_MAX_ATTEMPTS
+                       └──────────▶ FAILED
+
+  • rows are claimed with SELECT … FOR UPDATE SKIP LOCKED, so several
+    processes (web workers, the process_outbox command) can drain safely;
+  • each provider has its own token-bucket rate limit
+    (OUTBOX_RATE_LIMITS, messages per second, per process), taken right
+    before every provider call;
+  • failures are retried after OUTBOX_BACKOFF_BASE * 2**(attempt-1) seconds
+    plus jitter, capped at OUTBOX_BACKOFF_MAX;
+  • rows stuck in SENDING longer than OUTBOX_LOCK_TIMEOUT (a worker died
+    mid-send) are picked up again;
+  • the idempotency key — by default (comm_type, channel, appointment) —
+    is unique, so enqueueing the same message twice is a no-op.
+
+Every finished row writes the usual CommunicationLog entry (and an
+AppointmentReminder row for appointment reminders).
+
+Worker threads start lazily in the enqueueing process once the
+transaction commits. Set OUTBOX_AUTOSTART = False to leave delivery to the
+process_outbox management command instead.
+
+Public API
+----------
+enqueue_email(*, clinic, recipient, subject, body, comm_type, …)  →  OutboundMessage
+enqueue_sms(*, clinic, recipient, body, comm_type, …)  →  OutboundMessage
+idempotency_key(comm_type, channel, appointment=None, patient=None, unique=False)  →  str
+batch()  →  context manager: enqueues inside it become one bulk INSERT
+savepoint()  →  context manager: atomic block that also drops its batched rows on error
+process_batch(limit=…)  →  int
+drain(timeout=None, workers=…)  →  int
+start_workers(count=…)  →  None
+wake()  →  None
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.notifications.models import CommunicationLog, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_AUTOSTART    = getattr(settings, 'OUTBOX_AUTOSTART', True)
+OUTBOX_WORKERS      = getattr(settings, 'OUTBOX_WORKERS', 4)
+OUTBOX_BATCH_SIZE   = getattr(settings, 'OUTBOX_BATCH_SIZE', 20)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+OUTBOX_BACKOFF_BASE = getattr(settings, 'OUTBOX_BACKOFF_BASE', 30)        # seconds
+OUTBOX_BACKOFF_MAX  = getattr(settings, 'OUTBOX_BACKOFF_MAX', 3600)
+OUTBOX_LOCK_TIMEOUT = getattr(settings, 'OUTBOX_LOCK_TIMEOUT', 300)
+OUTBOX_IDLE_POLL    = getattr(settings, 'OUTBOX_IDLE_POLL', 30)
+OUTBOX_RATE_LIMITS  = {
+    'EMAIL': 10.0,      # SMTP relay
+    'SMS':   5.0,       # Twilio default account throughput
+    **getattr(settings, 'OUTBOX_RATE_LIMITS', {}),
+}
+
+
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate     = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens   = self.capacity
+        self.updated  = time.monotonic()
+        self.lock     = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now          = time.monotonic()
+                self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {channel: TokenBucket(rate) for channel, rate in OUTBOX_RATE_LIMITS.items() if rate}
+
+
+# ── Enqueue ───────────────────────────────────────────────────────────────────
+
+def idempotency_key(comm_type: str, channel: str, appointment=None, patient=None, unique: bool = False) -> str:
+    """
+    Default dedupe key: one message per (comm_type, channel, appointment).
+    Messages without an appointment dedupe per patient per day. unique=True
+    adds a random suffix for deliberate re-sends.
+    """
+    if appointment is not None:
+        scope = f'appt:{appointment.pk}'
+    elif patient is not None:
+        scope = f'patient:{patient.pk}:{timezone.localdate():%Y%m%d}'
+    else:
+        scope = uuid.uuid4().hex
+    key = f'{comm_type}:{channel}:{scope}'
+    if unique:
+        key += f':{uuid.uuid4().hex[:12]}'
+    return key
+
+
+_batch = threading.local()
+
+
+@contextmanager
+def batch():
+    """
+    Collect every enqueue made in this block (on this thread) and insert them
+    with one bulk INSERT on exit. Duplicate keys are skipped by the database
+    (ON CONFLICT DO NOTHING). Rows are unsaved inside the block. Nested
+    blocks join the outermost one.
+    """
+    if getattr(_batch, 'rows', None) is not None:
+        yield
+        return
+
+    _batch.rows = []
+    try:
+        yield
+        rows = _batch.rows
+    finally:
+        _batch.rows = None
+
+    if rows:
+        OutboundMessage.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+        transaction.on_commit(_on_enqueued)
+        logger.info('Outbox: %d message(s) queued in one batch', len(rows))
+
+
+@contextmanager
+def savepoint():
+    """
+    A nested transaction.atomic() for one unit of work inside batch(). If the
+    block raises, its database writes roll back to the savepoint and the rows
+    it queued are dropped from the batch, so they are never inserted.
+    """
+    rows = getattr(_batch, 'rows', None)
+    mark = len(rows) if rows is not None else 0
+    try:
+        with transaction.atomic():
+            yield
+    except Exception:
+        if rows is not None:
+            del rows[mark:]
+        raise
+
+
+def _enqueue(*, channel, clinic, recipient, body, comm_type, patient=None, appointment=None,
+             subject='', html_body='', reply_to='', key=None, resend=False) -> OutboundMessage:
+    key    = key or idempotency_key(comm_type, channel, appointment, patient, unique=resend)
+    fields = dict(
+        clinic      = clinic.main_clinic,
+        patient     = patient,
+        appointment = appointment,
+        comm_type   = comm_type,
+        channel     = channel,
+        recipient   = recipient,
+        subject     = subject[:500],
+        body        = body,
+        html_body   = html_body,
+        reply_to    = reply_to or '',
+    )
+
+    rows = getattr(_batch, 'rows', None)
+    if rows is not None:
+        message = OutboundMessage(idempotency_key=key, **fields)
+        rows.append(message)
+        return message
+
+    try:
+        with transaction.atomic():
+            message, created = OutboundMessage.objects.get_or_create(
+                idempotency_key=key,
+                defaults=fields,
+            )
+    except IntegrityError:
+        # Lost a race with a concurrent enqueue of the same key
+        message, created = OutboundMessage.objects.get(idempotency_key=key), False
+
+    if created:
+        transaction.on_commit(_on_enqueued)
+    else:
+        logger.info('Outbox: duplicate %s ignored (key=%s, status=%s)', comm_type, key, message.status)
+    return message
+
+
+def enqueue_email(*, clinic, recipient, subject, body, comm_type, html_body='', reply_to='',
+                  patient=None, appointment=None, key=None, resend=False) -> OutboundMessage:
+    """Queue a rendered email. Returns the (new or existing) outbox row."""
+    return _enqueue(
+        channel='EMAIL', clinic=clinic, recipient=recipient, body=body, comm_type=comm_type,
+        patient=patient, appointment=appointment, subject=subject, html_body=html_body,
+        reply_to=reply_to, key=key, resend=resend,
+    )
+
+
+def enqueue_sms(*, clinic, recipient, body, comm_type,
+                patient=None, appointment=None, key=None, resend=False) -> OutboundMessage:
+    """Queue an SMS to an E.164 number. Returns the (new or existing) outbox row."""
+    return _enqueue(
+        channel='SMS', clinic=clinic, recipient=recipient, body=body, comm_type=comm_type,
+        patient=patient, appointment=appointment, key=key, resend=resend,
+    )
+
+
+# ── Transports ────────────────────────────────────────────────────────────────
+# Each transport takes a list of rows and returns one (provider_id, error)
+# tuple per row, in order; error is '' on success. throttle, if given, is
+# called right before each provider call.
+
+def _send_emails(messages: list[OutboundMessage], throttle=None) -> list[tuple[str, str]]:
+    from django.core.mail import EmailMultiAlternatives
+    from apps.common.mail_transport import send_messages
+
+    emails = []
+    for message in messages:
+        email = EmailMultiAlternatives(
+            subject    = message.subject,
+            body       = message.body,
+            from_email = settings.DEFAULT_FROM_EMAIL,
+            to         = [message.recipient],
+            reply_to   = [message.reply_to] if message.reply_to else None,
+        )
+        if message.html_body:
+            email.attach_alternative(message.html_body, 'text/html')
+        emails.append(email)
+
+    # One pooled SMTP connection for the whole batch
+    return [('', result.error) for result in send_messages(emails, throttle=throttle)]
+
+
+def _send_sms(messages: list[OutboundMessage], throttle=None) -> list[tuple[str, str]]:
+    from apps.common.sms_transport import send_bulk
+
+    # Long-lived provider client, sends fanned out over the SMS thread pool
+    results = send_bulk([(message.recipient, message.body) for message in messages], throttle=throttle)
+    return [
+        (result.sid, '' if result.ok else f'{result.error_code}: {result.error}')
+        for result in results
+    ]
+
+
+TRANSPORTS = {
+    'EMAIL': _send_emails,
+    'SMS':   _send_sms,
+}
+
+
+# ── Processing ────────────────────────────────────────────────────────────────
+
+def _claim(limit: int) -> list[OutboundMessage]:
+    """Move up to `limit` due rows to SENDING and return them."""
+    now   = timezone.now()
+    stale = now - timedelta(seconds=OUTBOX_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            OutboundMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status='QUEUED', next_attempt_at__lte=now)
+                | Q(status='SENDING', locked_at__lt=stale)
+            )
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(id__in=ids).update(
+            status='SENDING',
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(OutboundMessage.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _finish(message: OutboundMessage, error: str = '', provider_id: str = '') -> None:
+    now = timezone.now()
+    if not error:
+        message.status, message.sent_at = 'SENT', now
+    elif message.attempts < OUTBOX_MAX_ATTEMPTS:
+        message.status          = 'QUEUED'
+        message.next_attempt_at = now + timedelta(seconds=_backoff(message.attempts))
+    else:
+        message.status = 'FAILED'
+
+    message.locked_at           = None
+    message.error_message       = error
+    message.provider_message_id = provider_id or message.provider_message_id
+    message.save(update_fields=[
+        'status', 'sent_at', 'next_attempt_at', 'locked_at',
+        'error_message', 'provider_message_id', 'updated_at',
+    ])
+
+    if message.status == 'QUEUED':
+        logger.warning(
+            'Outbox: %s #%s attempt %s failed, retry at %s — %s',
+            message.channel, message.id, message.attempts, message.next_attempt_at, error,
+        )
+        return
+    _log_result(message)
+
+
+def _log_result(message: OutboundMessage) -> None:
+    sent = message.status == 'SENT'
+    CommunicationLog.objects.create(
+        clinic_id      = message.clinic_id,
+        patient_id     = message.patient_id,
+        appointment_id = message.appointment_id,
+        comm_type      = message.comm_type,
+        channel        = message.channel,
+        recipient      = message.recipient,
+        subject        = message.subject,
+        body_preview   = message.body[:500],
+        status         = 'SENT' if sent else 'FAILED',
+        error_message  = message.error_message,
+    )
+    if message.comm_type == 'APPOINTMENT_REMINDER' and message.appointment_id:
+        from apps.appointments.models import AppointmentReminder
+        AppointmentReminder.objects.create(
+            appointment_id = message.appointment_id,
+            reminder_type  = message.channel,
+            is_successful  = sent,
+            error_message  = message.error_message,
+        )
+    if sent:
+        logger.info('Outbox: %s %s → %s sent', message.comm_type, message.channel, message.recipient)
+    else:
+        logger.error(
+            'Outbox: %s %s → %s failed after %s attempts — %s',
+            message.comm_type, message.channel, message.recipient, message.attempts, message.error_message,
+        )
+
+
+def _deliver(channel: str, messages: list[OutboundMessage]) -> None:
+    # The rate limit is applied per send inside the transport, not up front —
+    # SMS fans a batch out over several threads
+    bucket = _buckets.get(channel)
+    try:
+        outcomes = TRANSPORTS[channel](messages, throttle=bucket.acquire if bucket else None)
+    except Exception as exc:
+        outcomes = [('', f'{type(exc).__name__}: {exc}')] * len(messages)
+
+    for message, (provider_id, error) in zip(messages, outcomes):
+        try:
+            _finish(message, error=error, provider_id=provider_id)
+        except Exception as exc:
+            logger.exception('Outbox: could not record result for #%s: %s', message.id, exc)
+
+
+def process_batch(limit: int = OUTBOX_BATCH_SIZE) -> int:
+    """Claim and send one batch in the calling thread. Returns rows processed."""
+    messages = _claim(limit)
+    for channel in TRANSPORTS:
+        group = [m for m in messages if m.channel == channel]
+        if group:
+            _deliver(channel, group)
+    return len(messages)
+
+
+# ── Worker pool ───────────────────────────────────────────────────────────────
+
+_wakeup      = threading.Event()
+_pool_lock   = threading.Lock()
+_workers: list[threading.Thread] = []
+
+
+def wake() -> None:
+    """Nudge idle workers to look for due messages now."""
+    _wakeup.set()
+
+
+def _on_enqueued() -> None:
+    if OUTBOX_AUTOSTART:
+        start_workers()
+    wake()
+
+
+def _run_worker() -> None:
+    while True:
+        try:
+            close_old_connections()
+            processed = process_batch()
+        except Exception as exc:
+            logger.exception('Outbox worker error: %s', exc)
+            processed = 0
+        finally:
+            close_old_connections()
+
+        if not processed:
+            _wakeup.wait(OUTBOX_IDLE_POLL)
+            _wakeup.clear()
+
+
+def start_workers(count: int = OUTBOX_WORKERS) -> None:
+    """Start the worker pool in this process (idempotent)."""
+    if sum(t.is_alive() for t in _workers) >= count:
+        return
+    with _pool_lock:
+        _workers[:] = [t for t in _workers if t.is_alive()]
+        while len(_workers) < count:
+            worker = threading.Thread(
+                target=_run_worker, name=f'outbox-worker-{len(_workers) + 1}', daemon=True,
+            )
+            worker.start()
+            _workers.append(worker)
+
+
+def drain(timeout: float | None = None, workers: int = OUTBOX_WORKERS) -> int:
+    """
+    Send everything that is due, using `workers` threads, and return the
+    number of rows processed. Used by the process_outbox command.
+    """
+    deadline  = time.monotonic() + timeout if timeout else None
+    processed = [0]
+    lock      = threading.Lock()
+
+    def work():
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                try:
+                    count = process_batch()
+                except Exception as exc:
+                    logger.exception('Outbox drain error: %s', exc)
+                    return
+                if not count:
+                    return
+                with lock:
+                    processed[0] += count
+        finally:
+            close_old_connections()
+
+    threads = [threading.Thread(target=work, name=f'outbox-drain-{i + 1}') for i in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return processed[0]
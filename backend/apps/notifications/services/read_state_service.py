@@ -0,0 +1,153 @@
+"""
+Per-user read state for clinic-wide notifications.
+
+Each user keeps one NotificationReadState row per main clinic:
+
+  • last_read_id — every notification with id <= watermark is read;
+  • NotificationRead rows — sparse exceptions above the watermark
+    (notifications opened one at a time);
+  • unread_count — cached badge counter, maintained on create / mark-read.
+    It only counts notifications inside the list window (LIST_WINDOW_DAYS),
+    so the badge never shows items the list cannot; the daily archive job
+    recounts clinics whose notifications aged out of the window.
+
+The badge poll reads one row, and mark-all-read moves the watermark with a
+single-row UPDATE instead of inserting a read receipt per notification.
+"""
+import logging
+from datetime import timedelta
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.notifications.models import Notification, NotificationRead, NotificationReadState
+from apps.notifications.services.retention_service import LIST_WINDOW_DAYS
+
+logger = logging.getLogger(__name__)
+
+
+def window_start():
+    """Oldest created_at the notification list shows by default."""
+    return timezone.now() - timedelta(days=LIST_WINDOW_DAYS)
+
+
+def _count_unread(user, main_clinic, last_read_id: int) -> int:
+    return (
+        Notification.objects
+        .filter(clinic=main_clinic, id__gt=last_read_id, created_at__gte=window_start())
+        .exclude(reads__user=user)
+        .count()
+    )
+
+
+def get_read_state(user, main_clinic) -> NotificationReadState:
+    """
+    Return the user's read state for the clinic, creating it on first use.
+    A new state starts its watermark at the list window — notifications the
+    list no longer shows never count as unread — and its counter is seeded
+    with one COUNT.
+    """
+    state = NotificationReadState.objects.filter(user=user, clinic=main_clinic).first()
+    if state is not None:
+        return state
+
+    seed = (
+        Notification.objects
+        .filter(clinic=main_clinic, created_at__lt=window_start())
+        .order_by('-created_at', '-id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    state, created = NotificationReadState.objects.get_or_create(
+        user=user,
+        clinic=main_clinic,
+        defaults={'last_read_id': seed or 0},
+    )
+    if created:
+        recount(state)
+    return state
+
+
+def recount(state: NotificationReadState) -> int:
+    """Recompute the cached counter from the watermark and exceptions."""
+    unread = _count_unread(state.user, state.clinic, state.last_read_id)
+    NotificationReadState.objects.filter(pk=state.pk).update(unread_count=unread)
+    state.unread_count = unread
+    return unread
+
+
+def read_q(state: NotificationReadState) -> Q:
+    """Q matching the notifications `state.user` has read."""
+    exceptions = NotificationRead.objects.filter(
+        user_id=state.user_id,
+        notification_id__gt=state.last_read_id,
+    ).values('notification_id')
+    return Q(id__lte=state.last_read_id) | Q(id__in=exceptions)
+
+
+def read_map(state: NotificationReadState) -> tuple[int, dict]:
+    """
+    (watermark, {notification_id: read_at}) for the exceptions above it.
+    Notifications at or below the watermark were read at state.last_read_at.
+    """
+    reads = NotificationRead.objects.filter(
+        user_id=state.user_id,
+        notification__clinic_id=state.clinic_id,
+        notification_id__gt=state.last_read_id,
+    ).values_list('notification_id', 'read_at')
+    return state.last_read_id, dict(reads)
+
+
+def bump_unread(main_clinic_id) -> None:
+    """A notification was created for the clinic — one more unread for everyone."""
+    NotificationReadState.objects.filter(clinic_id=main_clinic_id).update(
+        unread_count=F('unread_count') + 1,
+    )
+
+
+def mark_read(user, notification: Notification) -> bool:
+    """Mark one notification read. Returns False if it was already read."""
+    state = get_read_state(user, notification.clinic)
+    if notification.id <= state.last_read_id:
+        return False
+
+    _, created = NotificationRead.objects.get_or_create(
+        notification=notification,
+        user=user,
+    )
+    if created:
+        NotificationReadState.objects.filter(pk=state.pk, unread_count__gt=0).update(
+            unread_count=F('unread_count') - 1,
+        )
+    return created
+
+
+def mark_all_read(user, main_clinic) -> int:
+    """
+    Move the watermark to the clinic's newest notification.
+    Returns how many notifications were unread.
+    """
+    state  = get_read_state(user, main_clinic)
+    marked = state.unread_count
+
+    latest = (
+        Notification.objects
+        .filter(clinic=OuterRef('clinic'))
+        .order_by('-id')
+        .values('id')[:1]
+    )
+    NotificationReadState.objects.filter(pk=state.pk).update(
+        last_read_id=Coalesce(Subquery(latest), F('last_read_id')),
+        last_read_at=timezone.now(),
+        unread_count=0,
+    )
+
+    # Exceptions under the new watermark are redundant — keep the table sparse
+    state.refresh_from_db(fields=['last_read_id'])
+    NotificationRead.objects.filter(
+        user=user,
+        notification__clinic=main_clinic,
+        notification_id__lte=state.last_read_id,
+    ).delete()
+
+    return marked
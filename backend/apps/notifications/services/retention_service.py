@@ -0,0 +1,149 @@
+"""
+Notification retention.
+
+Notifications older than their type's retention window are moved — with
+their read receipts — to the archive tables (notifications_archive,
+notification_reads_archive) in small batches, so the hot tables only hold
+recent rows and the list / badge queries stay on their indexes.
+
+Retention is configured per type:
+
+    NOTIFICATION_RETENTION_DAYS = {'DAILY_SUMMARY': 30, 'NEW_BOOKING': 90, …}
+    NOTIFICATION_RETENTION_DEFAULT_DAYS = 180
+
+Each batch runs in its own short transaction (copy → delete), so the job
+can be stopped at any point and resumed by running it again.
+
+Public API
+----------
+LIST_WINDOW_DAYS  →  default look-back of the notification list endpoint
+retention_cutoffs(now=None)  →  {notification_type: datetime}
+archive_batch(notification_type, cutoff, batch_size)  →  (archived, clinic_ids)
+archive_expired(batch_size=…, max_batches=None, types=None)  →  dict
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notifications.models import (
+    ArchivedNotification,
+    ArchivedNotificationRead,
+    Notification,
+    NotificationRead,
+    NotificationReadState,
+)
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = {
+    'DAILY_SUMMARY': 30,
+    'DIGEST':        90,
+    'NEW_BOOKING':   90,
+    **getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {}),
+}
+RETENTION_DEFAULT_DAYS = getattr(settings, 'NOTIFICATION_RETENTION_DEFAULT_DAYS', 180)
+ARCHIVE_BATCH_SIZE     = getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 1000)
+LIST_WINDOW_DAYS       = getattr(settings, 'NOTIFICATION_LIST_WINDOW_DAYS', 30)
+
+NOTIFICATION_FIELDS = (
+    'id', 'clinic_id', 'clinic_branch_id', 'appointment_id', 'notification_type',
+    'title', 'message', 'link_url', 'created_at', 'updated_at',
+)
+
+
+def retention_cutoffs(now=None) -> dict:
+    """Archive-before timestamp for every notification type."""
+    now = now or timezone.now()
+    return {
+        code: now - timedelta(days=RETENTION_DAYS.get(code, RETENTION_DEFAULT_DAYS))
+        for code, _ in Notification.NOTIFICATION_TYPE_CHOICES
+    }
+
+
+def archive_batch(notification_type: str, cutoff, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """
+    Move up to batch_size expired notifications of one type (oldest first)
+    to the archive. Returns (archived_count, {clinic_id, …}).
+    """
+    with transaction.atomic():
+        rows = list(
+            Notification.objects
+            .filter(notification_type=notification_type, created_at__lt=cutoff)
+            .order_by('created_at', 'id')
+            .values(*NOTIFICATION_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0, set()
+
+        ids = [row['id'] for row in rows]
+        ArchivedNotification.objects.bulk_create(
+            [ArchivedNotification(**row) for row in rows],
+            ignore_conflicts=True,          # re-run after a crash between copy and delete
+        )
+        ArchivedNotificationRead.objects.bulk_create([
+            ArchivedNotificationRead(**read)
+            for read in NotificationRead.objects
+            .filter(notification_id__in=ids)
+            .values('notification_id', 'user_id', 'read_at')
+        ])
+
+        NotificationRead.objects.filter(notification_id__in=ids).delete()
+        Notification.objects.filter(id__in=ids).delete()
+
+    return len(ids), {row['clinic_id'] for row in rows}
+
+
+def archive_expired(batch_size: int = ARCHIVE_BATCH_SIZE, max_batches=None, types=None) -> dict:
+    """
+    Archive every expired notification, batch by batch.
+    Returns {notification_type: archived_count}.
+    """
+    cutoffs  = retention_cutoffs()
+    archived = {}
+    clinics  = set()
+    batches  = 0
+
+    for notification_type, cutoff in cutoffs.items():
+        if types and notification_type not in types:
+            continue
+        archived[notification_type] = 0
+        while max_batches is None or batches < max_batches:
+            count, clinic_ids = archive_batch(notification_type, cutoff, batch_size)
+            if not count:
+                break
+            archived[notification_type] += count
+            clinics  |= clinic_ids
+            batches  += 1
+
+    # Badges only count the list window — recount clinics whose notifications
+    # left it since the last (daily) run, along with those that lost rows here
+    clinics |= _clinics_leaving_list_window()
+    if clinics:
+        _refresh_unread_counters(clinics)
+
+    logger.info('Notification archive: %s in %d batches', archived, batches)
+    return archived
+
+
+def _clinics_leaving_list_window() -> set:
+    """Clinics with notifications that aged out of the list window in the last two days."""
+    from apps.notifications.services.read_state_service import window_start
+
+    start = window_start()
+    return set(
+        Notification.objects
+        .filter(created_at__gte=start - timedelta(days=2), created_at__lt=start)
+        .values_list('clinic_id', flat=True)
+        .distinct()
+    )
+
+
+def _refresh_unread_counters(clinic_ids) -> None:
+    """Archived notifications may have been unread — recount the affected badges."""
+    from apps.notifications.services.read_state_service import recount
+
+    for state in NotificationReadState.objects.filter(clinic_id__in=clinic_ids).select_related('user', 'clinic'):
+        recount(state)
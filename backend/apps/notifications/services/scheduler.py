@@ -0,0 +1,315 @@
+"""
+Continuous communication scheduler.
+
+The crons send every clinic's Y/N reminders at 08:00 and every rebook
+follow-up at 10:00, so SMTP and Twilio see the whole day's traffic in one
+minute. The scheduler instead gives each message its own due time and
+dispatches continuously:
+
+  reminder          due = starts_at − reminder_hours_before
+  rebook follow-up  due = dna_followup_sent_at + no_rebook_followup_days
+
+  • every SCHEDULER_REFRESH seconds the items due within SCHEDULER_HORIZON
+    are loaded (one query per clinic group sharing a lead time) into a
+    time-ordered heap;
+  • each due time gets a stable jitter of up to ±SCHEDULER_JITTER seconds
+    (seeded by the appointment id, so a reload lands on the same slot);
+  • dispatch goes through a token bucket (SCHEDULER_RATE per second), so
+    a cluster of due items drains as a flat stream;
+  • items that came due while the scheduler was down are still sent if they
+    are at most SCHEDULER_CATCHUP seconds late (reminders) — rebook
+    follow-ups have no deadline;
+  • dispatch re-reads the appointment, so a cancelled or already-sent item
+    is dropped, and a rescheduled reminder goes back on the heap at its new
+    due time; the rest goes through the usual communication_service
+    functions, which skip anything already sent.
+
+Run it with `python manage.py run_scheduler`. With COMMUNICATION_SCHEDULER
+= True the 08:00 / 10:00 crons for these two workflows stand down.
+
+Public API
+----------
+CommunicationScheduler(rate=…, jitter=…)
+scheduler.refresh(now=None)  →  int (items added)
+scheduler.dispatch_due(now=None, limit=None)  →  int (items dispatched)
+scheduler.run(stop_event)  →  None
+scheduler.pending()  →  list[ScheduledItem]
+scheduler.stats()  →  dict
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.appointments.models import Appointment
+from apps.clinics.models import Clinic, ClinicCommunicationSettings
+from apps.notifications.services.outbox import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = getattr(settings, 'COMMUNICATION_SCHEDULER', False)
+SCHEDULER_TICK    = getattr(settings, 'SCHEDULER_TICK', 1.0)         # seconds between dispatch passes
+SCHEDULER_REFRESH = getattr(settings, 'SCHEDULER_REFRESH', 60)       # seconds between DB loads
+SCHEDULER_HORIZON = getattr(settings, 'SCHEDULER_HORIZON', 900)      # look-ahead when loading
+SCHEDULER_CATCHUP = getattr(settings, 'SCHEDULER_CATCHUP', 3600)     # how late a reminder may still go
+SCHEDULER_JITTER  = getattr(settings, 'SCHEDULER_JITTER', 300)       # ± spread around the due time
+SCHEDULER_RATE    = getattr(settings, 'SCHEDULER_RATE', 2.0)         # dispatches per second
+
+REMINDER = 'REMINDER'
+REBOOK   = 'REBOOK'
+
+ACTIVE_STATUSES = ['SCHEDULED', 'CONFIRMED']
+
+
+@dataclass(order=True)
+class ScheduledItem:
+    due_at:         datetime
+    kind:           str = field(compare=False)
+    appointment_id: int = field(compare=False)
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.appointment_id)
+
+
+def _jitter(kind: str, appointment_id: int, spread: float) -> timedelta:
+    return timedelta(seconds=random.Random(f'{kind}:{appointment_id}').uniform(-spread, spread))
+
+
+def _clinic_groups(flag: str, attr: str) -> dict:
+    """
+    {setting value: {branch_id, …}} for main clinics with `flag` enabled,
+    grouped by their `attr` (lead time) so each group is one query.
+    """
+    mains    = list(Clinic.objects.filter(parent_clinic__isnull=True, is_deleted=False))
+    settings_by_clinic = {
+        obj.clinic_id: obj
+        for obj in ClinicCommunicationSettings.objects.filter(clinic_id__in=[c.id for c in mains])
+    }
+    value_by_main = {}
+    for clinic in mains:
+        settings_obj = settings_by_clinic.get(clinic.id) or ClinicCommunicationSettings.get_for_clinic(clinic)
+        if getattr(settings_obj, flag):
+            value_by_main[clinic.id] = getattr(settings_obj, attr)
+
+    groups = defaultdict(set)
+    for branch_id, main_id in (
+        Clinic.objects
+        .filter(Q(id__in=value_by_main) | Q(parent_clinic_id__in=value_by_main))
+        .values_list('id', Coalesce('parent_clinic_id', 'id'))
+    ):
+        groups[value_by_main[main_id]].add(branch_id)
+    return groups
+
+
+def _family():
+    """Main clinic id of an appointment's clinic."""
+    return Coalesce('clinic__parent_clinic_id', 'clinic_id')
+
+
+def _rebooked():
+    """
+    EXISTS: the patient booked again in the same clinic family after the DNA
+    follow-up went out. The outer query must annotate family=_family().
+    """
+    return Exists(
+        Appointment.objects.annotate(family=_family()).filter(
+            patient_id=OuterRef('patient_id'),
+            family=OuterRef('family'),
+            is_deleted=False,
+            status__in=ACTIVE_STATUSES,
+            starts_at__gte=OuterRef('starts_at'),
+            created_at__gt=OuterRef('dna_followup_sent_at'),
+        )
+    )
+
+
+class CommunicationScheduler:
+
+    def __init__(self, rate: float = SCHEDULER_RATE, jitter: float = SCHEDULER_JITTER,
+                 horizon: float = SCHEDULER_HORIZON, catchup: float = SCHEDULER_CATCHUP):
+        self.jitter   = jitter
+        self.horizon  = timedelta(seconds=horizon)
+        self.catchup  = timedelta(seconds=catchup)
+        self._bucket  = TokenBucket(rate) if rate else None
+        self._heap:   list[ScheduledItem] = []
+        self._queued: set[tuple] = set()
+        self._done:   dict[tuple, datetime] = {}     # dispatched (or skipped) keys → when
+        self._stats   = Counter()
+        self._lag_s   = 0.0
+
+    # ── Loading ──────────────────────────────────────────────────────────────
+
+    def _push(self, kind: str, appointment_id: int, due_at: datetime) -> bool:
+        key = (kind, appointment_id)
+        if key in self._queued or key in self._done:
+            return False
+        heapq.heappush(self._heap, ScheduledItem(due_at, kind, appointment_id))
+        self._queued.add(key)
+        return True
+
+    def refresh(self, now=None) -> int:
+        """Load reminders and rebook follow-ups due before now + horizon."""
+        now    = now or timezone.now()
+        until  = now + self.horizon + timedelta(seconds=self.jitter)
+        added  = 0
+
+        for hours_before, branch_ids in _clinic_groups('reminders_enabled', 'reminder_hours_before').items():
+            lead = timedelta(hours=hours_before)
+            rows = Appointment.objects.filter(
+                clinic_id__in=branch_ids,
+                is_deleted=False,
+                status__in=ACTIVE_STATUSES,
+                reminder_sent=False,
+                starts_at__gte=now + lead - self.catchup,
+                starts_at__lt=until + lead,
+            ).values_list('id', 'starts_at')
+            for appointment_id, starts_at in rows:
+                due_at = starts_at - lead + _jitter(REMINDER, appointment_id, self.jitter)
+                added += self._push(REMINDER, appointment_id, due_at)
+
+        for days, branch_ids in _clinic_groups('rebook_followup_enabled', 'no_rebook_followup_days').items():
+            wait = timedelta(days=days)
+            rows = Appointment.objects.filter(
+                clinic_id__in=branch_ids,
+                is_deleted=False,
+                dna_followup_sent=True,
+                rebook_followup_sent=False,
+                dna_followup_sent_at__lt=until - wait,
+            ).annotate(family=_family()).exclude(_rebooked()).values_list('id', 'dna_followup_sent_at')
+            for appointment_id, sent_at in rows:
+                due_at = sent_at + wait + _jitter(REBOOK, appointment_id, self.jitter)
+                added += self._push(REBOOK, appointment_id, due_at)
+
+        # Forget dispatched reminders once they can no longer be reloaded; a
+        # skipped rebook follow-up (e.g. notifications off) is retried daily
+        forget = {
+            REMINDER: now - self.catchup - self.horizon - timedelta(seconds=2 * self.jitter),
+            REBOOK:   now - timedelta(days=1),
+        }
+        self._done = {key: at for key, at in self._done.items() if at >= forget[key[0]]}
+
+        self._stats['refreshes'] += 1
+        self._stats['loaded'] += added
+        return added
+
+    # ── Dispatch ─────────────────────────────────────────────────────────────
+
+    def dispatch_due(self, now=None, limit=None) -> int:
+        """Dispatch every item due by `now` (rate-limited). Returns the count."""
+        dispatched = 0
+        while self._heap and (limit is None or dispatched < limit):
+            now = now or timezone.now()
+            if self._heap[0].due_at > now:
+                break
+            item = heapq.heappop(self._heap)
+            self._queued.discard(item.key)
+
+            if item.kind == REMINDER and now - item.due_at > self.catchup:
+                self._stats['expired'] += 1
+                self._done[item.key] = now
+                continue
+
+            if self._bucket is not None:
+                self._bucket.acquire()
+            moved_to = self._dispatch(item, now)
+            if moved_to is not None:
+                self._push(item.kind, item.appointment_id, moved_to)
+                self._stats['rescheduled'] += 1
+                continue
+            self._done[item.key] = timezone.now()
+            self._lag_s = (timezone.now() - item.due_at).total_seconds()
+            dispatched += 1
+            now = None
+        return dispatched
+
+    def _dispatch(self, item: ScheduledItem, now: datetime):
+        """
+        Re-read the appointment and send. Returns the new due time when a
+        reminder's appointment was rescheduled to later (the caller puts it
+        back on the heap), otherwise None.
+        """
+        from apps.notifications.services.communication_service import (
+            send_appointment_reminder_with_reply,
+            send_rebook_followup,
+        )
+
+        qs = Appointment.objects.select_related(
+            'patient', 'practitioner__user', 'clinic', 'location', 'service',
+        )
+        if item.kind == REMINDER:
+            qs = qs.filter(status__in=ACTIVE_STATUSES, reminder_sent=False)
+        else:
+            qs = qs.filter(dna_followup_sent=True, rebook_followup_sent=False)
+            qs = qs.annotate(family=_family(), has_new=_rebooked())
+        appt = qs.filter(pk=item.appointment_id, is_deleted=False).first()
+        if appt is None or (item.kind == REBOOK and appt.has_new):
+            self._stats['dropped'] += 1
+            return None
+
+        if item.kind == REMINDER:
+            # The appointment may have moved since it was loaded
+            lead   = timedelta(hours=ClinicCommunicationSettings.get_for_clinic(appt.clinic).reminder_hours_before)
+            due_at = appt.starts_at - lead + _jitter(REMINDER, appt.id, self.jitter)
+            if due_at > now:
+                return due_at
+            if now - due_at > self.catchup:
+                self._stats['expired'] += 1
+                return None
+
+        try:
+            if item.kind == REMINDER:
+                result = send_appointment_reminder_with_reply(appt)
+            else:
+                result = send_rebook_followup(appt)
+        except Exception as exc:
+            self._stats['failed'] += 1
+            logger.error('Scheduler: %s for appointment %s failed — %s', item.kind, appt.id, exc)
+            return None
+
+        self._stats['skipped' if result.get('skipped') else f'sent_{item.kind.lower()}'] += 1
+        return None
+
+    # ── Loop ─────────────────────────────────────────────────────────────────
+
+    def pending(self) -> list[ScheduledItem]:
+        """Queued items in due order."""
+        return sorted(self._heap)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            'queued':    len(self._heap),
+            'next_due':  self._heap[0].due_at.isoformat() if self._heap else None,
+            'last_lag_s': round(self._lag_s, 1),
+        }
+
+    def run(self, stop_event: threading.Event, refresh_every: float = SCHEDULER_REFRESH,
+            tick: float = SCHEDULER_TICK) -> None:
+        """Refresh every `refresh_every` seconds and dispatch continuously until stopped."""
+        next_refresh = 0.0
+        while not stop_event.is_set():
+            try:
+                close_old_connections()
+                if time.monotonic() >= next_refresh:
+                    added = self.refresh()
+                    next_refresh = time.monotonic() + refresh_every
+                    logger.info('Scheduler: +%d item(s) — %s', added, self.stats())
+                self.dispatch_due()
+            except Exception as exc:
+                logger.exception('Scheduler loop error: %s', exc)
+            finally:
+                close_old_connections()
+            stop_event.wait(tick)
@@ -0,0 +1,237 @@
+"""
+Workflow runner for the communication crons.
+
+The workflow commands (send_communication_reminders, send_dna_followups, …)
+each accept --clinic-id. The runner splits a job into one shard per clinic,
+runs the shards across a pool of worker processes and records progress in
+WorkflowRun / WorkflowCheckpoint:
+
+    run = run_workflow('send_communication_reminders', workers=8)
+
+  • a run is identified by run_key (default "<job>:<cron slot>" — the
+    local date, or the local hour for the jobs in RUN_KEY_FORMATS that run
+    several times a day); running the same key again resumes it — only
+    shards that are PENDING, FAILED (fewer than WORKFLOW_MAX_ATTEMPTS
+    tries) or stuck RUNNING for longer than WORKFLOW_SHARD_LEASE seconds
+    are executed, so a crash or timeout halfway through the 8 AM burst
+    picks up where it stopped;
+  • shards are claimed with a conditional UPDATE, so two runners started on
+    the same key never execute the same clinic twice;
+  • re-running a shard is safe: the commands skip appointments already
+    flagged as reminded / followed-up, and the outbox idempotency keys
+    drop duplicate messages;
+  • worker processes only enqueue; the runner drains the outbox once all
+    shards are done, so no send is cut off when a worker process exits;
+  • every checkpoint stores its duration and the command's summary line,
+    and the run stores the per-clinic timing summary.
+
+Public API
+----------
+JOBS  →  {command name: shard scope}
+default_run_key(job, clinic_id=None)  →  str
+run_workflow(job, workers=…, run_key=None, clinic_id=None, options=None)  →  WorkflowRun
+timing_summary(run)  →  list[dict]
+"""
+from __future__ import annotations
+
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections, connections
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from apps.clinics.models import Clinic
+from apps.notifications.models import WorkflowCheckpoint, WorkflowRun
+
+logger = logging.getLogger(__name__)
+
+WORKFLOW_WORKERS       = getattr(settings, 'WORKFLOW_WORKERS', 4)
+WORKFLOW_MAX_ATTEMPTS  = getattr(settings, 'WORKFLOW_MAX_ATTEMPTS', 3)
+WORKFLOW_SHARD_LEASE   = getattr(settings, 'WORKFLOW_SHARD_LEASE', 900)     # seconds
+WORKFLOW_DRAIN_TIMEOUT = getattr(settings, 'WORKFLOW_DRAIN_TIMEOUT', 600)
+
+# What --clinic-id means for each command:
+#   MAIN   — a main clinic; the command covers all of its branches
+#   BRANCH — exactly that clinic, so every branch is its own shard
+JOBS = {
+    'send_appointment_reminders':   'BRANCH',
+    'send_communication_reminders': 'MAIN',
+    'send_dna_followups':           'BRANCH',
+    'send_rebook_followups':        'MAIN',
+    'send_inactive_checkins':       'MAIN',
+}
+
+# Cron slot in the default run_key, for jobs that run more than once a day —
+# a per-date key would make every run after the first a completed no-op
+RUN_KEY_FORMATS = {
+    'send_dna_followups':           '%Y-%m-%dT%H',      # every 2 hours
+}
+RUN_KEY_FORMAT_DAILY = '%Y-%m-%d'
+
+
+def _shard_clinic_ids(job: str, clinic_id=None) -> list[int]:
+    """Clinic ids to run `job` for, grouped so each clinic family is contiguous."""
+    clinics = Clinic.objects.filter(is_deleted=False)
+    if JOBS[job] == 'MAIN':
+        clinics = clinics.filter(parent_clinic__isnull=True)
+    if clinic_id:
+        clinics = clinics.filter(Q(id=clinic_id) | Q(parent_clinic_id=clinic_id))
+    return list(clinics.order_by(F('parent_clinic_id').asc(nulls_first=True), 'id').values_list('id', flat=True))
+
+
+def _claimable(now) -> Q:
+    return (
+        Q(status__in=['PENDING', 'FAILED'], attempts__lt=WORKFLOW_MAX_ATTEMPTS)
+        | Q(status='RUNNING', started_at__lt=now - timedelta(seconds=WORKFLOW_SHARD_LEASE))
+    )
+
+
+# ── Shard execution (runs in a worker process) ────────────────────────────────
+
+def _init_worker() -> None:
+    from apps.notifications.services import outbox
+
+    # Workers only enqueue — the parent drains once every shard is done
+    outbox.OUTBOX_AUTOSTART = False
+
+
+def _last_line(output: str) -> str:
+    # Last line with any text (skips "────" rules under the summary)
+    lines = [line.strip() for line in output.splitlines() if any(ch.isalnum() for ch in line)]
+    return lines[-1][:200] if lines else ''
+
+
+def _run_shard(checkpoint_id: int, job: str, options: dict) -> dict:
+    close_old_connections()
+    now     = timezone.now()
+    claimed = WorkflowCheckpoint.objects.filter(pk=checkpoint_id).filter(_claimable(now)).update(
+        status='RUNNING', started_at=now, attempts=F('attempts') + 1, error='',
+    )
+    if not claimed:
+        return {'id': checkpoint_id, 'status': 'SKIPPED'}
+
+    checkpoint = WorkflowCheckpoint.objects.get(pk=checkpoint_id)
+    output     = io.StringIO()
+    started    = time.perf_counter()
+    try:
+        call_command(job, clinic_id=checkpoint.clinic_id, stdout=output, **options)
+        status, error = 'DONE', ''
+    except Exception as exc:
+        status, error = 'FAILED', f'{type(exc).__name__}: {exc}'
+        logger.error('Workflow %s: clinic %s failed — %s', job, checkpoint.clinic_id, error)
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    WorkflowCheckpoint.objects.filter(pk=checkpoint_id).update(
+        status      = status,
+        finished_at = timezone.now(),
+        duration_ms = duration_ms,
+        result      = _last_line(output.getvalue()),
+        error       = error,
+    )
+    close_old_connections()
+    return {'id': checkpoint_id, 'clinic_id': checkpoint.clinic_id, 'status': status, 'duration_ms': duration_ms}
+
+
+# ── Runs ──────────────────────────────────────────────────────────────────────
+
+def timing_summary(run: WorkflowRun) -> list[dict]:
+    """Per-clinic rows for a run, slowest first."""
+    return [
+        {
+            'clinic_id':   cp.clinic_id,
+            'clinic':      cp.clinic.name,
+            'status':      cp.status,
+            'attempts':    cp.attempts,
+            'duration_ms': cp.duration_ms,
+            'result':      cp.result,
+            'error':       cp.error,
+        }
+        for cp in run.checkpoints.select_related('clinic').order_by(F('duration_ms').desc(nulls_last=True))
+    ]
+
+
+def default_run_key(job: str, clinic_id=None) -> str:
+    """The run_key for the current cron slot of `job`."""
+    slot = timezone.localtime().strftime(RUN_KEY_FORMATS.get(job, RUN_KEY_FORMAT_DAILY))
+    return f'{job}:{slot}' + (f':clinic-{clinic_id}' if clinic_id else '')
+
+
+def run_workflow(job: str, workers: int = WORKFLOW_WORKERS, run_key: str | None = None,
+                 clinic_id=None, options: dict | None = None) -> WorkflowRun:
+    """
+    Run (or resume) `job` for every clinic shard. Returns the WorkflowRun;
+    its status is FAILED if any shard is still unfinished afterwards.
+    """
+    if job not in JOBS:
+        raise ValueError(f"Unknown workflow '{job}'. Choose from: {', '.join(JOBS)}")
+
+    options = options or {}
+    run_key = run_key or default_run_key(job, clinic_id)
+    run, created = WorkflowRun.objects.get_or_create(run_key=run_key, defaults={'job': job})
+    if run.status == 'COMPLETED':
+        logger.info('Workflow %s already completed — nothing to resume', run_key)
+        return run
+    if not created:
+        WorkflowRun.objects.filter(pk=run.pk).update(status='RUNNING', finished_at=None)
+        logger.info('Workflow %s: resuming', run_key)
+
+    WorkflowCheckpoint.objects.bulk_create(
+        [WorkflowCheckpoint(run=run, clinic_id=cid) for cid in _shard_clinic_ids(job, clinic_id)],
+        ignore_conflicts=True,
+    )
+    pending = list(
+        run.checkpoints.filter(_claimable(timezone.now())).order_by('id').values_list('id', flat=True)
+    )
+
+    started = time.perf_counter()
+    if workers <= 1 or len(pending) <= 1:
+        from apps.notifications.services import outbox
+
+        autostart, outbox.OUTBOX_AUTOSTART = outbox.OUTBOX_AUTOSTART, False
+        try:
+            for checkpoint_id in pending:
+                _run_shard(checkpoint_id, job, options)
+        finally:
+            outbox.OUTBOX_AUTOSTART = autostart
+    else:
+        # Children are forked: drop our DB connections so each opens its own
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers = min(workers, len(pending)),
+            mp_context  = multiprocessing.get_context('fork'),
+            initializer = _init_worker,
+        ) as pool:
+            futures = [pool.submit(_run_shard, cid, job, options) for cid in pending]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    # A worker process died — its shard stays RUNNING until the lease expires
+                    logger.error('Workflow %s: worker process failed — %s', run_key, exc)
+
+    _finish_run(run, started)
+    return run
+
+
+def _finish_run(run: WorkflowRun, started: float) -> None:
+    from apps.notifications.services import outbox
+
+    drained = outbox.drain(timeout=WORKFLOW_DRAIN_TIMEOUT)
+
+    counts = dict(
+        run.checkpoints.order_by().values('status').annotate(n=Count('id')).values_list('status', 'n')
+    )
+    run.status      = 'COMPLETED' if set(counts) <= {'DONE'} else 'FAILED'
+    run.finished_at = timezone.now()
+    run.duration_ms = int((time.perf_counter() - started) * 1000)
+    run.summary     = {'shards': counts, 'outbox_sent': drained, 'clinics': timing_summary(run)}
+    run.save(update_fields=['status', 'finished_at', 'duration_ms', 'summary'])
+
+    logger.info('Workflow %s: %s in %d ms — %s', run.run_key, run.status, run.duration_ms, counts)
@@ -1,6 +1,9 @@
 """
 Django signals that auto-trigger notifications.
 Connected in apps.py → ready().
+
+Receivers only record intents; the dispatcher writes and pushes the
+notifications after the transaction commits.
 """
 import logging
 from django.db.models.signals import post_save
@@ -16,29 +19,24 @@ def connect_signals():
     """
     from apps.appointments.models import Appointment
     from apps.patients.models import PortalBooking
-    from apps.notifications.services.appointment_notifications import (
-        notify_new_booking,
-        notify_new_portal_booking,
+    from apps.notifications.services.dispatcher import (
+        enqueue_booking,
+        enqueue_portal_booking,
     )
 
     # ── 1. Diary Appointment created / confirmed ──────────────────────────────
     @receiver(post_save, sender=Appointment, weak=False)
     def on_appointment_saved(sender, instance, created, **kwargs):
         if created:
-            notify_new_booking(instance)
+            enqueue_booking(instance)
             return
 
         if instance.status == 'CONFIRMED':
-            from apps.notifications.models import Notification
-            already_notified = Notification.objects.filter(
-                appointment=instance,
-                notification_type='NEW_BOOKING',
-            ).exists()
-            if not already_notified:
-                notify_new_booking(instance)
+            # Duplicate check runs once per dispatch batch, after commit
+            enqueue_booking(instance, check_existing=True)
 
     # ── 2. Portal Booking submitted by patient ────────────────────────────────
     @receiver(post_save, sender=PortalBooking, weak=False)
     def on_portal_booking_saved(sender, instance, created, **kwargs):
         if created:
-            notify_new_portal_booking(instance)
\ No newline at end of file
+            enqueue_portal_booking(instance)
\ No newline at end of file
@@ -1,3 +1,66 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from apps.appointments.models import Appointment
+from apps.clinics.models import Clinic, ClinicCommunicationSettings
+from apps.notifications.services.scheduler import REMINDER, CommunicationScheduler
+from apps.patients.models import Patient
+
+SEND_REMINDER = 'apps.notifications.services.communication_service.send_appointment_reminder_with_reply'
+
+
+class SchedulerRevalidationTests(TestCase):
+    """A queued reminder must follow the appointment as it is when the reminder comes due."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = Clinic.objects.create(name='Main Clinic')
+        ClinicCommunicationSettings.objects.update_or_create(
+            clinic=cls.clinic, defaults={'reminders_enabled': True, 'reminder_hours_before': 24},
+        )
+        cls.patient = Patient.objects.create(
+            clinic=cls.clinic, first_name='Ana', last_name='Cruz',
+            date_of_birth=date(1990, 1, 1), gender='F', phone='09171234567',
+            address='1 Street', city='City', province='Province',
+            emergency_contact_name='Ben', emergency_contact_phone='09170000000',
+            emergency_contact_relationship='Sibling',
+        )
+
+    def setUp(self):
+        self.appt = Appointment.objects.create(
+            clinic=self.clinic, patient=self.patient, date=date(2030, 1, 10),
+            start_time=time(10), end_time=time(11),
+        )
+        self.due       = self.appt.starts_at - timedelta(hours=24)
+        self.scheduler = CommunicationScheduler(rate=0, jitter=0)
+        self.assertEqual(self.scheduler.refresh(now=self.due - timedelta(minutes=5)), 1)
+
+    def test_unchanged_appointment_gets_its_reminder(self):
+        with mock.patch(SEND_REMINDER, return_value={'success': True}) as send:
+            self.assertEqual(self.scheduler.dispatch_due(now=self.due), 1)
+        send.assert_called_once()
+
+    def test_cancelled_appointment_is_dropped(self):
+        Appointment.objects.filter(pk=self.appt.pk).update(status='CANCELLED')
+
+        with mock.patch(SEND_REMINDER) as send:
+            self.scheduler.dispatch_due(now=self.due)
+        send.assert_not_called()
+        self.assertEqual(self.scheduler.stats()['dropped'], 1)
+        self.assertEqual(self.scheduler.pending(), [])
+
+    def test_rescheduled_appointment_is_requeued_at_its_new_due_time(self):
+        self.appt.date = date(2030, 1, 12)
+        self.appt.save()
+
+        with mock.patch(SEND_REMINDER, return_value={'success': True}) as send:
+            self.assertEqual(self.scheduler.dispatch_due(now=self.due), 0)
+            send.assert_not_called()
+
+            [item] = self.scheduler.pending()
+            self.assertEqual((item.kind, item.due_at), (REMINDER, self.due + timedelta(days=2)))
+
+            self.assertEqual(self.scheduler.dispatch_due(now=item.due_at), 1)
+        send.assert_called_once()
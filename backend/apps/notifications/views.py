@@ -4,13 +4,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from datetime import timedelta
 
-from .models import Notification, NotificationRead, EmailLog, SMSLog, CommunicationLog
+from .models import Notification, EmailLog, SMSLog, CommunicationLog
 from .serializers import (
     NotificationSerializer, EmailLogSerializer, SMSLogSerializer,
     ClinicCommunicationSettingsSerializer, CommunicationLogSerializer,
 )
 from apps.clinics.models import ClinicCommunicationSettings
+from apps.notifications.services import read_state_service
+from apps.notifications.services.retention_service import LIST_WINDOW_DAYS
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -18,9 +21,11 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     Clinic-wide notifications for the authenticated user.
 
     All users in the same clinic see the SAME notifications.
-    Read/unread status is tracked per-user via NotificationRead.
+    Read/unread status is tracked per-user via a read watermark
+    (NotificationReadState) plus sparse NotificationRead exceptions.
 
-    GET  /notifications/                    — list (paginated, newest first)
+    GET  /notifications/                    — list (paginated, newest first,
+                                              last LIST_WINDOW_DAYS; ?days=N)
     GET  /notifications/{id}/               — detail
     POST /notifications/{id}/mark_read/     — mark one as read
     POST /notifications/mark_all_read/      — mark all as read
@@ -36,8 +41,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         """
-        Return all notifications for the user's main clinic.
-        New users automatically see every historical notification.
+        Return the notifications of the user's main clinic. The list is
+        bounded to a recent window; older rows are archived by the retention
+        job (see retention_service).
         """
         user = self.request.user
         if not user.clinic:
@@ -52,28 +58,34 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             .select_related('appointment', 'clinic_branch')
         )
 
+        if self.action == 'list':
+            qs = qs.filter(created_at__gte=timezone.now() - timedelta(days=self._window_days()))
+
         # Optional filter: ?is_read=true / ?is_read=false
         is_read_param = self.request.query_params.get('is_read')
         if is_read_param is not None:
-            read_ids = NotificationRead.objects.filter(
-                user=user
-            ).values_list('notification_id', flat=True)
+            state   = read_state_service.get_read_state(user, main_clinic)
+            is_read = read_state_service.read_q(state)
 
             if is_read_param.lower() in ('true', '1'):
-                qs = qs.filter(id__in=read_ids)
+                qs = qs.filter(is_read)
             else:
-                qs = qs.exclude(id__in=read_ids)
+                qs = qs.exclude(is_read)
 
         return qs
 
+    def _window_days(self) -> int:
+        try:
+            days = int(self.request.query_params.get('days', LIST_WINDOW_DAYS))
+        except ValueError:
+            days = LIST_WINDOW_DAYS
+        return max(1, days)
+
     # ── Mark one read ─────────────────────────────────────────────────────────
     @action(detail=True, methods=['post'], url_path='mark_read')
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        NotificationRead.objects.get_or_create(
-            notification=notification,
-            user=request.user,
-        )
+        read_state_service.mark_read(request.user, notification)
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
 
@@ -85,29 +97,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'marked_read': 0})
 
         main_clinic = user.clinic.main_clinic
+        marked      = read_state_service.mark_all_read(user, main_clinic)
 
-        # Get all notification IDs for this clinic that the user hasn't read yet
-        all_notif_ids = set(
-            Notification.objects.filter(clinic=main_clinic)
-            .values_list('id', flat=True)
-        )
-        already_read_ids = set(
-            NotificationRead.objects.filter(
-                user=user,
-                notification_id__in=all_notif_ids,
-            ).values_list('notification_id', flat=True)
-        )
-
-        unread_ids = all_notif_ids - already_read_ids
-
-        if unread_ids:
-            reads = [
-                NotificationRead(notification_id=nid, user=user)
-                for nid in unread_ids
-            ]
-            NotificationRead.objects.bulk_create(reads, ignore_conflicts=True)
-
-        return Response({'marked_read': len(unread_ids)})
+        return Response({'marked_read': marked})
 
     # ── Unread count ──────────────────────────────────────────────────────────
     @action(detail=False, methods=['get'], url_path='unread_count')
@@ -116,15 +108,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         if not user.clinic:
             return Response({'unread_count': 0})
 
-        main_clinic = user.clinic.main_clinic
-
-        total = Notification.objects.filter(clinic=main_clinic).count()
-        read  = NotificationRead.objects.filter(
-            user=user,
-            notification__clinic=main_clinic,
-        ).count()
+        state = read_state_service.get_read_state(user, user.clinic.main_clinic)
 
-        return Response({'unread_count': max(0, total - read)})
+        return Response({'unread_count': state.unread_count})
 
 
 # ── Admin-only log views ───────────────────────────────────────────────────────
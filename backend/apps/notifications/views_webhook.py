@@ -2,12 +2,11 @@
 SMS Reply Webhook — handles inbound Twilio SMS messages.
 
 Twilio sends a POST to this endpoint when a patient replies to an SMS.
-This view processes Y/N replies to appointment reminders.
+This view records Y/N replies to appointment reminders and acknowledges
+immediately; services/inbound_sms.py applies them in the background.
 """
-import hashlib
-import hmac
 import logging
-from urllib.parse import urljoin
+import uuid
 
 from django.conf import settings
 from django.http import HttpResponse
@@ -15,9 +14,7 @@ from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from apps.appointments.models import Appointment
-from apps.notifications.services.communication_service import handle_patient_reply
-from apps.patients.models import Patient
+from apps.notifications.services import inbound_sms
 
 logger = logging.getLogger(__name__)
 
@@ -53,17 +50,6 @@ def _validate_twilio_signature(request) -> bool:
         return False
 
 
-def _normalize_phone_for_lookup(phone: str) -> str:
-    """Strip to digits for matching against stored phone numbers."""
-    digits = ''.join(c for c in phone if c.isdigit())
-    # Remove country code prefix for PH numbers
-    if digits.startswith('63') and len(digits) > 10:
-        digits = '0' + digits[2:]
-    elif digits.startswith('1') and len(digits) == 11:
-        digits = digits[1:]
-    return digits
-
-
 @method_decorator(csrf_exempt, name='dispatch')
 class SMSReplyWebhookView(View):
     """
@@ -74,8 +60,9 @@ class SMSReplyWebhookView(View):
       - Body: the reply text (Y or N)
       - To:   the Twilio number
 
-    We look up the patient by phone, find their most recent
-    appointment with a pending reminder, and handle the reply.
+    Y/N replies are stored (deduped on MessageSid) and acknowledged with
+    an empty TwiML response; the inbound worker looks up the patient by
+    phone, applies the reply to their pending appointment and texts back.
     """
 
     def post(self, request, *args, **kwargs):
@@ -111,74 +98,19 @@ class SMSReplyWebhookView(View):
         # Normalize reply
         reply = 'Y' if body in ('Y', 'YES') else 'N'
 
-        # Find patient by phone number
-        normalized = _normalize_phone_for_lookup(from_number)
-        patient = self._find_patient(normalized, from_number)
-
-        if not patient:
-            logger.warning("No patient found for phone: %s", from_number)
-            return HttpResponse(
-                '<?xml version="1.0" encoding="UTF-8"?><Response></Response>',
-                content_type='text/xml',
-            )
-
-        # Find the most recent pending appointment
-        appointment = self._find_pending_appointment(patient)
-
-        if not appointment:
-            logger.warning("No pending appointment for patient %s", patient.id)
-            return HttpResponse(
-                '<?xml version="1.0" encoding="UTF-8"?>'
-                '<Response><Message>We could not find a pending appointment. '
-                'Please contact the clinic directly.</Message></Response>',
-                content_type='text/xml',
-            )
-
-        # Handle the reply
-        result = handle_patient_reply(appointment, reply)
-        logger.info("Reply processed: patient=%s appt=%s result=%s", patient.id, appointment.id, result)
-
-        # Send TwiML response
-        if reply == 'Y':
-            msg = (
-                f"Thank you, {patient.first_name}! "
-                f"Your appointment has been confirmed. See you soon!"
-            )
-        else:
-            msg = (
-                f"Thank you, {patient.first_name}. "
-                f"We'll send you a link to reschedule at your convenience."
-            )
+        # Record it and answer Twilio now — the patient lookup, the reply
+        # handling and the acknowledgement SMS run on the inbound worker
+        message_sid = (
+            request.POST.get('MessageSid') or request.POST.get('SmsSid') or f'local-{uuid.uuid4().hex}'
+        )
+        inbound_sms.receive(
+            message_sid = message_sid,
+            from_number = from_number,
+            to_number   = to_number,
+            reply       = reply,
+        )
 
         return HttpResponse(
-            f'<?xml version="1.0" encoding="UTF-8"?>'
-            f'<Response><Message>{msg}</Message></Response>',
+            '<?xml version="1.0" encoding="UTF-8"?><Response></Response>',
             content_type='text/xml',
         )
-
-    def _find_patient(self, normalized_phone: str, raw_phone: str):
-        """Find patient by phone number (try multiple formats)."""
-        from django.db.models import Q
-
-        lookups = Q(phone__endswith=normalized_phone[-10:]) if len(normalized_phone) >= 10 else Q(phone=normalized_phone)
-        lookups |= Q(phone=raw_phone)
-
-        return Patient.objects.filter(lookups, is_archived=False).first()
-
-    def _find_pending_appointment(self, patient):
-        """Find the most recent appointment that has a reminder sent but no reply."""
-        from django.utils import timezone
-
-        return (
-            Appointment.objects
-            .filter(
-                patient=patient,
-                reminder_sent=True,
-                patient_reply='',
-                confirmation_status='PENDING',
-                is_deleted=False,
-                date__gte=timezone.now().date(),
-            )
-            .order_by('date', 'start_time')
-            .first()
-        )
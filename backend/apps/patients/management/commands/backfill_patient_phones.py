@@ -0,0 +1,60 @@
+"""
+Fill Patient.phone_e164 from Patient.phone.
+
+Usage:
+    python manage.py backfill_patient_phones               # rows whose value is out of date
+    python manage.py backfill_patient_phones --batch-size 5000
+    python manage.py backfill_patient_phones --dry-run
+
+Migration 0009 fills existing patients; run this after any bulk import
+or QuerySet.update() that changed phones without going through save().
+"""
+from django.core.management.base import BaseCommand
+
+from apps.common.phone import to_e164
+from apps.patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized E.164 phone column on patients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Patients read and updated per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Count changes without writing them.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run    = options['dry_run']
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{'[DRY RUN] ' if dry_run else ''}Patient phone backfill"
+        ))
+
+        scanned = updated = unparsable = 0
+        last_id = 0
+        while True:
+            # Keyset pagination on id — archived and deleted patients included
+            rows = list(
+                Patient.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'phone', 'phone_e164')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id  = rows[-1].id
+            scanned += len(rows)
+
+            changed = []
+            for patient in rows:
+                e164 = to_e164(patient.phone) or ''
+                if not e164 and patient.phone:
+                    unparsable += 1
+                if e164 != patient.phone_e164:
+                    patient.phone_e164 = e164
+                    changed.append(patient)
+
+            updated += len(changed)
+            if changed and not dry_run:
+                Patient.objects.bulk_update(changed, ['phone_e164'])
+
+        self.stdout.write(f"  Scanned: {scanned} | Updated: {updated} | Not normalizable: {unparsable}\n")
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:29
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 2000
+
+
+def backfill_phone_e164(apps, schema_editor):
+    """phone_e164 = to_e164(phone) for existing patients, in batches."""
+    from apps.common.phone import to_e164
+
+    Patient = apps.get_model('patients', 'Patient')
+
+    pending = (
+        Patient.objects
+        .exclude(phone='')
+        .only('id', 'phone')
+        .order_by('id')
+    )
+    batch = []
+    for patient in pending.iterator(chunk_size=BATCH_SIZE):
+        phone_e164 = to_e164(patient.phone)
+        if not phone_e164:
+            continue
+        patient.phone_e164 = phone_e164
+        batch.append(patient)
+        if len(batch) >= BATCH_SIZE:
+            Patient.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0008_patient_last_checkin_sent_at_patient_last_visit_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
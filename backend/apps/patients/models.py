@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.crypto import get_random_string
 from apps.common.models import TimeStampedModel, SoftDeleteModel
+from apps.common.phone import to_e164
 
 
 class Patient(TimeStampedModel, SoftDeleteModel):
@@ -26,6 +27,9 @@ class Patient(TimeStampedModel, SoftDeleteModel):
 
     email       = models.EmailField(blank=True)
     phone       = models.CharField(max_length=15)
+    # phone in E.164, kept in sync by save() — lets the SMS reply webhook
+    # and duplicate checks match numbers with an index lookup
+    phone_e164  = models.CharField(max_length=16, blank=True, editable=False, db_index=True)
     address     = models.TextField()
     city        = models.CharField(max_length=100)
     province    = models.CharField(max_length=100)
@@ -145,6 +149,10 @@ class Patient(TimeStampedModel, SoftDeleteModel):
 
             self.patient_number = f"{date_str}-{new_num:04d}"
 
+        self.phone_e164 = to_e164(self.phone) or ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_e164'}
         super().save(*args, **kwargs)
 
 
@@ -8,6 +8,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from apps.clinics.services.models import Service as ClinicService
+from apps.common.phone import to_e164
 from .models import (
     Patient, IntakeForm,
     ServiceCategory, PortalService,
@@ -49,12 +50,14 @@ def _confirm_portal_booking(booking, confirmed_by_user):
         ).first()
 
     if patient is None:
+        # Same number typed differently (0917… / +63917…) is the same patient
+        phone_e164 = to_e164(booking.patient_phone)
         patient = Patient.objects.filter(
             clinic=clinic,
             first_name__iexact=booking.patient_first_name,
             last_name__iexact=booking.patient_last_name,
-            phone=booking.patient_phone,
             is_deleted=False,
+            **({'phone_e164': phone_e164} if phone_e164 else {'phone': booking.patient_phone}),
         ).first()
 
     if patient is None:
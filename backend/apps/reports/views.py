@@ -12,6 +12,7 @@ from datetime import date, datetime, timedelta
 from .models import Report
 from .serializers import ReportSerializer
 from apps.appointments.models import Appointment
+from apps.billing.ledger_service import covers_whole_months, ledger_totals
 from apps.billing.models import Invoice, Payment
 from apps.patients.models import Patient
 from apps.records.models import ClinicalNote
@@ -698,6 +699,22 @@ class ReportViewSet(viewsets.ModelViewSet):
     def revenue_summary(self, request):
         clinic     = request.user.clinic
         start, end = self._get_date_range(request)
+
+        # Whole-month ranges are answered from the receivables ledger
+        if clinic and covers_whole_months(start, end):
+            totals = ledger_totals([clinic.id], date_from=start, date_to=end)
+            return Response({
+                'total_invoiced':    totals['total_invoiced'],
+                'total_paid':        totals['payments_received'],
+                'outstanding':       totals['total_balance'],
+                'by_payment_method': [
+                    {'payment_method': r['payment_method'], 'total': r['total']}
+                    for r in totals['by_payment_method']
+                ],
+                'invoice_count':     totals['count'],
+                'payment_count':     totals['payment_count'],
+            })
+
         invoices = Invoice.objects.filter(
             clinic=clinic, invoice_date__range=[start, end], is_deleted=False
         )
@@ -10,10 +10,8 @@ from django.urls import re_path, path
 
 print(">>> ASGI: loading websocket routes...")  # ← debug
 
-from apps.notifications.middleware import JWTAuthMiddlewareStack as NotificationsJWTMiddleware
+from apps.accounts.middleware import JWTAuthMiddlewareStack
 from apps.notifications.consumers import NotificationConsumer
-
-from apps.messages.middleware import JWTAuthMiddlewareStack as MessagesJWTMiddleware
 from apps.messages.consumers import ChatConsumer, PresenceConsumer
 
 all_websocket_patterns = [
@@ -26,10 +24,8 @@ print(f">>> ASGI: registered {len(all_websocket_patterns)} websocket routes")  #
 
 application = ProtocolTypeRouter({
     'http': get_asgi_application(),
-    'websocket': NotificationsJWTMiddleware(
-        MessagesJWTMiddleware(
-            URLRouter(all_websocket_patterns)
-        )
+    'websocket': JWTAuthMiddlewareStack(
+        URLRouter(all_websocket_patterns)
     ),
 })
 
@@ -1,9 +1,15 @@
+from django.conf import settings
 from django.core.management import call_command
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# The communication workflows go through run_workflow: one shard per clinic
+# across a process pool, with a checkpoint per clinic so a crashed or timed
+# out run resumes (same run key = job + date) instead of starting over.
+
+
 def send_reminders_cron():
     """
     Called daily at 8:00 AM by django-crontab.
@@ -11,7 +17,7 @@ def send_reminders_cron():
     """
     logger.info("Cron: send_reminders_cron started")
     try:
-        call_command('send_appointment_reminders')
+        call_command('run_workflow', 'send_appointment_reminders')
         logger.info("Cron: send_reminders_cron completed successfully")
     except Exception as e:
         logger.error("Cron: send_reminders_cron failed — %s", str(e))
@@ -24,9 +30,12 @@ def send_communication_reminders_cron():
     Sends Y/N appointment reminders via the new communication workflow.
     Uses clinic-configurable reminder_hours_before setting.
     """
+    if getattr(settings, 'COMMUNICATION_SCHEDULER', False):
+        logger.info("Cron: send_communication_reminders_cron skipped — handled by run_scheduler")
+        return
     logger.info("Cron: send_communication_reminders_cron started")
     try:
-        call_command('send_communication_reminders')
+        call_command('run_workflow', 'send_communication_reminders')
         logger.info("Cron: send_communication_reminders_cron completed")
     except Exception as e:
         logger.error("Cron: send_communication_reminders_cron failed — %s", str(e))
@@ -40,7 +49,7 @@ def send_dna_followups_cron():
     """
     logger.info("Cron: send_dna_followups_cron started")
     try:
-        call_command('send_dna_followups')
+        call_command('run_workflow', 'send_dna_followups')
         logger.info("Cron: send_dna_followups_cron completed")
     except Exception as e:
         logger.error("Cron: send_dna_followups_cron failed — %s", str(e))
@@ -53,9 +62,12 @@ def send_rebook_followups_cron():
     Sends no-rebook follow-ups for patients who haven't rebooked
     after X days (configurable per clinic).
     """
+    if getattr(settings, 'COMMUNICATION_SCHEDULER', False):
+        logger.info("Cron: send_rebook_followups_cron skipped — handled by run_scheduler")
+        return
     logger.info("Cron: send_rebook_followups_cron started")
     try:
-        call_command('send_rebook_followups')
+        call_command('run_workflow', 'send_rebook_followups')
         logger.info("Cron: send_rebook_followups_cron completed")
     except Exception as e:
         logger.error("Cron: send_rebook_followups_cron failed — %s", str(e))
@@ -69,8 +81,46 @@ def send_inactive_checkins_cron():
     """
     logger.info("Cron: send_inactive_checkins_cron started")
     try:
-        call_command('send_inactive_checkins')
+        call_command('run_workflow', 'send_inactive_checkins')
         logger.info("Cron: send_inactive_checkins_cron completed")
     except Exception as e:
         logger.error("Cron: send_inactive_checkins_cron failed — %s", str(e))
-        raise
\ No newline at end of file
+        raise
+
+
+def archive_notifications_cron():
+    """
+    Called daily at 3:00 AM by django-crontab.
+    Moves notifications past their retention window to the archive tables.
+    """
+    logger.info("Cron: archive_notifications_cron started")
+    try:
+        call_command('archive_notifications')
+        logger.info("Cron: archive_notifications_cron completed")
+    except Exception as e:
+        logger.error("Cron: archive_notifications_cron failed — %s", str(e))
+        raise
+
+
+def process_outbox_cron():
+    """
+    Called every 5 minutes by django-crontab.
+    Sends outbox retries and anything left queued by a restarted process.
+    """
+    try:
+        call_command('process_outbox', timeout=240)
+    except Exception as e:
+        logger.error("Cron: process_outbox_cron failed — %s", str(e))
+        raise
+
+
+def process_inbound_sms_cron():
+    """
+    Called every 5 minutes by django-crontab.
+    Retries SMS replies the webhook's in-process workers did not finish.
+    """
+    try:
+        call_command('process_inbound_sms')
+    except Exception as e:
+        logger.error("Cron: process_inbound_sms_cron failed — %s", str(e))
+        raise
@@ -139,6 +139,12 @@ CRONJOBS = [
     ('0 10 * * *', 'config.cron.send_rebook_followups_cron'),
     # Every Monday at 9:00 AM — send inactive patient wellness check-ins
     ('0 9 * * 1', 'config.cron.send_inactive_checkins_cron'),
+    # Every day at 3:00 AM — archive notifications past their retention window
+    ('0 3 * * *', 'config.cron.archive_notifications_cron'),
+    # Every 5 minutes — deliver outbox retries / leftovers
+    ('*/5 * * * *', 'config.cron.process_outbox_cron'),
+    # Every 5 minutes — retry inbound SMS replies left unprocessed
+    ('*/5 * * * *', 'config.cron.process_inbound_sms_cron'),
 ]
 
 
@@ -25,7 +25,10 @@ export const ChatWindow = ({
   const bottomRef   = useRef<HTMLDivElement>(null);
   const typingTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
 
-  const { messages, isLoading, appendMessage } = useMessages(conversation.id);
+  const {
+    messages, isLoading, hasOlder, isLoadingOlder, loadOlder, appendMessage,
+  } = useMessages(conversation.id);
+  const lastMessageId = messages.length ? messages[messages.length - 1].id : null;
 
   const handleIncomingMessage = useCallback((msg: MessageItem) => {
     appendMessage(msg);
@@ -53,10 +56,15 @@ export const ChatWindow = ({
   // Mark read on open
   useEffect(() => { sendMarkRead(); }, [conversation.id, sendMarkRead]);
 
-  // Scroll to bottom
+  // Scroll to bottom on new messages — not when older history is prepended
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages, typingUser]);
+  }, [lastMessageId, typingUser]);
+
+  // Lazily load older history when scrolled to the top
+  const handleScroll = useCallback((e: React.UIEvent<HTMLDivElement>) => {
+    if (e.currentTarget.scrollTop < 40 && hasOlder) loadOlder();
+  }, [hasOlder, loadOlder]);
 
   const initials = other?.full_name.split(' ').map(n => n[0]).join('').toUpperCase().slice(0, 2) ?? '?';
 
@@ -93,7 +101,12 @@ export const ChatWindow = ({
       </div>
 
       {/* Messages area */}
-      <div className="flex-1 overflow-y-auto px-5 py-4 space-y-4 bg-gray-50">
+      <div className="flex-1 overflow-y-auto px-5 py-4 space-y-4 bg-gray-50" onScroll={handleScroll}>
+        {isLoadingOlder && (
+          <div className="flex justify-center py-2">
+            <div className="w-4 h-4 border-2 border-blue-400 border-t-transparent rounded-full animate-spin" />
+          </div>
+        )}
         {isLoading ? (
           <div className="flex justify-center py-10">
             <div className="w-6 h-6 border-2 border-blue-400 border-t-transparent rounded-full animate-spin" />
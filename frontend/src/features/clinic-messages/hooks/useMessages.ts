@@ -1,18 +1,23 @@
 import { useState, useCallback, useEffect, useRef } from 'react';
-import { getMessages, markRead } from '../services/message.api';
+import { getMessagesPage, markRead } from '../services/message.api';
 import type { MessageItem } from '../types/messages.types';
 
 export const useMessages = (conversationId: number | null) => {
   const [messages,   setMessages]   = useState<MessageItem[]>([]);
   const [isLoading,  setIsLoading]  = useState(false);
+  const [hasOlder,   setHasOlder]   = useState(false);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+  const olderCursor = useRef<number | null>(null);
   const bottomRef = useRef<HTMLDivElement | null>(null);
 
   const fetchMessages = useCallback(async () => {
     if (!conversationId) return;
     setIsLoading(true);
     try {
-      const data = await getMessages(conversationId);
-      setMessages(data);
+      const page = await getMessagesPage(conversationId);
+      setMessages(page.results);
+      setHasOlder(page.has_older);
+      olderCursor.current = page.before;
       await markRead(conversationId);
     } catch (err) {
       console.error('fetchMessages error:', err);
@@ -21,8 +26,29 @@ export const useMessages = (conversationId: number | null) => {
     }
   }, [conversationId]);
 
+  /* Prepend the page before the oldest loaded message */
+  const loadOlder = useCallback(async () => {
+    if (!conversationId || !olderCursor.current || isLoadingOlder) return;
+    setIsLoadingOlder(true);
+    try {
+      const page = await getMessagesPage(conversationId, { before: olderCursor.current });
+      setMessages(prev => {
+        const known = new Set(prev.map(m => m.id));
+        return [...page.results.filter(m => !known.has(m.id)), ...prev];
+      });
+      setHasOlder(page.has_older);
+      olderCursor.current = page.before;
+    } catch (err) {
+      console.error('loadOlder error:', err);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  }, [conversationId, isLoadingOlder]);
+
   useEffect(() => {
     setMessages([]);
+    setHasOlder(false);
+    olderCursor.current = null;
     fetchMessages();
   }, [fetchMessages]);
 
@@ -39,5 +65,5 @@ export const useMessages = (conversationId: number | null) => {
     });
   }, []);
 
-  return { messages, isLoading, appendMessage, bottomRef };
-};
\ No newline at end of file
+  return { messages, isLoading, hasOlder, isLoadingOlder, loadOlder, appendMessage, bottomRef };
+};
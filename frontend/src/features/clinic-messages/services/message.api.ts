@@ -1,5 +1,5 @@
 import axiosInstance from '@/lib/axios';
-import type { Conversation, MessageItem, Participant } from '../types/messages.types';
+import type { Conversation, MessageItem, MessagePage, Participant } from '../types/messages.types';
 
 const BASE = '/conversations';
 
@@ -12,6 +12,15 @@ export const startConversation = (recipient_id: number): Promise<Conversation> =
 export const getMessages = (conversationId: number): Promise<MessageItem[]> =>
   axiosInstance.get(`${BASE}/${conversationId}/messages/`).then(r => r.data);
 
+/** Latest page, or the page older than `before` (a message id). */
+export const getMessagesPage = (
+  conversationId: number,
+  params: { limit?: number; before?: number; after?: number } = {},
+): Promise<MessagePage> =>
+  axiosInstance
+    .get(`${BASE}/${conversationId}/messages/`, { params: { limit: 50, ...params } })
+    .then(r => r.data);
+
 export const markRead = (conversationId: number): Promise<void> =>
   axiosInstance.post(`${BASE}/${conversationId}/mark_read/`).then(r => r.data);
 
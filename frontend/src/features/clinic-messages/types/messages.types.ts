@@ -18,6 +18,14 @@ export interface MessageItem {
   created_at:    string;
 }
 
+export interface MessagePage {
+  results:   MessageItem[];
+  has_older: boolean;
+  has_newer: boolean;
+  before:    number | null;
+  after:     number | null;
+}
+
 export interface Conversation {
   id:                number;
   clinic:            number;